@@ -1,10 +1,32 @@
+from functools import reduce
+from operator import or_
+
 from django.contrib import admin
+from django.contrib.admin.forms import AdminAuthenticationForm
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from .hashing import HashIndisponivel
+from .search import buscar_reclamacoes
 from .models import (
     Usuario, UsuarioConsumidor, UsuarioEmpresa, Administrador,
-    EstatisticaEmpresa, Reclamacao, Arquivo, RespostaReclamacao, Relatorio
+    EstatisticaEmpresa, EstatisticaEmpresaPendente, Reclamacao, Arquivo, UploadArquivo, RespostaReclamacao, Relatorio,
+    ReclamacaoDiaria, ResolucaoDiaria, ReclamacaoSemanal, ResolucaoSemanal
 )
 
 
+class LoginAdminForm(AdminAuthenticationForm):
+    """Login do admin: pool de hashes cheio (api.hashing) vira erro no formulário, não 500."""
+
+    def clean(self):
+        try:
+            return super().clean()
+        except HashIndisponivel:
+            raise ValidationError('Muitos logins simultâneos. Tente novamente em instantes.', code='hash_indisponivel')
+
+
+admin.site.login_form = LoginAdminForm
+
+
 @admin.register(Usuario)
 class UsuarioAdmin(admin.ModelAdmin):
     list_display = (
@@ -87,6 +109,50 @@ class EstatisticaEmpresaAdmin(admin.ModelAdmin):
     search_fields = ('usuario_empresa__razao_social',)
 
 
+@admin.register(EstatisticaEmpresaPendente)
+class EstatisticaEmpresaPendenteAdmin(admin.ModelAdmin):
+    list_display = (
+        'usuario_empresa', 'data_marcacao', 'data_atualizacao',
+    )
+    ordering = ('data_marcacao',)
+
+
+@admin.register(ReclamacaoDiaria)
+class ReclamacaoDiariaAdmin(admin.ModelAdmin):
+    list_display = (
+        'empresa', 'dia', 'status', 'total',
+    )
+    list_filter = ('status', 'dia')
+    ordering = ('-dia',)
+
+
+@admin.register(ResolucaoDiaria)
+class ResolucaoDiariaAdmin(admin.ModelAdmin):
+    list_display = (
+        'empresa', 'dia', 'faixa', 'total', 'soma_horas',
+    )
+    list_filter = ('dia',)
+    ordering = ('-dia', 'faixa')
+
+
+@admin.register(ReclamacaoSemanal)
+class ReclamacaoSemanalAdmin(admin.ModelAdmin):
+    list_display = (
+        'empresa', 'semana', 'status', 'total',
+    )
+    list_filter = ('status', 'semana')
+    ordering = ('-semana',)
+
+
+@admin.register(ResolucaoSemanal)
+class ResolucaoSemanalAdmin(admin.ModelAdmin):
+    list_display = (
+        'empresa', 'semana', 'faixa', 'total', 'soma_horas',
+    )
+    list_filter = ('semana',)
+    ordering = ('-semana', 'faixa')
+
+
 @admin.register(Reclamacao)
 class ReclamacaoAdmin(admin.ModelAdmin):
     list_display = (
@@ -96,16 +162,36 @@ class ReclamacaoAdmin(admin.ModelAdmin):
     list_filter = ('status', 'data_criacao', 'empresa')
     search_fields = ('titulo', 'descricao', 'usuario_consumidor__usuario__nome', 'empresa__razao_social')
     ordering = ('-data_criacao',)
+    # Campos buscados com icontains; título e descrição vão pela busca normalizada (api.search)
+    campos_busca_por_nome = ('usuario_consumidor__usuario__nome', 'empresa__razao_social')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Mesma busca (e índice) do ReclamacaoViewSet para o texto, OU os nomes do consumidor e da empresa
+        if not search_term.strip():
+            return queryset, False
+        por_nome = Q()
+        for termo in search_term.split():
+            por_nome &= reduce(or_, (Q(**{f'{campo}__icontains': termo}) for campo in self.campos_busca_por_nome))
+        por_texto = buscar_reclamacoes(queryset, search_term).values('pk')
+        return queryset.filter(Q(pk__in=por_texto) | por_nome), False
 
 
 @admin.register(Arquivo)
 class ArquivoAdmin(admin.ModelAdmin):
     list_display = (
-        'nome_arquivo', 'reclamacao', 'tipo_arquivo',
+        'nome_arquivo', 'reclamacao', 'tipo_arquivo', 'tamanho',
         'data_upload',
     )
     list_filter = ('tipo_arquivo', 'data_upload',)
-    search_fields = ('nome_arquivo', 'reclamacao__titulo')
+    search_fields = ('nome_arquivo', 'reclamacao__titulo', 'sha256')
+
+
+@admin.register(UploadArquivo)
+class UploadArquivoAdmin(admin.ModelAdmin):
+    list_display = (
+        'nome_arquivo', 'reclamacao', 'usuario', 'tamanho', 'data_criacao',
+    )
+    ordering = ('data_criacao',)
 
 
 @admin.register(RespostaReclamacao)
@@ -0,0 +1,104 @@
+"""
+Content-addressed storage for complaint attachments.
+
+A file is stored under <upload_to>/<aa>/<bb>/<sha256><ext>, so identical content attached to
+several complaints is written once and every Arquivo row points to the same blob. The rows
+referencing a blob are its refcount: deleting an Arquivo (directly or by the cascade of its
+Reclamacao) deletes the blob when no other row references it (api.signals), and the
+armazenamento_arquivos command collects blobs orphaned some other way and reports the savings.
+"""
+import hashlib
+import os
+import re
+import time
+import uuid
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+BLOCO = 64 * 1024
+
+
+def calcular_sha256(conteudo):
+    """SHA-256 of a File/UploadedFile read in chunks; cached on the object as `sha256`."""
+    sha256 = getattr(conteudo, 'sha256', None)
+    if sha256:
+        return sha256
+    if hasattr(conteudo, 'seek'):
+        conteudo.seek(0)
+    resumo = hashlib.sha256()
+    for bloco in conteudo.chunks(BLOCO):
+        resumo.update(bloco)
+    if hasattr(conteudo, 'seek'):
+        conteudo.seek(0)
+    conteudo.sha256 = resumo.hexdigest()
+    return conteudo.sha256
+
+
+def nome_do_blob(diretorio, sha256, extensao=''):
+    return f'{diretorio}/{sha256[:2]}/{sha256[2:4]}/{sha256}{extensao[:16].lower()}'
+
+
+BLOB = re.compile(r'(?:^|/)([0-9a-f]{2})/([0-9a-f]{2})/(\1\2[0-9a-f]{60})(\.[^/]*)?$')
+
+
+def eh_blob(nome):
+    """Whether `nome` is a content-addressed name (files stored before this layout are not)."""
+    return BLOB.search(nome) is not None
+
+
+class ArmazenamentoPorConteudo(FileSystemStorage):
+    """FileSystemStorage that names files by their SHA-256 and reuses a blob already on disk."""
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        diretorio, nome = os.path.split(name)
+        blob = nome_do_blob(diretorio, calcular_sha256(content), os.path.splitext(nome)[1])
+        if self.exists(blob):
+            # Renova o mtime: a coleta não apaga um blob que acabou de ganhar uma referência
+            try:
+                os.utime(self.path(blob))
+                return blob
+            except FileNotFoundError:
+                pass  # coletado entre o exists() e o utime(): grava de novo
+        return super().save(blob, content, max_length=max_length)
+
+    def get_available_name(self, name, max_length=None):
+        # Nomes de blob iguais são conteúdos iguais: nunca ganham sufixo, mesmo que o blob já exista
+        if eh_blob(name):
+            return name
+        return super().get_available_name(name, max_length=max_length)
+
+    def _save(self, name, content):
+        if not eh_blob(name):
+            return super()._save(name, content)
+        # Grava num temporário oculto ao lado e publica com rename: dois envios simultâneos do
+        # mesmo conteúdo (ambos sem o blob no exists()) terminam no mesmo arquivo, e ninguém
+        # lê um blob pela metade
+        diretorio, nome = os.path.split(name)
+        temporario = super()._save(f'{diretorio}/.{nome}.{uuid.uuid4().hex}', content)
+        os.replace(self.path(temporario), self.path(name))
+        return name
+
+    def apagar_se_antigo(self, name):
+        """
+        Deletes a blob no longer referenced, unless it was written or reused in the last
+        ARQUIVOS_GC_CARENCIA seconds: an upload in flight may be about to reference it.
+        References are checked here, right before the delete: the caller's view may be stale.
+        """
+        from .models import Arquivo  # api.models importa este módulo
+
+        if Arquivo.objects.filter(arquivo=name).exists():
+            return False
+        try:
+            idade = time.time() - os.path.getmtime(self.path(name))
+        except FileNotFoundError:
+            return False
+        if idade < settings.ARQUIVOS_GC_CARENCIA:
+            return False
+        self.delete(name)
+        return True
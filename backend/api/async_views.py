@@ -0,0 +1,171 @@
+"""
+Async versions of the public read endpoints (/api/public/...), using Django's async ORM.
+
+Under an ASGI server (uvicorn project.asgi:application) a request waiting on the database
+does not hold a worker thread. They render the same serializers as the DRF endpoints, over
+querysets that load everything upfront: any lazy query while serializing would raise
+SynchronousOnlyOperation instead of silently becoming an N+1.
+
+GET only, no authentication, and the default fields of each serializer. Pagination is by
+cursor (keyset, as ?pagination=cursor on the DRF endpoints) or, in searches, by page
+without COUNT(*).
+"""
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .cache import aobter_da_empresa
+from .models import EstatisticaEmpresa, Reclamacao, UsuarioEmpresa
+from .pagination import decode_cursor, encode_cursor, keyset_filter, keyset_position
+from .search import buscar_empresas, buscar_reclamacoes, termos_de_busca
+from .serializers import EstatisticaEmpresaSerializer, ReclamacaoSerializer, UsuarioEmpresaSerializer
+
+RECLAMACOES_KEYSET = ('-data_criacao', '-id')
+EMPRESAS_KEYSET = ('pk',)
+
+
+def resposta_json(data, status=200):
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+
+def nao_encontrado(mensagem='Não encontrado.'):
+    return resposta_json({'detail': mensagem}, status=404)
+
+
+def tamanho_da_pagina():
+    return settings.REST_FRAMEWORK['PAGE_SIZE']
+
+
+async def pagina_por_cursor(request, queryset, ordering):
+    """Returns (objects, next url) for the keyset page after ?cursor=; raises ValueError on a bad cursor."""
+    page_size = tamanho_da_pagina()
+    queryset = queryset.order_by(*ordering)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        queryset = queryset.filter(keyset_filter(ordering, decode_cursor(cursor, queryset.model, ordering)))
+
+    resultados = [obj async for obj in queryset[:page_size + 1]]
+    proxima = None
+    if len(resultados) > page_size:
+        resultados = resultados[:page_size]
+        proxima = replace_query_param(
+            request.build_absolute_uri(), 'cursor', encode_cursor(keyset_position(resultados[-1], ordering))
+        )
+    return resultados, proxima
+
+
+async def pagina_por_numero(request, queryset):
+    """Returns (objects, next url, previous url) for ?page=, without COUNT(*); raises ValueError on a bad page."""
+    page_size = tamanho_da_pagina()
+    numero = int(request.GET.get('page', 1))
+    if numero < 1:
+        raise ValueError(numero)
+
+    inicio = (numero - 1) * page_size
+    resultados = [obj async for obj in queryset[inicio:inicio + page_size + 1]]
+    url = request.build_absolute_uri()
+    proxima = replace_query_param(url, 'page', numero + 1) if len(resultados) > page_size else None
+    anterior = None
+    if numero == 2:
+        anterior = remove_query_param(url, 'page')
+    elif numero > 2:
+        anterior = replace_query_param(url, 'page', numero - 1)
+    return resultados[:page_size], proxima, anterior
+
+
+class PaginaInvalida(Exception):
+    pass
+
+
+async def listar(request, queryset, keyset, busca):
+    """Returns (objects, body without 'results'): by cursor, or by page number in searches."""
+    if busca is not None:
+        try:
+            resultados, proxima, anterior = await pagina_por_numero(request, queryset)
+        except ValueError:
+            raise PaginaInvalida('Página inválida.')
+    else:
+        try:
+            resultados, proxima = await pagina_por_cursor(request, queryset, keyset)
+        except ValueError:
+            raise PaginaInvalida('Cursor inválido.')
+        anterior = None
+    return resultados, {'count': None, 'next': proxima, 'previous': anterior}
+
+
+@require_GET
+async def reclamacoes(request):
+    """GET /api/public/reclamacoes/ (?status=, ?empresa_id=, ?search=, ?cursor=, ?page=)."""
+    queryset = Reclamacao.objects.para_listagem()
+    status_filtro = request.GET.get('status')
+    if status_filtro is not None:
+        queryset = queryset.filter(status=status_filtro)
+    empresa_id = request.GET.get('empresa_id')
+    if empresa_id is not None:
+        queryset = queryset.filter(empresa__usuario_id=empresa_id)
+    busca = request.GET.get('search', '').strip() or None
+    contexto = {}
+    if busca is not None:
+        queryset = buscar_reclamacoes(queryset, busca)
+        contexto['termos_busca'] = termos_de_busca(busca)
+
+    try:
+        resultados, corpo = await listar(request, queryset, RECLAMACOES_KEYSET, busca)
+    except PaginaInvalida as exc:
+        return nao_encontrado(str(exc))
+    corpo['results'] = ReclamacaoSerializer(resultados, many=True, context=contexto).data
+    return resposta_json(corpo)
+
+
+@require_GET
+async def reclamacao(request, pk):
+    """GET /api/public/reclamacoes/<pk>/."""
+    try:
+        obj = await Reclamacao.objects.para_listagem().aget(pk=pk)
+    except Reclamacao.DoesNotExist:
+        return nao_encontrado()
+    return resposta_json(ReclamacaoSerializer(obj).data)
+
+
+@require_GET
+async def empresas(request):
+    """GET /api/public/empresas/ (?search= busca por nome ou CNPJ, ?cursor=, ?page=)."""
+    queryset = UsuarioEmpresa.objects.select_related('usuario')
+    busca = request.GET.get('search', '').strip() or None
+    if busca is not None:
+        queryset = buscar_empresas(queryset, busca)
+
+    try:
+        resultados, corpo = await listar(request, queryset, EMPRESAS_KEYSET, busca)
+    except PaginaInvalida as exc:
+        return nao_encontrado(str(exc))
+    corpo['results'] = UsuarioEmpresaSerializer(resultados, many=True).data
+    return resposta_json(corpo)
+
+
+@require_GET
+async def empresa(request, pk):
+    """
+    GET /api/public/empresas/<pk>/: public profile plus statistics, from the same cache
+    entries as /api/empresas/<pk>/ and the company profile.
+    """
+    async def calcular_publico():
+        obj = await UsuarioEmpresa.objects.select_related('usuario').aget(pk=pk)
+        return dict(UsuarioEmpresaSerializer(obj).data)
+
+    async def calcular_estatisticas():
+        consulta = EstatisticaEmpresa.objects.select_related('usuario_empresa')
+        stats = await consulta.filter(usuario_empresa_id=pk).afirst()
+        if stats is None:
+            await EstatisticaEmpresa.objects.aget_or_create(usuario_empresa_id=pk)
+            stats = await consulta.aget(usuario_empresa_id=pk)
+        return dict(EstatisticaEmpresaSerializer(stats).data)
+
+    try:
+        data = dict(await aobter_da_empresa(pk, 'publico', calcular_publico))
+    except UsuarioEmpresa.DoesNotExist:
+        return nao_encontrado()
+    data['estatisticas'] = await aobter_da_empresa(pk, 'estatisticas', calcular_estatisticas)
+    return resposta_json(data)
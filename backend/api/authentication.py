@@ -0,0 +1,102 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .models.usuario import PERFIS, Usuario
+
+# Perfis carregados junto com o usuário: user.papel e user.perfil não vão ao banco
+RELACOES_DO_USUARIO = tuple(f'user__{relacao}' for relacao, papel in PERFIS)
+
+# Única parte do usuário que vai para o cache (nunca o hash da senha); o resto fica adiado
+CAMPOS_EM_CACHE = ('id', 'email', 'is_active', 'is_staff', 'is_superuser')
+
+
+def _cache():
+    return caches[settings.TOKEN_CACHE_ALIAS]
+
+
+def chave_do_token(key):
+    # O token em si não vai para o cache (nem para nomes de arquivo/chaves do memcached)
+    return 'token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def invalidar_token(key):
+    """Drops the cached user of a token now and again after commit (a request may re-cache it meanwhile)."""
+    chave = chave_do_token(key)
+    _cache().delete(chave)
+    transaction.on_commit(lambda: _cache().delete(chave))
+
+
+def invalidar_tokens_do_usuario(usuario_id):
+    for key in Token.objects.filter(user_id=usuario_id).values_list('key', flat=True):
+        invalidar_token(key)
+
+
+def _identidade(user):
+    """The cached form of a token's user: CAMPOS_EM_CACHE, its role and the pk of its profile."""
+    perfil = user.perfil
+    identidade = {campo: getattr(user, campo) for campo in CAMPOS_EM_CACHE}
+    identidade.update(papel=user.papel, perfil=perfil.pk if perfil is not None else None)
+    return identidade
+
+
+def _usuario(key, identidade):
+    """
+    Rebuilds (user, token) from a cached identity. Fields outside CAMPOS_EM_CACHE, the password
+    included, are deferred and the profile only carries its pk: reading anything else is a query.
+    """
+    # from_db() espera os valores na ordem dos campos do modelo
+    campos = [campo.attname for campo in Usuario._meta.concrete_fields if campo.attname in CAMPOS_EM_CACHE]
+    user = Usuario.from_db(DEFAULT_DB_ALIAS, campos, [identidade[campo] for campo in campos])
+    user.__dict__['papel'] = identidade['papel']
+    for relacao, papel in PERFIS:
+        campo = Usuario._meta.get_field(relacao)
+        perfil = None
+        if papel == identidade['papel']:
+            modelo = campo.related_model
+            perfil = modelo.from_db(DEFAULT_DB_ALIAS, [modelo._meta.pk.attname], [identidade['perfil']])
+            campo.remote_field.set_cached_value(perfil, user)
+        campo.set_cached_value(user, perfil)
+
+    token = Token.from_db(DEFAULT_DB_ALIAS, ['key', 'user_id'], [key, user.pk])
+    campo = Token._meta.get_field('user')
+    campo.set_cached_value(token, user)
+    campo.remote_field.set_cached_value(user, token)
+    return user, token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that keeps token -> user identity (pk, e-mail, flags, role and profile pk)
+    in the Django cache for TOKEN_CACHE_TIMEOUT seconds, so an authenticated request costs no
+    queries to authenticate nor to check the user's role. See _usuario for what the rebuilt user
+    carries.
+
+    Entries are dropped when the token is deleted (logout) and when the user or one of its
+    profiles is saved (password change, deactivation, profile edits); see api.signals.
+    """
+
+    def authenticate_credentials(self, key):
+        chave = chave_do_token(key)
+        identidade = _cache().get(chave)
+        if identidade is None:
+            # Sempre no primário: um token recém-criado no login pode ainda não estar nas réplicas
+            tokens = self.get_model().objects.using(DEFAULT_DB_ALIAS)
+            try:
+                token = tokens.select_related('user', *RELACOES_DO_USUARIO).get(key=key)
+            except self.get_model().DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            identidade = _identidade(token.user)
+            _cache().set(chave, identidade, timeout=settings.TOKEN_CACHE_TIMEOUT)
+
+        if not identidade['is_active']:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        # Mesmo caminho com ou sem cache: a requisição não vê diferença entre os dois
+        return _usuario(key, identidade)
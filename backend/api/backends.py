@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password, verify_password
+
+from .hashing import executar_hash
+
+UserModel = get_user_model()
+
+
+class OffloadedHashModelBackend(ModelBackend):
+    """
+    ModelBackend whose password hashing runs on the login hashing pool (api.hashing).
+
+    Hashes made by a hasher other than the first of PASSWORD_HASHERS, or with outdated
+    parameters, are redone with it after a successful login, so legacy PBKDF2 hashes migrate
+    to the configured hasher as users log in.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Mesmo custo de uma senha errada, para não revelar quais e-mails existem
+            executar_hash(make_password, password)
+            return None
+        if self.verificar_senha(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    def verificar_senha(self, user, senha):
+        correta, precisa_atualizar = executar_hash(verify_password, senha, user.password)
+        if correta and precisa_atualizar:
+            user.password = executar_hash(make_password, senha)
+            user.save(update_fields=['password'])
+        return correta
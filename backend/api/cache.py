@@ -0,0 +1,107 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_contadores = {'hits': 0, 'misses': 0, 'invalidacoes': 0}
+
+
+def _cache():
+    return caches[settings.EMPRESA_CACHE_ALIAS]
+
+
+def _contar(nome):
+    with _lock:
+        _contadores[nome] += 1
+
+
+def cache_stats():
+    """Hit/miss/invalidation counters of this process since start (or the last reset)."""
+    with _lock:
+        contadores = dict(_contadores)
+    consultas = contadores['hits'] + contadores['misses']
+    contadores['hit_ratio'] = contadores['hits'] / consultas if consultas else None
+    return contadores
+
+
+def reset_cache_stats():
+    with _lock:
+        for nome in _contadores:
+            _contadores[nome] = 0
+
+
+def _chave_versao(empresa_id):
+    return f'empresa:{empresa_id}:versao'
+
+
+def versao_empresa(empresa_id):
+    cache = _cache()
+    versao = cache.get(_chave_versao(empresa_id))
+    if versao is None:
+        # add() não sobrescreve uma versão criada em paralelo por outro processo
+        cache.add(_chave_versao(empresa_id), 1, timeout=None)
+        versao = cache.get(_chave_versao(empresa_id), 1)
+    return versao
+
+
+def invalidar_empresa(empresa_id):
+    """
+    Bumps the company's cache version once the current transaction commits, so every entry
+    cached for it (profile, statistics) stops being read. Old entries just expire.
+    """
+    def incrementar():
+        cache = _cache()
+        try:
+            cache.incr(_chave_versao(empresa_id))
+        except ValueError:
+            # Sem versão no cache: começa de um valor que nenhuma entrada antiga usou
+            cache.add(_chave_versao(empresa_id), 2, timeout=None)
+        _contar('invalidacoes')
+    transaction.on_commit(incrementar)
+
+
+def obter_da_empresa(empresa_id, nome, calcular):
+    """
+    Read-through cache for data derived from a company: returns the cached value for
+    (empresa_id, nome) or stores calcular() under the company's current version.
+    """
+    cache = _cache()
+    chave = f'empresa:{empresa_id}:v{versao_empresa(empresa_id)}:{nome}'
+    valor = cache.get(chave)
+    if valor is not None:
+        _contar('hits')
+        return valor
+
+    _contar('misses')
+    valor = calcular()
+    cache.set(chave, valor, timeout=settings.EMPRESA_CACHE_TIMEOUT)
+    return valor
+
+
+async def aversao_empresa(empresa_id):
+    cache = _cache()
+    versao = await cache.aget(_chave_versao(empresa_id))
+    if versao is None:
+        await cache.aadd(_chave_versao(empresa_id), 1, timeout=None)
+        versao = await cache.aget(_chave_versao(empresa_id), 1)
+    return versao
+
+
+async def aobter_da_empresa(empresa_id, nome, calcular):
+    """Async obter_da_empresa (same keys and entries); `calcular` is a coroutine function."""
+    cache = _cache()
+    chave = f'empresa:{empresa_id}:v{await aversao_empresa(empresa_id)}:{nome}'
+    valor = await cache.aget(chave)
+    if valor is not None:
+        _contar('hits')
+        return valor
+
+    _contar('misses')
+    valor = await calcular()
+    await cache.aset(chave, valor, timeout=settings.EMPRESA_CACHE_TIMEOUT)
+    return valor
@@ -0,0 +1,43 @@
+import threading
+
+from django.db import connections
+
+_lock = threading.Lock()
+_conexoes_abertas = {}
+
+
+def contar_conexao(alias):
+    """Called on connection_created: counts the real connections (TCP + auth) opened per alias."""
+    with _lock:
+        _conexoes_abertas[alias] = _conexoes_abertas.get(alias, 0) + 1
+
+
+def reset_estatisticas_banco():
+    with _lock:
+        _conexoes_abertas.clear()
+
+
+def estatisticas_banco():
+    """
+    Connection settings and counters of this process per database alias, plus the psycopg
+    pool stats (pool_size, pool_available, requests_waiting, ...) when DB_POOL is on.
+    """
+    with _lock:
+        abertas = dict(_conexoes_abertas)
+    resultado = {}
+    for alias in connections:
+        conexao = connections[alias]
+        dados = {
+            'vendor': conexao.vendor,
+            'conn_max_age': conexao.settings_dict['CONN_MAX_AGE'],
+            'conn_health_checks': conexao.settings_dict['CONN_HEALTH_CHECKS'],
+            'conexoes_abertas': abertas.get(alias, 0),
+            # Conexão da thread desta requisição, não do processo todo
+            'conexao_atual_aberta': conexao.connection is not None,
+            'pool': None,
+        }
+        pool = getattr(conexao, 'pool', None)
+        if pool is not None:
+            dados['pool'] = {'min_size': pool.min_size, 'max_size': pool.max_size, **pool.get_stats()}
+        resultado[alias] = dados
+    return resultado
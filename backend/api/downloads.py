@@ -0,0 +1,121 @@
+"""
+Serving of attachment files with HTTP caching and byte ranges.
+
+ETag is the SHA-256 of the content (or size and mtime for files stored before it was known),
+so If-None-Match/If-Match/If-Range work without reading the file. A single `Range: bytes=` is
+answered with 206 and multi-range requests with the whole file, as RFC 9110 allows. The body
+is a FileResponse over the open file: under gunicorn it goes out with sendfile(), including
+ranges (the file is positioned at the start of the range and Content-Length bounds it).
+
+With DOWNLOAD_ACCEL_REDIRECT set, Python only authorizes: the response carries an
+X-Accel-Redirect header and an empty body, and the front proxy (nginx) streams the file and
+handles ranges itself, so no worker is held by a slow download.
+"""
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, quote_etag
+
+INTERVALO = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class TrechoDeArquivo:
+    """File object limited to `tamanho` bytes from its current position (the body of a 206)."""
+
+    def __init__(self, arquivo, tamanho):
+        self.arquivo = arquivo
+        self.restante = tamanho
+
+    def read(self, tamanho=-1):
+        if tamanho is None or tamanho < 0 or tamanho > self.restante:
+            tamanho = self.restante
+        bloco = self.arquivo.read(tamanho)
+        self.restante -= len(bloco)
+        return bloco
+
+    def fileno(self):
+        return self.arquivo.fileno()
+
+    def close(self):
+        self.arquivo.close()
+
+
+def intervalo_pedido(cabecalho, tamanho):
+    """
+    (start, end) inclusive of a single `bytes=` range over a file of `tamanho` bytes, None to
+    serve the whole file (no/unsupported header) or raises ValueError if unsatisfiable.
+    """
+    casamento = INTERVALO.match((cabecalho or '').strip())
+    if casamento is None:
+        return None
+    inicio, fim = casamento.groups()
+    if not inicio and not fim:
+        return None
+    if not inicio:
+        # bytes=-N: os últimos N bytes
+        sufixo = int(fim)
+        if sufixo == 0:
+            raise ValueError(cabecalho)
+        return max(tamanho - sufixo, 0), tamanho - 1
+    inicio = int(inicio)
+    fim = min(int(fim), tamanho - 1) if fim else tamanho - 1
+    if inicio >= tamanho or fim < inicio:
+        raise ValueError(cabecalho)
+    return inicio, fim
+
+
+def servir_arquivo(request, arquivo):
+    """Response with the content of `arquivo` (an Arquivo) honoring conditional and Range headers."""
+    caminho = arquivo.arquivo.path
+    estado = os.stat(caminho)
+    etag = quote_etag(arquivo.sha256) if arquivo.sha256 else f'W/"{estado.st_size:x}-{int(estado.st_mtime):x}"'
+    cabecalhos = {
+        'ETag': etag,
+        'Last-Modified': http_date(estado.st_mtime),
+        'Accept-Ranges': 'bytes',
+        'Content-Type': arquivo.tipo_arquivo or 'application/octet-stream',
+        'Content-Disposition': content_disposition_header(True, arquivo.nome_arquivo),
+        # O conteúdo de um ETag forte nunca muda, mas o acesso depende de quem pede
+        'Cache-Control': 'private, max-age=3600',
+    }
+
+    condicional = get_conditional_response(request, etag=etag, last_modified=int(estado.st_mtime))
+    if condicional is not None:
+        for nome in ('ETag', 'Last-Modified', 'Cache-Control'):
+            condicional[nome] = cabecalhos[nome]
+        return condicional
+
+    if settings.DOWNLOAD_ACCEL_REDIRECT:
+        # O nginx atende o Range e calcula o Content-Length a partir do arquivo interno
+        response = HttpResponse(headers=cabecalhos)
+        response['X-Accel-Redirect'] = settings.DOWNLOAD_ACCEL_REDIRECT + quote(arquivo.arquivo.name)
+        return response
+
+    intervalo = None
+    se_intervalo = request.headers.get('If-Range')
+    if se_intervalo is None or se_intervalo == etag or se_intervalo == cabecalhos['Last-Modified']:
+        try:
+            intervalo = intervalo_pedido(request.headers.get('Range'), estado.st_size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{estado.st_size}'
+            return response
+
+    conteudo = open(caminho, 'rb')
+    if intervalo is None:
+        response = FileResponse(conteudo, content_type=cabecalhos['Content-Type'])
+        response['Content-Length'] = estado.st_size
+    else:
+        inicio, fim = intervalo
+        conteudo.seek(inicio)
+        response = FileResponse(TrechoDeArquivo(conteudo, fim - inicio + 1), status=206,
+                                content_type=cabecalhos['Content-Type'])
+        response['Content-Length'] = fim - inicio + 1
+        response['Content-Range'] = f'bytes {inicio}-{fim}/{estado.st_size}'
+    for nome, valor in cabecalhos.items():
+        response[nome] = valor
+    return response
@@ -0,0 +1,148 @@
+"""
+Bulk export of complaints as CSV or JSON Lines, streamed with constant memory.
+
+One query brings each complaint with its company, its consumer and its latest response (JOINs
+plus correlated subqueries over resposta_reclamacao_data_idx), read with a server-side cursor
+(`.iterator(chunk_size)`) in primary key order; rows are encoded and optionally gzip-compressed
+as they come, so neither the queryset nor the file is ever held in memory. The same generators
+feed the /reclamacoes/exportar/ StreamingHttpResponse and the exportar_reclamacoes command;
+under ASGI the response gets them through em_async, since Django collects a sync iterator into a
+list before streaming it there.
+"""
+import csv
+import zlib
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+from .models import Reclamacao, RespostaReclamacao
+
+CHUNK_SIZE = 2000
+FORMATOS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+}
+# Blocos menores que isso são agrupados antes de sair, para não gerar um chunk HTTP por linha
+TAMANHO_BLOCO = 64 * 1024
+
+# Colunas exportadas, nesta ordem: campos da reclamação, das tabelas ligadas e da última resposta
+CAMPOS = ('id', 'titulo', 'descricao', 'status', 'data_criacao', 'data_resolucao', 'empresa_id')
+CAMPOS_RELACIONADOS = {
+    'empresa_razao_social': 'empresa__razao_social',
+    'empresa_cnpj': 'empresa__cnpj',
+    'consumidor_id': 'usuario_consumidor_id',
+    'consumidor_nome': 'usuario_consumidor__usuario__nome',
+}
+CAMPOS_ULTIMA_RESPOSTA = {
+    'ultima_resposta_data': 'data_criacao',
+    'ultima_resposta_status': 'status_resolucao',
+    'ultima_resposta_descricao': 'descricao',
+}
+COLUNAS = (*CAMPOS, *CAMPOS_RELACIONADOS, *CAMPOS_ULTIMA_RESPOSTA)
+
+
+def filtrar(reclamacoes, empresa=None, status=None, desde=None, ate=None):
+    """Complaints of a company and/or status, created between the dates `desde` and `ate` (inclusive)."""
+    if empresa is not None:
+        reclamacoes = reclamacoes.filter(empresa_id=empresa)
+    if status:
+        reclamacoes = reclamacoes.filter(status=status)
+    # Limites como datetimes: data_criacao__date impediria o uso dos índices de data_criacao
+    if desde is not None:
+        reclamacoes = reclamacoes.filter(data_criacao__gte=timezone.make_aware(datetime.combine(desde, time.min)))
+    if ate is not None:
+        reclamacoes = reclamacoes.filter(
+            data_criacao__lt=timezone.make_aware(datetime.combine(ate + timedelta(days=1), time.min))
+        )
+    return reclamacoes
+
+
+def reclamacoes_para_exportar(reclamacoes=None):
+    """Values queryset with every column of COLUNAS, one row per complaint, in primary key order."""
+    if reclamacoes is None:
+        reclamacoes = Reclamacao.objects.all()
+    ultima_resposta = RespostaReclamacao.objects.filter(reclamacao=OuterRef('pk')).order_by('-data_criacao', '-id')
+    return reclamacoes.order_by('pk').values(
+        *CAMPOS,
+        **{nome: F(caminho) for nome, caminho in CAMPOS_RELACIONADOS.items()},
+        **{nome: Subquery(ultima_resposta.values(campo)[:1]) for nome, campo in CAMPOS_ULTIMA_RESPOSTA.items()},
+    )
+
+
+def _linhas(reclamacoes, chunk_size):
+    for linha in reclamacoes_para_exportar(reclamacoes).iterator(chunk_size=chunk_size):
+        yield {coluna: linha[coluna] for coluna in COLUNAS}
+
+
+class _Eco:
+    """File-like object whose write() returns what it got, so csv.writer produces strings."""
+
+    def write(self, valor):
+        return valor
+
+
+# Planilhas executam células que começam assim como fórmulas (CSV injection)
+INICIO_DE_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _celula(valor):
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    if isinstance(valor, str) and valor.startswith(INICIO_DE_FORMULA):
+        return "'" + valor
+    return valor
+
+
+def gerar_csv(reclamacoes=None, chunk_size=CHUNK_SIZE):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(COLUNAS)
+    for linha in _linhas(reclamacoes, chunk_size):
+        yield escritor.writerow([_celula(valor) for valor in linha.values()])
+
+
+def gerar_jsonl(reclamacoes=None, chunk_size=CHUNK_SIZE):
+    codificador = DjangoJSONEncoder(ensure_ascii=False)
+    for linha in _linhas(reclamacoes, chunk_size):
+        yield codificador.encode(linha) + '\n'
+
+
+GERADORES = {'csv': gerar_csv, 'jsonl': gerar_jsonl}
+
+
+def exportar(formato, reclamacoes=None, compactar=False, chunk_size=CHUNK_SIZE):
+    """Bytes of the export, in blocks of about TAMANHO_BLOCO, gzip-compressed when `compactar`."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if compactar else None
+    pendente = []
+    tamanho = 0
+    for texto in GERADORES[formato](reclamacoes, chunk_size):
+        bloco = texto.encode()
+        if compressor is not None:
+            bloco = compressor.compress(bloco)
+        pendente.append(bloco)
+        tamanho += len(bloco)
+        if tamanho >= TAMANHO_BLOCO:
+            yield b''.join(pendente)
+            pendente, tamanho = [], 0
+    if compressor is not None:
+        pendente.append(compressor.flush())
+    if pendente:
+        yield b''.join(pendente)
+
+
+async def em_async(blocos):
+    """
+    Async iterator over the sync iterator `blocos`, pulling one block at a time on the sync
+    thread (where its database cursor lives), so an ASGI response streams it as it is produced.
+    """
+    blocos = iter(blocos)
+    fim = object()
+    try:
+        while (bloco := await sync_to_async(next)(blocos, fim)) is not fim:
+            yield bloco
+    finally:
+        # Cliente desconectou no meio: fecha o gerador (e o cursor) na mesma thread
+        if hasattr(blocos, 'close'):
+            await sync_to_async(blocos.close)()
@@ -0,0 +1,158 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework.permissions import SAFE_METHODS
+
+
+def parametro_lista(request, nome):
+    """Comma-separated query param as a set ('?fields=a,b&fields=c' -> {'a', 'b', 'c'})."""
+    if request is None:
+        return set()
+    valores = set()
+    for valor in request.query_params.getlist(nome):
+        valores.update(item.strip() for item in valor.split(',') if item.strip())
+    return valores
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin that lets the client choose the fields of the response:
+
+    - ?fields=a,b: only those fields are rendered;
+    - ?omit=a,b: those fields are not rendered;
+    - Meta.expandable_fields: heavy fields left out by default, rendered only when named in
+      ?expand=a,b (or in ?fields=).
+
+    The selection comes from the request in the serializer context, so nested serializers
+    and serializers built without a request always render their default fields. On writes the
+    writable fields stay in the serializer (so input is still validated) and are only dropped
+    from the output.
+
+    Meta.field_dependencies maps fields whose source is not a model path (SerializerMethodField,
+    source='*') to the lookups they read, so SparseFieldsetViewMixin can prune the queryset.
+    """
+    fields_query_param = 'fields'
+    omit_query_param = 'omit'
+    expand_query_param = 'expand'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        selecionados = parametro_lista(request, self.fields_query_param)
+        omitidos = parametro_lista(request, self.omit_query_param)
+        expandidos = parametro_lista(request, self.expand_query_param) | selecionados
+        expansiveis = set(getattr(self.Meta, 'expandable_fields', ()))
+
+        self.campos_fora_da_saida = set()
+        for nome in list(self.fields):
+            if nome in expansiveis:
+                fora = nome not in expandidos
+            else:
+                fora = bool(selecionados) and nome not in selecionados
+            if fora or nome in omitidos:
+                self.campos_fora_da_saida.add(nome)
+
+        leitura = request is None or request.method in SAFE_METHODS
+        for nome in list(self.campos_fora_da_saida):
+            if leitura or self.fields[nome].read_only:
+                self.fields.pop(nome)
+                self.campos_fora_da_saida.discard(nome)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        for nome in self.campos_fora_da_saida:
+            data.pop(nome, None)
+        return data
+
+    def get_field_dependencies(self):
+        """
+        Lookups read by the rendered fields ('titulo', 'empresa__razao_social', 'arquivos'),
+        or None when some field reads something that cannot be known.
+        """
+        declaradas = getattr(self.Meta, 'field_dependencies', {})
+        dependencias = set()
+        for nome, campo in self.fields.items():
+            if campo.write_only or nome in self.campos_fora_da_saida:
+                continue
+            if nome in declaradas:
+                dependencias.update(declaradas[nome])
+            elif campo.source == '*':
+                return None
+            else:
+                dependencias.add('__'.join(campo.source_attrs))
+        return dependencias
+
+
+def _nome_do_prefetch(lookup):
+    return (lookup.prefetch_to if isinstance(lookup, Prefetch) else lookup).split('__')[0]
+
+
+def podar_queryset(queryset, dependencias):
+    """
+    Restricts `queryset` to what `dependencias` (see get_field_dependencies) reads: only() on
+    the columns, select_related() on the forward relations crossed and only the prefetches
+    used. Returns the queryset unchanged when a dependency cannot be resolved.
+    """
+    model = queryset.model
+    colunas = {model._meta.pk.name}
+    relacoes = set()
+    prefetches = set()
+    prefetch_existentes = {_nome_do_prefetch(lookup) for lookup in queryset._prefetch_related_lookups}
+
+    for dependencia in dependencias:
+        atual, caminho = model, []
+        partes = dependencia.split('__')
+        for indice, parte in enumerate(partes):
+            if parte == 'pk':
+                parte = atual._meta.pk.name
+            try:
+                campo = atual._meta.get_field(parte)
+            except FieldDoesNotExist:
+                # Prefetch com to_attr ou anotação do queryset: não são colunas
+                if indice == 0 and (parte in prefetch_existentes or parte in queryset.query.annotations):
+                    prefetches.add(parte)
+                    break
+                return queryset
+            if campo.many_to_many or campo.one_to_many:
+                # Relação reversa ou M2M: vem de um prefetch, que só precisa da pk desta tabela
+                if indice > 0:
+                    return queryset
+                prefetches.add(parte)
+                break
+            if campo.is_relation and not campo.concrete:
+                return queryset  # OneToOne reverso: fica fora da poda
+            caminho.append(parte)
+            colunas.add('__'.join(caminho))
+            if not campo.is_relation:
+                break
+            if indice < len(partes) - 1:
+                relacoes.add('__'.join(caminho))
+                atual = campo.related_model
+
+    queryset = queryset.select_related(None)
+    if relacoes:
+        queryset = queryset.select_related(*relacoes)
+    manter = [lookup for lookup in queryset._prefetch_related_lookups if _nome_do_prefetch(lookup) in prefetches]
+    return queryset.prefetch_related(None).prefetch_related(*manter).only(*colunas)
+
+
+class SparseFieldsetViewMixin:
+    """
+    View mixin that prunes the queryset of reads (GET) to the fields the serializer will render,
+    so fields left out by ?fields=/?omit= cost neither columns, JOINs nor prefetch queries.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+        serializer = self.get_serializer()
+        if not hasattr(serializer, 'get_field_dependencies'):
+            return queryset
+        dependencias = serializer.get_field_dependencies()
+        if dependencias is None:
+            return queryset
+
+        # A paginação por cursor lê os campos do keyset de cada linha
+        paginacao = getattr(self, 'pagination_class', None)
+        dependencias |= {campo.lstrip('-') for campo in getattr(paginacao, 'keyset_ordering', ())}
+        return podar_queryset(queryset, dependencias)
@@ -0,0 +1,43 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+_lock = threading.Lock()
+_pool = None
+
+
+class HashIndisponivel(Exception):
+    """The hashing pool and its queue are full; the login should be retried in a moment."""
+
+
+def _executor_e_vagas():
+    # Criado no primeiro uso, já dentro do processo do worker (nunca antes de um fork)
+    global _pool
+    with _lock:
+        if _pool is None:
+            workers = settings.LOGIN_HASH_WORKERS
+            _pool = (
+                ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hash-senha'),
+                threading.BoundedSemaphore(workers + settings.LOGIN_HASH_FILA),
+            )
+    return _pool
+
+
+def executar_hash(funcao, *args):
+    """
+    Runs a password hashing call (make_password, verify_password) on the bounded hashing pool
+    and waits for the result. Only the hash leaves the request thread: queries stay on the
+    request's own connection. Raises HashIndisponivel when the pool and its queue are full;
+    the API login views answer it with 429 and the admin login with a form error.
+    """
+    if settings.LOGIN_HASH_WORKERS <= 0:
+        return funcao(*args)
+
+    executor, vagas = _executor_e_vagas()
+    if not vagas.acquire(blocking=False):
+        raise HashIndisponivel()
+    try:
+        return executor.submit(funcao, *args).result()
+    finally:
+        vagas.release()
@@ -0,0 +1,101 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from api.armazenamento import eh_blob
+from api.models import Arquivo
+from api.uploads import DIRETORIO_ARQUIVOS
+
+
+def formatar_bytes(valor):
+    if abs(valor) < 1024:
+        return f'{valor} B'
+    for unidade in ('KiB', 'MiB', 'GiB', 'TiB'):
+        valor /= 1024
+        if abs(valor) < 1024 or unidade == 'TiB':
+            return f'{valor:.1f} {unidade}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Relata a economia de disco do armazenamento por conteúdo dos anexos (bytes anexados x bytes '
+        'em disco). Com --migrar move os arquivos antigos para o armazenamento por conteúdo; com '
+        '--coletar apaga os blobs que nenhum anexo referencia.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--migrar', action='store_true',
+                            help='Move os anexos gravados antes do armazenamento por conteúdo, preenchendo sha256 e tamanho.')
+        parser.add_argument('--coletar', action='store_true',
+                            help='Apaga os arquivos sem referência (respeitando ARQUIVOS_GC_CARENCIA).')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        self.storage = Arquivo._meta.get_field('arquivo').storage
+        if options['migrar']:
+            self.migrar(options['batch_size'])
+        if options['coletar']:
+            self.coletar()
+        self.relatar()
+
+    def arquivos_em_disco(self):
+        """Name (in the storage) -> size of every file under the attachments directory."""
+        raiz = self.storage.path(DIRETORIO_ARQUIVOS)
+        arquivos = {}
+        for diretorio, subdiretorios, nomes in os.walk(raiz):
+            # Partes de uploads em andamento e pré-visualizações não são anexos
+            subdiretorios[:] = [nome for nome in subdiretorios if nome not in ('.partes', '.previews')]
+            for nome in nomes:
+                caminho = os.path.join(diretorio, nome)
+                relativo = os.path.relpath(caminho, self.storage.location).replace(os.sep, '/')
+                arquivos[relativo] = os.path.getsize(caminho)
+        return arquivos
+
+    def migrar(self, batch_size):
+        antigos = Arquivo.objects.exclude(arquivo='').only('pk', 'arquivo', 'sha256', 'tamanho')
+        migrados = 0
+        for arquivo in antigos.iterator(chunk_size=batch_size):
+            if eh_blob(arquivo.arquivo.name) and arquivo.sha256:
+                continue
+            if not self.storage.exists(arquivo.arquivo.name):
+                self.stdout.write(self.style.WARNING(f'Anexo {arquivo.pk}: {arquivo.arquivo.name} não existe.'))
+                continue
+            antigo = arquivo.arquivo.name
+            with self.storage.open(antigo, 'rb') as conteudo:
+                novo = self.storage.save(antigo, conteudo)
+                arquivo.sha256 = conteudo.sha256
+            arquivo.tamanho = self.storage.size(novo)
+            Arquivo.objects.filter(pk=arquivo.pk).update(arquivo=novo, sha256=arquivo.sha256, tamanho=arquivo.tamanho)
+            if novo != antigo and not Arquivo.objects.filter(arquivo=antigo).exists():
+                self.storage.delete(antigo)
+            migrados += 1
+        self.stdout.write(f'{migrados} anexo(s) migrado(s).')
+
+    def coletar(self):
+        referenciados = set(Arquivo.objects.values_list('arquivo', flat=True).distinct())
+        apagados = liberados = 0
+        for nome, tamanho in self.arquivos_em_disco().items():
+            if nome not in referenciados and self.storage.apagar_se_antigo(nome):
+                apagados += 1
+                liberados += tamanho
+        self.stdout.write(f'{apagados} arquivo(s) sem referência apagado(s), {formatar_bytes(liberados)} liberados.')
+
+    def relatar(self):
+        em_disco = self.arquivos_em_disco()
+        anexos = Arquivo.objects.exclude(arquivo='').values_list('arquivo', 'tamanho')
+        total_anexos = bytes_anexados = 0
+        referenciados = set()
+        for nome, tamanho in anexos.iterator():
+            total_anexos += 1
+            bytes_anexados += tamanho if tamanho is not None else em_disco.get(nome, 0)
+            referenciados.add(nome)
+        bytes_em_disco = sum(em_disco[nome] for nome in referenciados if nome in em_disco)
+        orfaos = {nome: tamanho for nome, tamanho in em_disco.items() if nome not in referenciados}
+        economia = bytes_anexados - bytes_em_disco
+
+        self.stdout.write(f'Anexos: {total_anexos} ({formatar_bytes(bytes_anexados)})')
+        self.stdout.write(f'Arquivos em disco referenciados: {len(referenciados & em_disco.keys())} '
+                          f'({formatar_bytes(bytes_em_disco)})')
+        percentual = economia / bytes_anexados * 100 if bytes_anexados else 0
+        self.stdout.write(self.style.SUCCESS(f'Economia: {formatar_bytes(economia)} ({percentual:.1f}%)'))
+        self.stdout.write(f'Sem referência: {len(orfaos)} ({formatar_bytes(sum(orfaos.values()))})')
@@ -0,0 +1,51 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.exportacao import CHUNK_SIZE, FORMATOS, exportar, filtrar
+from api.models import Reclamacao
+from api.routers import ler_da_replica
+
+
+class Command(BaseCommand):
+    help = (
+        'Exporta as reclamações (com empresa, consumidor e última resposta) em CSV ou JSON Lines, '
+        'lendo com cursor no servidor e gravando em streaming, com memória constante.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', choices=list(FORMATOS), default='csv')
+        parser.add_argument('--saida', default='-',
+                            help='Arquivo de saída (padrão: a saída padrão). Terminado em .gz é compactado.')
+        parser.add_argument('--gzip', action='store_true', help='Compacta a saída com gzip.')
+        parser.add_argument('--empresa', type=int, help='Só as reclamações desta empresa.')
+        parser.add_argument('--status', choices=Reclamacao.StatusReclamacao.values)
+        parser.add_argument('--desde', type=date.fromisoformat, help='Criadas a partir desta data (AAAA-MM-DD).')
+        parser.add_argument('--ate', type=date.fromisoformat, help='Criadas até esta data, inclusive.')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help=f'Linhas buscadas por vez no cursor (padrão: {CHUNK_SIZE}).')
+
+    def handle(self, *args, **options):
+        if options['desde'] and options['ate'] and options['desde'] > options['ate']:
+            raise CommandError('A data final deve ser igual ou posterior à inicial.')
+        compactar = options['gzip'] or options['saida'].endswith('.gz')
+        reclamacoes = filtrar(
+            Reclamacao.objects.all(), empresa=options['empresa'], status=options['status'],
+            desde=options['desde'], ate=options['ate'],
+        )
+
+        para_arquivo = options['saida'] != '-'
+        saida = open(options['saida'], 'wb') if para_arquivo else sys.stdout.buffer
+        try:
+            # Só leitura: pode rodar numa réplica (DB_REPLICAS) sem carregar o primário
+            with ler_da_replica():
+                for bloco in exportar(options['formato'], reclamacoes, compactar, options['chunk_size']):
+                    saida.write(bloco)
+        finally:
+            if para_arquivo:
+                saida.close()
+            else:
+                saida.flush()
+        if para_arquivo:
+            self.stdout.write(self.style.SUCCESS(f'Exportação gravada em {options["saida"]}.'))
@@ -0,0 +1,42 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Administrador
+from api.relatorios import AGRUPAMENTOS, gerar_relatorio
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera um Relatorio de reclamações (por empresa, status e período, percentis do tempo de '
+        'resolução e empresas mais reclamadas) a partir dos rollups diários, sem ler Reclamacao.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inicio', type=date.fromisoformat, required=True, help='Data inicial (AAAA-MM-DD).')
+        parser.add_argument('--fim', type=date.fromisoformat, help='Data final, inclusive (padrão: hoje).')
+        parser.add_argument('--titulo', help='Título do relatório (padrão: o período).')
+        parser.add_argument('--agrupamento', choices=list(AGRUPAMENTOS), default='mes')
+        parser.add_argument('--empresa', type=int, action='append', dest='empresas',
+                            help='ID da empresa (pode ser repetido). Padrão: todas.')
+        parser.add_argument('--top', type=int, default=10, help='Quantas empresas mais reclamadas listar.')
+        parser.add_argument('--administrador', type=int, help='ID do administrador autor do relatório.')
+        parser.add_argument('--imprimir', action='store_true', help='Escreve o conteúdo (JSON) na saída.')
+
+    def handle(self, *args, **options):
+        fim = options['fim'] or date.today()
+        if options['inicio'] > fim:
+            raise CommandError('A data final deve ser igual ou posterior à inicial.')
+        administrador = None
+        if options['administrador'] is not None:
+            administrador = Administrador.objects.filter(pk=options['administrador']).first()
+            if administrador is None:
+                raise CommandError(f'Administrador {options["administrador"]} não encontrado.')
+
+        relatorio = gerar_relatorio(
+            options['inicio'], fim, titulo=options['titulo'], administrador=administrador,
+            agrupamento=options['agrupamento'], empresas=options['empresas'], top=options['top'],
+        )
+        if options['imprimir']:
+            self.stdout.write(relatorio.conteudo)
+        self.stdout.write(self.style.SUCCESS(f'Relatório {relatorio.pk} gerado: {relatorio.titulo}'))
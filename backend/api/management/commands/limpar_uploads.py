@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import UploadArquivo
+from api.uploads import descartar_partes
+
+
+class Command(BaseCommand):
+    help = (
+        'Descarta os envios em partes não concluídos há mais de UPLOAD_EXPIRACAO_HORAS horas, '
+        'apagando as partes gravadas em disco.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horas', type=float, default=None,
+                            help='Idade mínima, em horas, do envio descartado. Padrão: UPLOAD_EXPIRACAO_HORAS.')
+
+    def handle(self, *args, **options):
+        horas = options['horas'] if options['horas'] is not None else settings.UPLOAD_EXPIRACAO_HORAS
+        expirados = list(UploadArquivo.objects.filter(data_criacao__lt=timezone.now() - timedelta(hours=horas)))
+        for upload in expirados:
+            descartar_partes(upload)
+            upload.delete()
+        self.stdout.write(self.style.SUCCESS(f'{len(expirados)} envio(s) descartado(s).'))
@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.stats import process_dirty_companies
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula as estatísticas das empresas marcadas como pendentes pelos signals '
+        '(ESTATISTICAS_MAX_STALENESS > 0). Com --loop fica rodando como worker.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Empresas recalculadas por lote (padrão: 100).')
+        parser.add_argument('--loop', action='store_true',
+                            help='Continua esvaziando a fila a cada janela em vez de sair.')
+        parser.add_argument('--interval', type=float, default=None,
+                            help='Segundos entre execuções com --loop. '
+                                 'Padrão: metade de ESTATISTICAS_MAX_STALENESS (mínimo 1).')
+
+    def handle(self, *args, **options):
+        intervalo = options['interval']
+        if intervalo is None:
+            intervalo = max(settings.ESTATISTICAS_MAX_STALENESS / 2, 1)
+
+        while True:
+            processadas = self.esvaziar_fila(options['batch_size'])
+            if processadas:
+                self.stdout.write(f'{processadas} empresa(s) recalculada(s).')
+            if not options['loop']:
+                break
+            time.sleep(intervalo)
+
+    def esvaziar_fila(self, batch_size):
+        total = 0
+        while True:
+            processadas = process_dirty_companies(batch_size)
+            total += processadas
+            if processadas < batch_size:
+                return total
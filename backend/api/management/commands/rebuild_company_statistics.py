@@ -0,0 +1,78 @@
+import math
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min, OuterRef, Subquery
+
+from api.models import EstatisticaEmpresa, Reclamacao, RespostaReclamacao, UsuarioEmpresa
+from api.rollups import reconstruir_rollups
+from api.routers import ler_da_replica
+from api.stats import CAMPOS_CONTADORES, calculate_companies_statistics, update_companies_statistics
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula do zero as estatísticas (EstatisticaEmpresa) mantidas incrementalmente pelos signals. '
+        'Com --verify apenas compara os contadores gravados com o recálculo, sem alterar nada.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, action='append', dest='empresas',
+                            help='ID da empresa (pode ser repetido). Padrão: todas.')
+        parser.add_argument('--verify', action='store_true',
+                            help='Só verifica; termina com erro se algum contador estiver divergente.')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Empresas calculadas por query agrupada (padrão: 500).')
+
+    def handle(self, *args, **options):
+        empresas = UsuarioEmpresa.objects.all()
+        if options['empresas']:
+            empresas = empresas.filter(pk__in=options['empresas'])
+
+        if options['verify']:
+            # Só leitura: pode rodar numa réplica (DB_REPLICAS) sem carregar o primário
+            with ler_da_replica():
+                self.verificar(empresas, options['batch_size'])
+            return
+
+        self.sincronizar_datas_resolucao(empresas)
+        total = 0
+        for lote in self.lotes(empresas, options['batch_size']):
+            update_companies_statistics(lote)
+            # As datas de resolução foram corrigidas acima sem signals: os rollups também mudam
+            reconstruir_rollups(lote)
+            total += len(lote)
+        self.stdout.write(self.style.SUCCESS(f'Estatísticas e rollups reconstruídos para {total} empresa(s).'))
+
+    def sincronizar_datas_resolucao(self, empresas):
+        primeira_resolucao = RespostaReclamacao.objects.filter(
+            reclamacao=OuterRef('pk'), status_resolucao=RespostaReclamacao.StatusResolucao.RESOLVIDA
+        ).values('reclamacao').annotate(primeira=Min('data_criacao')).values('primeira')
+        # update() não dispara signals: os contadores são recalculados logo em seguida
+        Reclamacao.objects.filter(empresa__in=empresas).update(data_resolucao=Subquery(primeira_resolucao))
+
+    def lotes(self, empresas, batch_size):
+        ids = list(empresas.order_by('pk').values_list('pk', flat=True))
+        for inicio in range(0, len(ids), batch_size):
+            yield ids[inicio:inicio + batch_size]
+
+    def verificar(self, empresas, batch_size):
+        divergentes = 0
+        for lote in self.lotes(empresas, batch_size):
+            gravadas = EstatisticaEmpresa.objects.in_bulk(lote)
+            for empresa_id, esperado in calculate_companies_statistics(lote).items():
+                stats = gravadas.get(empresa_id)
+                if stats is None:
+                    divergentes += 1
+                    self.stdout.write(self.style.WARNING(f'Empresa {empresa_id}: sem linha de estatísticas.'))
+                    continue
+                for campo in CAMPOS_CONTADORES + ('media_tempo_resolucao',):
+                    gravado = getattr(stats, campo)
+                    if not math.isclose(gravado, esperado[campo], rel_tol=1e-6, abs_tol=1e-6):
+                        divergentes += 1
+                        self.stdout.write(self.style.WARNING(
+                            f'Empresa {empresa_id}: {campo} gravado={gravado} esperado={esperado[campo]}'
+                        ))
+
+        if divergentes:
+            raise CommandError(f'{divergentes} contador(es) divergente(s). Rode o comando sem --verify para corrigir.')
+        self.stdout.write(self.style.SUCCESS('Todos os contadores conferem.'))
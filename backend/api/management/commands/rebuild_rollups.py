@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Reclamacao, UsuarioEmpresa
+from api.rollups import ROLLUPS, calcular_rollups, reconstruir_rollups
+from api.routers import ler_da_replica
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula do zero os rollups diários e semanais (ReclamacaoDiaria, ResolucaoDiaria, '
+        'ReclamacaoSemanal, ResolucaoSemanal) mantidos incrementalmente pelos signals. Serve de '
+        'backfill para empresas com histórico. Com --verify apenas compara, sem alterar nada.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, action='append', dest='empresas',
+                            help='ID da empresa (pode ser repetido). Padrão: todas.')
+        parser.add_argument('--verify', action='store_true',
+                            help='Só verifica; termina com erro se alguma linha estiver divergente.')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Empresas reconstruídas por transação (padrão: 100).')
+
+    def handle(self, *args, **options):
+        empresas = UsuarioEmpresa.objects.order_by('pk')
+        if options['empresas']:
+            empresas = empresas.filter(pk__in=options['empresas'])
+        ids = list(empresas.values_list('pk', flat=True))
+        lotes = [ids[inicio:inicio + options['batch_size']] for inicio in range(0, len(ids), options['batch_size'])]
+
+        if options['verify']:
+            with ler_da_replica():
+                divergentes = sum(self.verificar(lote) for lote in lotes)
+            if divergentes:
+                raise CommandError(f'{divergentes} linha(s) divergente(s). Rode o comando sem --verify para corrigir.')
+            self.stdout.write(self.style.SUCCESS('Todos os rollups conferem.'))
+            return
+
+        linhas = sum(reconstruir_rollups(lote) for lote in lotes)
+        self.stdout.write(self.style.SUCCESS(f'Rollups reconstruídos para {len(ids)} empresa(s): {linhas} linha(s).'))
+
+    def verificar(self, empresa_ids):
+        esperado = {
+            chave: dict(contadores)
+            for chave, contadores in calcular_rollups(Reclamacao.objects.filter(empresa_id__in=empresa_ids)).items()
+        }
+        gravado = {}
+        for modelo, campos_chave in ROLLUPS.items():
+            contadores = [campo.attname for campo in modelo._meta.concrete_fields
+                          if campo.attname not in campos_chave and not campo.primary_key]
+            for linha in modelo.objects.filter(empresa_id__in=empresa_ids, total__gt=0).values(*campos_chave, *contadores):
+                chave = tuple((campo, linha[campo]) for campo in campos_chave)
+                gravado[(modelo, chave)] = {campo: linha[campo] for campo in contadores}
+
+        divergentes = 0
+        for linha in esperado.keys() | gravado.keys():
+            valores_esperados, valores_gravados = esperado.get(linha), gravado.get(linha)
+            if not self.confere(valores_esperados, valores_gravados):
+                divergentes += 1
+                modelo, chave = linha
+                self.stdout.write(self.style.WARNING(
+                    f'{modelo.__name__} {dict(chave)}: gravado={valores_gravados} esperado={valores_esperados}'
+                ))
+        return divergentes
+
+    def confere(self, esperado, gravado):
+        if esperado is None or gravado is None:
+            return esperado == gravado
+        return all(abs(gravado[campo] - valor) <= 1e-6 * max(1, abs(valor)) for campo, valor in esperado.items())
@@ -0,0 +1,74 @@
+import hashlib
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.decorators import sync_and_async_middleware
+
+from .routers import encerrar_leitura_em_replica, iniciar_leitura_em_replica
+
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS')
+COOKIE_PRIMARIO = 'ler_do_primario'
+
+
+def _chave_do_cliente(request):
+    """Cache key of the client: its Authorization header (hashed, like the token cache)."""
+    autorizacao = request.META.get('HTTP_AUTHORIZATION')
+    if not autorizacao:
+        return None
+    return 'primario:' + hashlib.sha256(autorizacao.encode()).hexdigest()
+
+
+def _cache():
+    return caches[settings.TOKEN_CACHE_ALIAS]
+
+
+def _deve_ler_da_replica(request):
+    if request.method not in METODOS_SEGUROS:
+        return False
+    if request.COOKIES.get(COOKIE_PRIMARIO):
+        return False
+    chave = _chave_do_cliente(request)
+    return chave is None or not _cache().get(chave)
+
+
+def _lembrar_escrita(request, response):
+    """After a write, the same client reads from the primary for DB_READ_YOUR_WRITES seconds."""
+    janela = settings.READ_YOUR_WRITES_SECONDS
+    if janela <= 0:
+        return
+    chave = _chave_do_cliente(request)
+    if chave is not None:
+        _cache().set(chave, True, timeout=janela)
+    response.set_cookie(COOKIE_PRIMARIO, '1', max_age=janela, httponly=True, samesite='Lax')
+
+
+@sync_and_async_middleware
+def leitura_em_replica_middleware(get_response):
+    """
+    Reads of GET/HEAD/OPTIONS requests go to the replicas (api.routers.ReplicaRouter); other
+    methods and clients that wrote in the last READ_YOUR_WRITES_SECONDS read from the primary.
+    The client is recognised by its Authorization header (token) and, for browsers and anonymous
+    clients, by a short-lived cookie.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = iniciar_leitura_em_replica(_deve_ler_da_replica(request))
+            try:
+                response = await get_response(request)
+            finally:
+                escreveu = encerrar_leitura_em_replica(token)
+            if escreveu:
+                _lembrar_escrita(request, response)
+            return response
+    else:
+        def middleware(request):
+            token = iniciar_leitura_em_replica(_deve_ler_da_replica(request))
+            try:
+                response = get_response(request)
+            finally:
+                escreveu = encerrar_leitura_em_replica(token)
+            if escreveu:
+                _lembrar_escrita(request, response)
+            return response
+    return middleware
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:00
+
+from django.db import migrations, models
+from django.db.models import Min, OuterRef, Subquery
+
+
+def preencher_contadores(apps, schema_editor):
+    Reclamacao = apps.get_model('api', 'Reclamacao')
+    RespostaReclamacao = apps.get_model('api', 'RespostaReclamacao')
+    EstatisticaEmpresa = apps.get_model('api', 'EstatisticaEmpresa')
+
+    primeira_resolucao = RespostaReclamacao.objects.filter(
+        reclamacao=OuterRef('pk'), status_resolucao='RESOLVIDA'
+    ).values('reclamacao').annotate(primeira=Min('data_criacao')).values('primeira')
+    Reclamacao.objects.update(data_resolucao=Subquery(primeira_resolucao))
+
+    for stats in EstatisticaEmpresa.objects.all():
+        reclamacoes = Reclamacao.objects.filter(empresa_id=stats.usuario_empresa_id)
+        stats.total_reclamacoes = reclamacoes.count()
+        stats.reclamacoes_resolvidas = reclamacoes.filter(status='ENCERRADA').count()
+        stats.reclamacoes_pendentes = stats.total_reclamacoes - stats.reclamacoes_resolvidas
+        stats.soma_tempo_resolucao = 0.0
+        stats.reclamacoes_com_tempo_resolucao = 0
+        medidas = reclamacoes.filter(status='ENCERRADA', data_resolucao__isnull=False)
+        for data_criacao, data_resolucao in medidas.values_list('data_criacao', 'data_resolucao').iterator():
+            stats.soma_tempo_resolucao += (data_resolucao - data_criacao).total_seconds() / 3600
+            stats.reclamacoes_com_tempo_resolucao += 1
+        if stats.reclamacoes_com_tempo_resolucao:
+            stats.media_tempo_resolucao = stats.soma_tempo_resolucao / stats.reclamacoes_com_tempo_resolucao
+        else:
+            stats.media_tempo_resolucao = 0.0
+        stats.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_alter_reclamacao_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='estatisticaempresa',
+            name='reclamacoes_com_tempo_resolucao',
+            field=models.IntegerField(default=0, help_text='Reclamações encerradas que entram na média de tempo de resolução'),
+        ),
+        migrations.AddField(
+            model_name='estatisticaempresa',
+            name='soma_tempo_resolucao',
+            field=models.FloatField(default=0.0, help_text='Soma dos tempos de resolução em horas'),
+        ),
+        migrations.AddField(
+            model_name='reclamacao',
+            name='data_resolucao',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(preencher_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_estatisticas_incrementais'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstatisticaEmpresaPendente',
+            fields=[
+                ('usuario_empresa', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='api.usuarioempresa')),
+                ('data_marcacao', models.DateTimeField(auto_now_add=True, help_text='Quando a empresa entrou na fila')),
+                ('data_atualizacao', models.DateTimeField(help_text='Última alteração que marcou a empresa')),
+            ],
+            options={
+                'verbose_name': 'Estatística pendente',
+                'verbose_name_plural': 'Estatísticas pendentes',
+            },
+        ),
+    ]
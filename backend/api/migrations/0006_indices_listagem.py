@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_estatisticaempresapendente'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reclamacao',
+            index=models.Index(fields=['-data_criacao'], name='reclamacao_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reclamacao',
+            index=models.Index(fields=['empresa', '-data_criacao'], name='reclamacao_empresa_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reclamacao',
+            index=models.Index(fields=['empresa', 'status', '-data_criacao'], name='reclamacao_emp_status_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reclamacao',
+            index=models.Index(fields=['usuario_consumidor', '-data_criacao'], name='reclamacao_consum_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='respostareclamacao',
+            index=models.Index(fields=['reclamacao', '-data_criacao'], name='resposta_reclamacao_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='respostareclamacao',
+            index=models.Index(fields=['reclamacao', 'status_resolucao', 'data_criacao'], name='resposta_recl_status_data_idx'),
+        ),
+    ]
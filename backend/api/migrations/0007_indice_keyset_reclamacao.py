@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_indices_listagem'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='reclamacao',
+            name='reclamacao_data_idx',
+        ),
+        migrations.AddIndex(
+            model_name='reclamacao',
+            index=models.Index(fields=['-data_criacao', '-id'], name='reclamacao_data_id_idx'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:09
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+
+# Cópia de api.search.normalizar_texto/somente_digitos na data desta migração
+def normalizar_texto(texto):
+    if not texto:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', texto)
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return re.sub(r'\s+', ' ', sem_acentos.casefold()).strip()
+
+
+def somente_digitos(texto):
+    return re.sub(r'\D', '', texto or '')
+
+
+def preencher_campos_busca(apps, schema_editor):
+    UsuarioEmpresa = apps.get_model('api', 'UsuarioEmpresa')
+    empresas = []
+    for empresa in UsuarioEmpresa.objects.only('pk', 'cnpj', 'razao_social', 'nome_social').iterator():
+        empresa.busca_nome = normalizar_texto(' '.join(filter(None, [empresa.razao_social, empresa.nome_social])))[:511]
+        empresa.cnpj_digitos = somente_digitos(empresa.cnpj)
+        empresas.append(empresa)
+    UsuarioEmpresa.objects.bulk_update(empresas, ['busca_nome', 'cnpj_digitos'], batch_size=1000)
+
+
+def criar_indice_trigram(apps, schema_editor):
+    # Só no Postgres: índice GIN de trigramas atende LIKE '%termo%' em busca_nome
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS empresa_busca_nome_trgm_idx '
+        'ON api_usuarioempresa USING gin (busca_nome gin_trgm_ops)'
+    )
+
+
+def remover_indice_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS empresa_busca_nome_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_indice_keyset_reclamacao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuarioempresa',
+            name='busca_nome',
+            field=models.CharField(blank=True, default='', editable=False, max_length=511),
+        ),
+        migrations.AddField(
+            model_name='usuarioempresa',
+            name='cnpj_digitos',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=18),
+        ),
+        migrations.RunPython(preencher_campos_busca, migrations.RunPython.noop),
+        migrations.RunPython(criar_indice_trigram, remover_indice_trigram),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:11
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+
+# Cópia de api.search.normalizar_texto na data desta migração
+def normalizar_texto(texto):
+    if not texto:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', texto)
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return re.sub(r'\s+', ' ', sem_acentos.casefold()).strip()
+
+
+def preencher_campos_busca(apps, schema_editor):
+    Reclamacao = apps.get_model('api', 'Reclamacao')
+    lote = []
+    for reclamacao in Reclamacao.objects.only('pk', 'titulo', 'descricao').iterator(chunk_size=2000):
+        reclamacao.busca_titulo = normalizar_texto(reclamacao.titulo)[:200]
+        reclamacao.busca_texto = normalizar_texto(f'{reclamacao.titulo} {reclamacao.descricao}')
+        lote.append(reclamacao)
+        if len(lote) >= 2000:
+            Reclamacao.objects.bulk_update(lote, ['busca_titulo', 'busca_texto'])
+            lote = []
+    Reclamacao.objects.bulk_update(lote, ['busca_titulo', 'busca_texto'])
+
+
+def criar_indice_trigram(apps, schema_editor):
+    # Só no Postgres: índice GIN de trigramas atende LIKE '%termo%' em busca_texto
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS reclamacao_busca_texto_trgm_idx '
+        'ON api_reclamacao USING gin (busca_texto gin_trgm_ops)'
+    )
+
+
+def remover_indice_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS reclamacao_busca_texto_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_busca_empresas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reclamacao',
+            name='busca_texto',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='reclamacao',
+            name='busca_titulo',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(preencher_campos_busca, migrations.RunPython.noop),
+        migrations.RunPython(criar_indice_trigram, remover_indice_trigram),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:49
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_busca_reclamacoes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='arquivo',
+            name='sha256',
+            field=models.CharField(blank=True, help_text='SHA-256 do conteúdo', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='arquivo',
+            name='tamanho',
+            field=models.BigIntegerField(blank=True, help_text='Tamanho em bytes', null=True),
+        ),
+        migrations.CreateModel(
+            name='UploadArquivo',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('nome_arquivo', models.CharField(max_length=255)),
+                ('tipo_arquivo', models.CharField(blank=True, max_length=100)),
+                ('tamanho', models.BigIntegerField(help_text='Tamanho total do arquivo, em bytes')),
+                ('tamanho_parte', models.PositiveIntegerField(help_text='Tamanho de cada parte (exceto a última), em bytes')),
+                ('sha256', models.CharField(blank=True, help_text='SHA-256 esperado, conferido ao concluir', max_length=64)),
+                ('data_criacao', models.DateTimeField(auto_now_add=True)),
+                ('reclamacao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to='api.reclamacao')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Upload em andamento',
+                'verbose_name_plural': 'Uploads em andamento',
+            },
+        ),
+    ]
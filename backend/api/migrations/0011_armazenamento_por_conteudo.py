@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:53
+
+import api.armazenamento
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_uploads_em_partes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='arquivo',
+            name='arquivo',
+            field=models.FileField(db_index=True, max_length=255, storage=api.armazenamento.ArmazenamentoPorConteudo(), upload_to='arquivos_reclamacoes/'),
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:05
+
+from bisect import bisect_left
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+# Cópia das regras de api.rollups na data desta migração: limites superiores (horas) das faixas
+# do histograma de tempo de resolução e o status que conta como resolvida
+FAIXAS_HORAS = (1, 2, 4, 8, 12, 24, 48, 72, 120, 168, 336, 720, 1440, 2160, 4320, 8760)
+ENCERRADA = 'ENCERRADA'
+
+
+def preencher_rollups(apps, schema_editor):
+    Reclamacao = apps.get_model('api', 'Reclamacao')
+    ReclamacaoDiaria = apps.get_model('api', 'ReclamacaoDiaria')
+    ResolucaoDiaria = apps.get_model('api', 'ResolucaoDiaria')
+
+    reclamacoes = defaultdict(int)
+    resolucoes = defaultdict(lambda: [0, 0.0])
+    campos = ('empresa_id', 'status', 'data_criacao', 'data_resolucao')
+    for empresa_id, status, data_criacao, data_resolucao in (
+        Reclamacao.objects.values_list(*campos).iterator(chunk_size=2000)
+    ):
+        if data_criacao is None:
+            continue
+        reclamacoes[(empresa_id, timezone.localdate(data_criacao), status)] += 1
+        if status == ENCERRADA and data_resolucao is not None:
+            horas = max((data_resolucao - data_criacao).total_seconds() / 3600, 0.0)
+            linha = resolucoes[(empresa_id, timezone.localdate(data_resolucao), bisect_left(FAIXAS_HORAS, horas))]
+            linha[0] += 1
+            linha[1] += horas
+
+    ReclamacaoDiaria.objects.bulk_create(
+        [ReclamacaoDiaria(empresa_id=empresa_id, dia=dia, status=status, total=total)
+         for (empresa_id, dia, status), total in reclamacoes.items()],
+        batch_size=1000,
+    )
+    ResolucaoDiaria.objects.bulk_create(
+        [ResolucaoDiaria(empresa_id=empresa_id, dia=dia, faixa=faixa, total=total, soma_horas=soma_horas)
+         for (empresa_id, dia, faixa), (total, soma_horas) in resolucoes.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_armazenamento_por_conteudo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReclamacaoDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(help_text='Dia da criação das reclamações')),
+                ('status', models.CharField(choices=[('ABERTA', 'Aberta'), ('ENCERRADA', 'Encerrada')], max_length=20)),
+                ('total', models.IntegerField(default=0)),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reclamacoes_diarias', to='api.usuarioempresa')),
+            ],
+            options={
+                'verbose_name': 'Reclamações por dia',
+                'verbose_name_plural': 'Reclamações por dia',
+                'indexes': [models.Index(fields=['dia'], name='reclamacao_diaria_dia_idx')],
+                'constraints': [models.UniqueConstraint(fields=('empresa', 'dia', 'status'), name='reclamacao_diaria_unica')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResolucaoDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(help_text='Dia da resolução das reclamações')),
+                ('faixa', models.PositiveSmallIntegerField(help_text='Índice da faixa de tempo de resolução (api.rollups.FAIXAS_HORAS)')),
+                ('total', models.IntegerField(default=0)),
+                ('soma_horas', models.FloatField(default=0.0, help_text='Soma dos tempos de resolução da faixa, em horas')),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resolucoes_diarias', to='api.usuarioempresa')),
+            ],
+            options={
+                'verbose_name': 'Resoluções por dia',
+                'verbose_name_plural': 'Resoluções por dia',
+                'indexes': [models.Index(fields=['dia'], name='resolucao_diaria_dia_idx')],
+                'constraints': [models.UniqueConstraint(fields=('empresa', 'dia', 'faixa'), name='resolucao_diaria_unica')],
+            },
+        ),
+        migrations.RunPython(preencher_rollups, migrations.RunPython.noop),
+    ]
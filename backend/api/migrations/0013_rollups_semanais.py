@@ -0,0 +1,94 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:12
+
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+# Cópia das regras de api.rollups na data desta migração: limites superiores (horas) das faixas
+# do histograma de tempo de resolução e o status que conta como resolvida
+FAIXAS_HORAS = (1, 2, 4, 8, 12, 24, 48, 72, 120, 168, 336, 720, 1440, 2160, 4320, 8760)
+ENCERRADA = 'ENCERRADA'
+
+
+def inicio_da_semana(dia):
+    # Segunda-feira da semana, o mesmo limite do TruncWeek
+    return dia - timedelta(days=dia.weekday())
+
+
+def preencher_rollups_semanais(apps, schema_editor):
+    Reclamacao = apps.get_model('api', 'Reclamacao')
+    ReclamacaoSemanal = apps.get_model('api', 'ReclamacaoSemanal')
+    ResolucaoSemanal = apps.get_model('api', 'ResolucaoSemanal')
+
+    reclamacoes = defaultdict(int)
+    resolucoes = defaultdict(lambda: [0, 0.0])
+    campos = ('empresa_id', 'status', 'data_criacao', 'data_resolucao')
+    for empresa_id, status, data_criacao, data_resolucao in (
+        Reclamacao.objects.values_list(*campos).iterator(chunk_size=2000)
+    ):
+        if data_criacao is None:
+            continue
+        reclamacoes[(empresa_id, inicio_da_semana(timezone.localdate(data_criacao)), status)] += 1
+        if status == ENCERRADA and data_resolucao is not None:
+            horas = max((data_resolucao - data_criacao).total_seconds() / 3600, 0.0)
+            semana = inicio_da_semana(timezone.localdate(data_resolucao))
+            linha = resolucoes[(empresa_id, semana, bisect_left(FAIXAS_HORAS, horas))]
+            linha[0] += 1
+            linha[1] += horas
+
+    ReclamacaoSemanal.objects.bulk_create(
+        [ReclamacaoSemanal(empresa_id=empresa_id, semana=semana, status=status, total=total)
+         for (empresa_id, semana, status), total in reclamacoes.items()],
+        batch_size=1000,
+    )
+    ResolucaoSemanal.objects.bulk_create(
+        [ResolucaoSemanal(empresa_id=empresa_id, semana=semana, faixa=faixa, total=total, soma_horas=soma_horas)
+         for (empresa_id, semana, faixa), (total, soma_horas) in resolucoes.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_rollups_diarios'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReclamacaoSemanal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('semana', models.DateField(help_text='Segunda-feira da semana da criação das reclamações')),
+                ('status', models.CharField(choices=[('ABERTA', 'Aberta'), ('ENCERRADA', 'Encerrada')], max_length=20)),
+                ('total', models.IntegerField(default=0)),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reclamacoes_semanais', to='api.usuarioempresa')),
+            ],
+            options={
+                'verbose_name': 'Reclamações por semana',
+                'verbose_name_plural': 'Reclamações por semana',
+                'constraints': [models.UniqueConstraint(fields=('empresa', 'semana', 'status'), name='reclamacao_semanal_unica')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResolucaoSemanal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('semana', models.DateField(help_text='Segunda-feira da semana da resolução das reclamações')),
+                ('faixa', models.PositiveSmallIntegerField(help_text='Índice da faixa de tempo de resolução (api.rollups.FAIXAS_HORAS)')),
+                ('total', models.IntegerField(default=0)),
+                ('soma_horas', models.FloatField(default=0.0, help_text='Soma dos tempos de resolução da faixa, em horas')),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resolucoes_semanais', to='api.usuarioempresa')),
+            ],
+            options={
+                'verbose_name': 'Resoluções por semana',
+                'verbose_name_plural': 'Resoluções por semana',
+                'constraints': [models.UniqueConstraint(fields=('empresa', 'semana', 'faixa'), name='resolucao_semanal_unica')],
+            },
+        ),
+        migrations.RunPython(preencher_rollups_semanais, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_rollups_semanais'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='estatisticaempresapendente',
+            name='reconstruir_rollups',
+            field=models.BooleanField(default=False, help_text='Os rollups (api.rollups) também devem ser refeitos a partir das reclamações'),
+        ),
+    ]
@@ -3,10 +3,16 @@ from .consumidor import UsuarioConsumidor
 from .empresa import UsuarioEmpresa
 from .administrador import Administrador
 from .estatistica import EstatisticaEmpresa
+from .estatistica_pendente import EstatisticaEmpresaPendente
 from .reclamacao import Reclamacao
 from .arquivo import Arquivo
+from .upload import UploadArquivo
 from .resposta import RespostaReclamacao
 from .relatorio import Relatorio
+from .reclamacao_diaria import ReclamacaoDiaria
+from .resolucao_diaria import ResolucaoDiaria
+from .reclamacao_semanal import ReclamacaoSemanal
+from .resolucao_semanal import ResolucaoSemanal
 
 __all__ = [
     'Usuario',
@@ -14,8 +20,14 @@ __all__ = [
     'UsuarioEmpresa',
     'Administrador',
     'EstatisticaEmpresa',
+    'EstatisticaEmpresaPendente',
     'Reclamacao',
     'Arquivo',
+    'UploadArquivo',
     'RespostaReclamacao',
     'Relatorio',
+    'ReclamacaoDiaria',
+    'ResolucaoDiaria',
+    'ReclamacaoSemanal',
+    'ResolucaoSemanal',
 ]
\ No newline at end of file
@@ -1,11 +1,17 @@
 from django.db import models
+from ..armazenamento import ArmazenamentoPorConteudo
 from .reclamacao import Reclamacao
 
 class Arquivo(models.Model):
     reclamacao = models.ForeignKey(Reclamacao, on_delete=models.CASCADE, related_name='arquivos')
-    arquivo = models.FileField(upload_to='arquivos_reclamacoes/')
+    # Um arquivo por conteúdo (SHA-256): anexos idênticos apontam para o mesmo blob, e o índice
+    # conta as referências de um blob antes de apagá-lo
+    arquivo = models.FileField(upload_to='arquivos_reclamacoes/', storage=ArmazenamentoPorConteudo(),
+                               max_length=255, db_index=True)
     nome_arquivo = models.CharField(max_length=255)
     tipo_arquivo = models.CharField(max_length=100)
+    tamanho = models.BigIntegerField(null=True, blank=True, help_text="Tamanho em bytes")
+    sha256 = models.CharField(max_length=64, blank=True, help_text="SHA-256 do conteúdo")
     data_upload = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
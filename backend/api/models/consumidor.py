@@ -1,12 +1,40 @@
 from django.db import models
+from django.db.models import Count, Q
 from django.core.exceptions import ValidationError
 from api.models import Usuario
 
 # REMOVIDA: from .empresa import UsuarioEmpresa  <-- Isso causava o ciclo
 
+def contagens_reclamacoes():
+    """Expressions for the consumer's complaint counters, usable in annotate() or aggregate()."""
+    # IMPORTAÇÃO TARDIA: reclamacao.py importa este módulo
+    from .reclamacao import Reclamacao
+    return {
+        'total_reclamacoes': Count('reclamacoes'),
+        'reclamacoes_resolvidas': Count(
+            'reclamacoes', filter=Q(reclamacoes__status=Reclamacao.StatusReclamacao.ENCERRADA)
+        ),
+    }
+
+
+class UsuarioConsumidorQuerySet(models.QuerySet):
+    def com_contagens(self):
+        """Usuario plus the complaint counters, all in the same query."""
+        return self.select_related('usuario').annotate(**contagens_reclamacoes())
+
+
 class UsuarioConsumidor(models.Model):
     usuario = models.OneToOneField(Usuario, on_delete=models.CASCADE, primary_key=True)
 
+    objects = UsuarioConsumidorQuerySet.as_manager()
+
+    def carregar_contagens(self):
+        """Fills total_reclamacoes/reclamacoes_resolvidas when the instance did not come from com_contagens()."""
+        if not hasattr(self, 'total_reclamacoes'):
+            contagens = UsuarioConsumidor.objects.filter(pk=self.pk).aggregate(**contagens_reclamacoes())
+            self.total_reclamacoes = contagens['total_reclamacoes']
+            self.reclamacoes_resolvidas = contagens['reclamacoes_resolvidas']
+
     def save(self, *args, **kwargs):
         # IMPORTAÇÃO TARDIA: Importa o modelo conflitante APENAS quando o save for chamado
         from .empresa import UsuarioEmpresa
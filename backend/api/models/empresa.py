@@ -10,6 +10,16 @@ class UsuarioEmpresa(models.Model):
     razao_social = models.CharField(max_length=255)
     nome_social = models.CharField(max_length=255, blank=True, null=True)
     descricao = models.TextField(blank=True, null=True)
+    # Colunas de busca (api.search.buscar_empresas), preenchidas no save()
+    busca_nome = models.CharField(max_length=511, blank=True, default='', editable=False)
+    cnpj_digitos = models.CharField(max_length=18, blank=True, default='', editable=False, db_index=True)
+
+    def preencher_campos_busca(self):
+        from api.search import normalizar_texto, somente_digitos
+        nome = normalizar_texto(' '.join(filter(None, [self.razao_social, self.nome_social])))
+        # A normalização pode alongar o texto ('ß' -> 'ss', '…' -> '...'): corta no tamanho da coluna
+        self.busca_nome = nome[:self._meta.get_field('busca_nome').max_length]
+        self.cnpj_digitos = somente_digitos(self.cnpj)
 
     def save(self, *args, **kwargs):
         from .consumidor import UsuarioConsumidor
@@ -17,7 +27,11 @@ class UsuarioEmpresa(models.Model):
             raise ValidationError(
                 'Um usuário cadastrado como Empresa não pode ser também um Consumidor.'
             )
-        
+
+        self.preencher_campos_busca()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'razao_social', 'nome_social', 'cnpj'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'busca_nome', 'cnpj_digitos'}
         super().save(*args, **kwargs)
 
     class Meta:
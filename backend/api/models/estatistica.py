@@ -7,6 +7,10 @@ class EstatisticaEmpresa(models.Model):
     reclamacoes_resolvidas = models.IntegerField(default=0)
     reclamacoes_pendentes = models.IntegerField(default=0)
     media_tempo_resolucao = models.FloatField(default=0.0, help_text="Média de tempo para resolução em horas")
+    soma_tempo_resolucao = models.FloatField(default=0.0, help_text="Soma dos tempos de resolução em horas")
+    reclamacoes_com_tempo_resolucao = models.IntegerField(
+        default=0, help_text="Reclamações encerradas que entram na média de tempo de resolução"
+    )
 
     def __str__(self):
         return f"Estatísticas de {self.usuario_empresa.razao_social}"
@@ -0,0 +1,18 @@
+from django.db import models
+from .empresa import UsuarioEmpresa
+
+class EstatisticaEmpresaPendente(models.Model):
+    """Empresa cujas estatísticas precisam ser recalculadas pelo worker (process_statistics_queue)."""
+    usuario_empresa = models.OneToOneField(UsuarioEmpresa, on_delete=models.CASCADE, primary_key=True)
+    data_marcacao = models.DateTimeField(auto_now_add=True, help_text="Quando a empresa entrou na fila")
+    data_atualizacao = models.DateTimeField(help_text="Última alteração que marcou a empresa")
+    reconstruir_rollups = models.BooleanField(
+        default=False, help_text="Os rollups (api.rollups) também devem ser refeitos a partir das reclamações"
+    )
+
+    class Meta:
+        verbose_name = "Estatística pendente"
+        verbose_name_plural = "Estatísticas pendentes"
+
+    def __str__(self):
+        return f"Estatísticas pendentes de {self.usuario_empresa_id}"
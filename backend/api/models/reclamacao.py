@@ -1,7 +1,37 @@
-from django.db import models
+from django.db import models, router, transaction
 from .empresa import UsuarioEmpresa
 from .consumidor import UsuarioConsumidor
 
+
+class ReclamacaoQuerySet(models.QuerySet):
+    def para_listagem(self):
+        """
+        Carrega de uma vez tudo o que o ReclamacaoSerializer lê por linha:
+        consumidor + usuário e empresa via JOIN, arquivos e a última resposta
+        de cada reclamação via prefetch. O número de queries fica constante,
+        independente do tamanho da página.
+        """
+        # IMPORTAÇÃO TARDIA: resposta.py importa este módulo
+        from .resposta import RespostaReclamacao
+
+        ultima_resposta = RespostaReclamacao.objects.filter(
+            reclamacao=models.OuterRef('reclamacao')
+        ).order_by('-data_criacao', '-id').values('id')[:1]
+
+        return self.select_related(
+            'usuario_consumidor__usuario', 'empresa'
+        ).prefetch_related(
+            'arquivos',
+            models.Prefetch(
+                'respostas',
+                queryset=RespostaReclamacao.objects.filter(
+                    id=models.Subquery(ultima_resposta)
+                ).select_related('empresa'),
+                to_attr='ultimas_respostas',
+            ),
+        )
+
+
 class Reclamacao(models.Model):
     class StatusReclamacao(models.TextChoices):
         ABERTA = 'ABERTA', 'Aberta'
@@ -17,6 +47,47 @@ class Reclamacao(models.Model):
         choices=StatusReclamacao.choices,
         default=StatusReclamacao.ABERTA
     )
+    # Data da primeira resposta RESOLVIDA; mantida pelos signals de RespostaReclamacao
+    data_resolucao = models.DateTimeField(blank=True, null=True, editable=False)
+    # Colunas de busca (api.search.buscar_reclamacoes), preenchidas no save()
+    busca_titulo = models.CharField(max_length=200, blank=True, default='', editable=False)
+    busca_texto = models.TextField(blank=True, default='', editable=False)
+
+    objects = ReclamacaoQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Listagem pública e filtros do ReclamacaoViewSet (sempre ordenados por -data_criacao)
+            # O id desempata a ordenação e é a segunda chave do cursor (ReclamacaoPagination)
+            models.Index(fields=['-data_criacao', '-id'], name='reclamacao_data_id_idx'),
+            models.Index(fields=['empresa', '-data_criacao'], name='reclamacao_empresa_data_idx'),
+            models.Index(fields=['empresa', 'status', '-data_criacao'], name='reclamacao_emp_status_data_idx'),
+            models.Index(fields=['usuario_consumidor', '-data_criacao'], name='reclamacao_consum_data_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Guarda os valores lidos do banco para que os signals calculem o delta das estatísticas
+        instance._valores_carregados = dict(zip(field_names, values))
+        return instance
+
+    def preencher_campos_busca(self):
+        from api.search import normalizar_texto
+        # A normalização pode alongar o texto ('ß' -> 'ss', '…' -> '...'): corta no tamanho da coluna
+        self.busca_titulo = normalizar_texto(self.titulo)[:self._meta.get_field('busca_titulo').max_length]
+        self.busca_texto = normalizar_texto(f'{self.titulo} {self.descricao}')
+
+    def save(self, *args, **kwargs):
+        self.preencher_campos_busca()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'titulo', 'descricao'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'busca_titulo', 'busca_texto'}
+        # Os signals aplicam os deltas de estatísticas e rollups (api.signals) com a empresa
+        # travada: a linha e os deltas precisam ir no mesmo commit
+        using = kwargs.get('using') or router.db_for_write(Reclamacao, instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return self.titulo
@@ -0,0 +1,27 @@
+from django.db import models
+from .empresa import UsuarioEmpresa
+from .reclamacao import Reclamacao
+
+class ReclamacaoDiaria(models.Model):
+    """
+    Reclamações de uma empresa criadas num dia, por status atual. Mantida incrementalmente
+    pelos signals de Reclamacao (api.rollups); é a fonte dos relatórios (api.relatorios).
+    """
+    empresa = models.ForeignKey(UsuarioEmpresa, on_delete=models.CASCADE, related_name='reclamacoes_diarias')
+    dia = models.DateField(help_text="Dia da criação das reclamações")
+    status = models.CharField(max_length=20, choices=Reclamacao.StatusReclamacao.choices)
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Reclamações por dia"
+        verbose_name_plural = "Reclamações por dia"
+        constraints = [
+            models.UniqueConstraint(fields=['empresa', 'dia', 'status'], name='reclamacao_diaria_unica'),
+        ]
+        indexes = [
+            # Relatórios de todas as empresas filtram só pelo período
+            models.Index(fields=['dia'], name='reclamacao_diaria_dia_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.empresa_id} {self.dia} {self.status}: {self.total}"
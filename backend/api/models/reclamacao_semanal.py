@@ -0,0 +1,23 @@
+from django.db import models
+from .empresa import UsuarioEmpresa
+from .reclamacao import Reclamacao
+
+class ReclamacaoSemanal(models.Model):
+    """
+    Reclamações de uma empresa criadas numa semana, por status atual: o mesmo que
+    ReclamacaoDiaria, agregado por semana para as tendências (api.rollups).
+    """
+    empresa = models.ForeignKey(UsuarioEmpresa, on_delete=models.CASCADE, related_name='reclamacoes_semanais')
+    semana = models.DateField(help_text="Segunda-feira da semana da criação das reclamações")
+    status = models.CharField(max_length=20, choices=Reclamacao.StatusReclamacao.choices)
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Reclamações por semana"
+        verbose_name_plural = "Reclamações por semana"
+        constraints = [
+            models.UniqueConstraint(fields=['empresa', 'semana', 'status'], name='reclamacao_semanal_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.empresa_id} {self.semana} {self.status}: {self.total}"
@@ -0,0 +1,26 @@
+from django.db import models
+from .empresa import UsuarioEmpresa
+
+class ResolucaoDiaria(models.Model):
+    """
+    Histograma dos tempos de resolução das reclamações de uma empresa resolvidas num dia, nas
+    faixas de api.rollups.FAIXAS_HORAS. Os percentis dos relatórios são estimados a partir dele.
+    """
+    empresa = models.ForeignKey(UsuarioEmpresa, on_delete=models.CASCADE, related_name='resolucoes_diarias')
+    dia = models.DateField(help_text="Dia da resolução das reclamações")
+    faixa = models.PositiveSmallIntegerField(help_text="Índice da faixa de tempo de resolução (api.rollups.FAIXAS_HORAS)")
+    total = models.IntegerField(default=0)
+    soma_horas = models.FloatField(default=0.0, help_text="Soma dos tempos de resolução da faixa, em horas")
+
+    class Meta:
+        verbose_name = "Resoluções por dia"
+        verbose_name_plural = "Resoluções por dia"
+        constraints = [
+            models.UniqueConstraint(fields=['empresa', 'dia', 'faixa'], name='resolucao_diaria_unica'),
+        ]
+        indexes = [
+            models.Index(fields=['dia'], name='resolucao_diaria_dia_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.empresa_id} {self.dia} faixa {self.faixa}: {self.total}"
@@ -0,0 +1,23 @@
+from django.db import models
+from .empresa import UsuarioEmpresa
+
+class ResolucaoSemanal(models.Model):
+    """
+    Histograma dos tempos de resolução das reclamações de uma empresa resolvidas numa semana:
+    o mesmo que ResolucaoDiaria, agregado por semana para as tendências (api.rollups).
+    """
+    empresa = models.ForeignKey(UsuarioEmpresa, on_delete=models.CASCADE, related_name='resolucoes_semanais')
+    semana = models.DateField(help_text="Segunda-feira da semana da resolução das reclamações")
+    faixa = models.PositiveSmallIntegerField(help_text="Índice da faixa de tempo de resolução (api.rollups.FAIXAS_HORAS)")
+    total = models.IntegerField(default=0)
+    soma_horas = models.FloatField(default=0.0, help_text="Soma dos tempos de resolução da faixa, em horas")
+
+    class Meta:
+        verbose_name = "Resoluções por semana"
+        verbose_name_plural = "Resoluções por semana"
+        constraints = [
+            models.UniqueConstraint(fields=['empresa', 'semana', 'faixa'], name='resolucao_semanal_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.empresa_id} {self.semana} faixa {self.faixa}: {self.total}"
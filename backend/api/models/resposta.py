@@ -18,5 +18,13 @@ class RespostaReclamacao(models.Model):
         default=StatusResolucao.EM_ANALISE
     )
 
+    class Meta:
+        indexes = [
+            # Última resposta de cada reclamação (ReclamacaoSerializer.get_resposta)
+            models.Index(fields=['reclamacao', '-data_criacao'], name='resposta_reclamacao_data_idx'),
+            # Primeira resposta RESOLVIDA (data_resolucao e estatísticas)
+            models.Index(fields=['reclamacao', 'status_resolucao', 'data_criacao'], name='resposta_recl_status_data_idx'),
+        ]
+
     def __str__(self):
         return f"Resposta para: {self.reclamacao.titulo}"
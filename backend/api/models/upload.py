@@ -0,0 +1,39 @@
+import math
+import uuid
+
+from django.db import models
+from .reclamacao import Reclamacao
+from .usuario import Usuario
+
+class UploadArquivo(models.Model):
+    """
+    Envio em partes de um anexo de reclamação (api.uploads): as partes ficam em disco até o
+    envio ser concluído, quando viram um Arquivo. Partes podem chegar em qualquer ordem e em
+    paralelo; reenviar uma parte a substitui.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    reclamacao = models.ForeignKey(Reclamacao, on_delete=models.CASCADE, related_name='uploads')
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='uploads')
+    nome_arquivo = models.CharField(max_length=255)
+    tipo_arquivo = models.CharField(max_length=100, blank=True)
+    tamanho = models.BigIntegerField(help_text="Tamanho total do arquivo, em bytes")
+    tamanho_parte = models.PositiveIntegerField(help_text="Tamanho de cada parte (exceto a última), em bytes")
+    sha256 = models.CharField(max_length=64, blank=True, help_text="SHA-256 esperado, conferido ao concluir")
+    data_criacao = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Upload em andamento"
+        verbose_name_plural = "Uploads em andamento"
+
+    @property
+    def total_partes(self):
+        return max(math.ceil(self.tamanho / self.tamanho_parte), 1)
+
+    def tamanho_da_parte(self, numero):
+        """Size in bytes of part `numero` (0-based): tamanho_parte, except for the last one."""
+        if numero == self.total_partes - 1:
+            return self.tamanho - self.tamanho_parte * numero
+        return self.tamanho_parte
+
+    def __str__(self):
+        return f"Upload {self.id} ({self.nome_arquivo})"
@@ -2,6 +2,14 @@
 
 from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
+from django.utils.functional import cached_property
+
+# Relação reversa de cada perfil -> papel
+PERFIS = (
+    ('administrador', 'administrador'),
+    ('usuarioempresa', 'empresa'),
+    ('usuarioconsumidor', 'consumidor'),
+)
 
 # Necessário para usar o campo 'email' como USERNAME_FIELD
 class UsuarioManager(BaseUserManager):
@@ -29,6 +37,12 @@ class UsuarioManager(BaseUserManager):
 
         return self.create_user(email, password, **extra_fields)
 
+    def get_by_natural_key(self, username):
+        # authenticate() já traz os perfis: o login descobre o papel sem queries extras
+        return self.select_related(*(relacao for relacao, papel in PERFIS)).get(
+            **{self.model.USERNAME_FIELD: username}
+        )
+
 class Usuario(AbstractUser):
     # O AbstractUser já define username, first_name, last_name, email, is_staff, etc.
     username = None # Remove o campo 'username' padrão de AbstractUser
@@ -44,9 +58,47 @@ class Usuario(AbstractUser):
 
     objects = UsuarioManager() # Usa o gerenciador de usuários personalizado
 
+    class Papel(models.TextChoices):
+        ADMINISTRADOR = 'administrador', 'Administrador'
+        EMPRESA = 'empresa', 'Empresa'
+        CONSUMIDOR = 'consumidor', 'Consumidor'
+
     def __str__(self):
         return self.email
 
+    def carregar_perfis(self):
+        """
+        Loads the profile relations not loaded yet in a single query. Each failed
+        hasattr(user, 'usuarioconsumidor')-style probe would otherwise be its own SELECT.
+        """
+        pendentes = [relacao for relacao, papel in PERFIS if not self._meta.get_field(relacao).is_cached(self)]
+        if not pendentes or self.pk is None:
+            return
+        carregado = Usuario.objects.select_related(*pendentes).get(pk=self.pk)
+        for relacao in pendentes:
+            campo = self._meta.get_field(relacao)
+            perfil = campo.get_cached_value(carregado)
+            if perfil is not None:
+                campo.remote_field.set_cached_value(perfil, self)
+            campo.set_cached_value(self, perfil)
+
+    @cached_property
+    def papel(self):
+        """Usuario.Papel of the user (or None), resolved once per instance."""
+        self.carregar_perfis()
+        for relacao, papel in PERFIS:
+            if hasattr(self, relacao):
+                return papel
+        return None
+
+    @property
+    def perfil(self):
+        """The UsuarioConsumidor/UsuarioEmpresa/Administrador matching `papel`."""
+        for relacao, papel in PERFIS:
+            if papel == self.papel:
+                return getattr(self, relacao)
+        return None
+
 
 
 # from django.db import models
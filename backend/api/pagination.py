@@ -0,0 +1,166 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def keyset_filter(ordering, valores):
+    """
+    Builds the "rows after this position" filter for a keyset, e.g. for ('-data_criacao', '-id'):
+    data_criacao < v1 OR (data_criacao = v1 AND id < v2).
+    """
+    filtro = Q()
+    anteriores = {}
+    for campo, valor in zip(ordering, valores):
+        nome = campo.lstrip('-')
+        operador = 'lt' if campo.startswith('-') else 'gt'
+        filtro |= Q(**anteriores, **{f'{nome}__{operador}': valor})
+        anteriores[nome] = valor
+    return filtro
+
+
+def keyset_position(obj, ordering):
+    return [getattr(obj, campo.lstrip('-')) for campo in ordering]
+
+
+def encode_cursor(valores):
+    def serializar(valor):
+        if isinstance(valor, (datetime, date)):
+            return valor.isoformat()
+        if isinstance(valor, Decimal):
+            return str(valor)
+        return valor
+    dados = json.dumps([serializar(valor) for valor in valores], separators=(',', ':'))
+    return base64.urlsafe_b64encode(dados.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering):
+    """Returns the cursor values converted by each model field, or raises ValueError."""
+    try:
+        dados = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        valores = json.loads(dados)
+        if not isinstance(valores, list) or len(valores) != len(ordering):
+            raise ValueError(cursor)
+        campos = [model._meta.pk if nome == 'pk' else model._meta.get_field(nome)
+                  for nome in (campo.lstrip('-') for campo in ordering)]
+        return [campo.to_python(valor) for campo, valor in zip(campos, valores)]
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, TypeError, ValidationError) as exc:
+        raise ValueError(cursor) from exc
+
+
+class HybridPagination(PageNumberPagination):
+    """
+    PageNumberPagination (padrão, compatível com os clientes atuais) com dois modos extras:
+
+    - ?pagination=cursor ou ?cursor=<token>: paginação por keyset sobre `keyset_ordering`.
+      Não faz COUNT(*) nem OFFSET, então o custo de uma página profunda é o mesmo da primeira.
+      Só navega para frente (`next`); `previous` é sempre null. Numa busca (?search=) o modo
+      cursor é ignorado: a ordem é a relevância, que o keyset não preserva, e a paginação é
+      por números de página (como em /api/public/).
+    - ?count=false: mantém os números de página, mas pula o COUNT(*) (`count` vem null).
+    """
+    keyset_ordering = ('-pk',)
+    mode_query_param = 'pagination'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    search_query_param = 'search'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.modo = 'paginas'
+        modo_cursor = (request.query_params.get(self.cursor_query_param)
+                       or request.query_params.get(self.mode_query_param) == 'cursor')
+        if modo_cursor and not request.query_params.get(self.search_query_param, '').strip():
+            self.modo = 'cursor'
+            return self.paginate_keyset(queryset, request)
+        if request.query_params.get(self.count_query_param, '').lower() in ('0', 'false', 'no'):
+            self.modo = 'sem_total'
+            return self.paginate_without_count(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def paginate_keyset(self, queryset, request):
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.keyset_ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            try:
+                valores = decode_cursor(cursor, queryset.model, self.keyset_ordering)
+            except ValueError:
+                raise NotFound('Cursor inválido.')
+            queryset = queryset.filter(keyset_filter(self.keyset_ordering, valores))
+
+        resultados = list(queryset[:page_size + 1])
+        self.proximo_cursor = None
+        if len(resultados) > page_size:
+            resultados = resultados[:page_size]
+            self.proximo_cursor = encode_cursor(keyset_position(resultados[-1], self.keyset_ordering))
+        return resultados
+
+    def paginate_without_count(self, queryset, request):
+        page_size = self.get_page_size(request)
+        try:
+            self.numero_pagina = int(request.query_params.get(self.page_query_param, 1))
+            if self.numero_pagina < 1:
+                raise ValueError(self.numero_pagina)
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+
+        inicio = (self.numero_pagina - 1) * page_size
+        resultados = list(queryset[inicio:inicio + page_size + 1])
+        self.tem_proxima = len(resultados) > page_size
+        return resultados[:page_size]
+
+    def get_next_link(self):
+        if self.modo == 'cursor':
+            if self.proximo_cursor is None:
+                return None
+            url = remove_query_param(self.request.build_absolute_uri(), self.mode_query_param)
+            return replace_query_param(url, self.cursor_query_param, self.proximo_cursor)
+        if self.modo == 'sem_total':
+            if not self.tem_proxima:
+                return None
+            return replace_query_param(self.request.build_absolute_uri(), self.page_query_param, self.numero_pagina + 1)
+        return super().get_next_link()
+
+    def get_previous_link(self):
+        if self.modo == 'cursor':
+            return None
+        if self.modo == 'sem_total':
+            if self.numero_pagina == 1:
+                return None
+            url = self.request.build_absolute_uri()
+            if self.numero_pagina == 2:
+                return remove_query_param(url, self.page_query_param)
+            return replace_query_param(url, self.page_query_param, self.numero_pagina - 1)
+        return super().get_previous_link()
+
+    def get_paginated_response(self, data):
+        if self.modo == 'paginas':
+            return super().get_paginated_response(data)
+        return Response({
+            'count': None,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema['properties']['count']['nullable'] = True
+        return schema
+
+
+class ReclamacaoPagination(HybridPagination):
+    keyset_ordering = ('-data_criacao', '-id')
+
+
+class UsuarioEmpresaPagination(HybridPagination):
+    keyset_ordering = ('pk',)
@@ -0,0 +1,49 @@
+from rest_framework.permissions import BasePermission
+
+from .models import Usuario
+
+
+def papel(request):
+    """Usuario.Papel of the request's user; None for anonymous users and users without a profile."""
+    return getattr(request.user, 'papel', None)
+
+
+def eh_administrador(request):
+    return papel(request) == Usuario.Papel.ADMINISTRADOR or request.user.is_superuser
+
+
+def reclamacoes_visiveis(request, queryset, publico=False):
+    """
+    Restricts a Reclamacao queryset to what the user sees: consumers their own, companies theirs,
+    administrators all of them. Anonymous users see all of them only where `publico` (the public
+    listing); authenticated users without a role see none.
+    """
+    papel_usuario = papel(request)
+    if papel_usuario == Usuario.Papel.CONSUMIDOR:
+        return queryset.filter(usuario_consumidor=request.user.perfil)
+    if papel_usuario == Usuario.Papel.EMPRESA:
+        return queryset.filter(empresa=request.user.perfil)
+    if eh_administrador(request) or (publico and not request.user.is_authenticated):
+        return queryset
+    return queryset.none()
+
+
+class IsConsumidor(BasePermission):
+    message = 'Usuário não é um consumidor'
+
+    def has_permission(self, request, view):
+        return papel(request) == Usuario.Papel.CONSUMIDOR
+
+
+class IsEmpresa(BasePermission):
+    message = 'Usuário não é uma empresa'
+
+    def has_permission(self, request, view):
+        return papel(request) == Usuario.Papel.EMPRESA
+
+
+class IsAdministrador(BasePermission):
+    message = 'Apenas administradores podem acessar este recurso.'
+
+    def has_permission(self, request, view):
+        return eh_administrador(request)
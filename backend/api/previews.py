@@ -0,0 +1,178 @@
+"""
+On-demand previews of complaint attachments: a JPEG bounded to PREVIEW_TAMANHOS pixels on the
+longest side, of images (requires Pillow) and of the first page of PDFs (requires pdftoppm, from
+poppler-utils). Without them, that type simply has no preview.
+
+A preview is generated on its first request, on a bounded thread pool (never on the request
+thread), and cached under MEDIA_ROOT/arquivos_reclamacoes/.previews/, keyed by the SHA-256 of
+the attachment, so identical attachments share previews. The cache is an LRU bounded to
+PREVIEW_CACHE_MAXIMO bytes: serving a preview refreshes its mtime and, after each generation,
+the least recently used ones are deleted until the cache fits.
+"""
+import hashlib
+import importlib.util
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from rest_framework import exceptions
+
+from .uploads import DIRETORIO_ARQUIVOS
+
+PILLOW_DISPONIVEL = importlib.util.find_spec('PIL') is not None
+PDFTOPPM = shutil.which('pdftoppm')
+# Um acesso só renova o mtime (posição no LRU) se o último tiver sido há mais que isso
+INTERVALO_TOQUE = 60
+
+_lock = threading.Lock()
+_pool = None
+_em_andamento = {}
+
+
+class PreviewIndisponivel(Exception):
+    pass
+
+
+def tem_preview(tipo_arquivo):
+    tipo = (tipo_arquivo or '').lower()
+    if tipo.startswith('image/'):
+        return PILLOW_DISPONIVEL
+    return tipo == 'application/pdf' and PDFTOPPM is not None
+
+
+def diretorio_dos_previews():
+    return os.path.join(settings.MEDIA_ROOT, DIRETORIO_ARQUIVOS, '.previews')
+
+
+def caminho_do_preview(arquivo, tamanho):
+    chave = arquivo.sha256 or hashlib.sha256(arquivo.arquivo.name.encode()).hexdigest()
+    return os.path.join(diretorio_dos_previews(), chave[:2], f'{chave}-{tamanho}.jpg')
+
+
+def preview_pronto(arquivo, tamanho):
+    """Path of the cached preview (moved to the front of the LRU), or None if not generated yet."""
+    caminho = caminho_do_preview(arquivo, tamanho)
+    try:
+        if time.time() - os.path.getmtime(caminho) > INTERVALO_TOQUE:
+            os.utime(caminho)
+    except FileNotFoundError:
+        return None
+    return caminho
+
+
+def _executor_e_vagas():
+    # Criado no primeiro uso, já dentro do processo do worker (nunca antes de um fork)
+    global _pool
+    with _lock:
+        if _pool is None:
+            workers = settings.PREVIEW_WORKERS
+            _pool = (
+                ThreadPoolExecutor(max_workers=workers, thread_name_prefix='preview'),
+                threading.BoundedSemaphore(workers + settings.PREVIEW_FILA),
+            )
+    return _pool
+
+
+def agendar_preview(arquivo, tamanho):
+    """
+    Future of the generation of a preview on the pool; requests for a preview already being
+    generated share its future. Raises Throttled (429) when the pool and its queue are full.
+    """
+    destino = caminho_do_preview(arquivo, tamanho)
+    executor, vagas = _executor_e_vagas()
+    with _lock:
+        futuro = _em_andamento.get(destino)
+        if futuro is not None:
+            return futuro
+        if not vagas.acquire(blocking=False):
+            raise exceptions.Throttled(wait=1, detail='Muitas pré-visualizações em preparo. Tente novamente em instantes.')
+        futuro = executor.submit(gerar_preview, arquivo.arquivo.path, arquivo.tipo_arquivo, tamanho, destino)
+        _em_andamento[destino] = futuro
+
+    def liberar(_):
+        with _lock:
+            _em_andamento.pop(destino, None)
+        vagas.release()
+    futuro.add_done_callback(liberar)
+    return futuro
+
+
+def gerar_preview(origem, tipo_arquivo, tamanho, destino):
+    """Writes the preview of `origem` to `destino` (atomically) and trims the cache; returns `destino`."""
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(destino), suffix='.tmp')
+    os.close(descritor)
+    try:
+        if tipo_arquivo.lower() == 'application/pdf':
+            _gerar_de_pdf(origem, tamanho, temporario)
+        else:
+            _gerar_de_imagem(origem, tamanho, temporario)
+        os.replace(temporario, destino)
+    finally:
+        if os.path.exists(temporario):
+            os.unlink(temporario)
+    aplicar_limite_do_cache()
+    return destino
+
+
+def _gerar_de_imagem(origem, tamanho, destino):
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(origem) as imagem:
+            # JPEGs grandes são decodificados já reduzidos
+            imagem.draft('RGB', (tamanho, tamanho))
+            imagem = ImageOps.exif_transpose(imagem)
+            imagem.thumbnail((tamanho, tamanho))
+            imagem.convert('RGB').save(destino, 'JPEG', quality=80, optimize=True)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as exc:
+        raise PreviewIndisponivel(str(exc))
+
+
+def _gerar_de_pdf(origem, tamanho, destino):
+    prefixo = os.path.splitext(destino)[0]
+    try:
+        subprocess.run(
+            [PDFTOPPM, '-jpeg', '-singlefile', '-f', '1', '-l', '1', '-scale-to', str(tamanho), origem, prefixo],
+            check=True, capture_output=True, timeout=settings.PREVIEW_TIMEOUT,
+        )
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as exc:
+        raise PreviewIndisponivel(str(exc))
+    os.replace(f'{prefixo}.jpg', destino)
+
+
+def aplicar_limite_do_cache():
+    """Deletes the least recently used previews until the cache is within PREVIEW_CACHE_MAXIMO."""
+    previews = []
+    for diretorio, _, nomes in os.walk(diretorio_dos_previews()):
+        for nome in nomes:
+            if not nome.endswith('.jpg'):
+                continue
+            caminho = os.path.join(diretorio, nome)
+            try:
+                estado = os.stat(caminho)
+            except FileNotFoundError:
+                continue
+            previews.append((estado.st_mtime, estado.st_size, caminho))
+
+    total = sum(tamanho for _, tamanho, _ in previews)
+    if total <= settings.PREVIEW_CACHE_MAXIMO:
+        return 0
+    # Libera até 90% do limite, para não varrer o diretório a cada preview gerado
+    alvo = settings.PREVIEW_CACHE_MAXIMO * 0.9
+    apagados = 0
+    for _, tamanho, caminho in sorted(previews):
+        if total <= alvo:
+            break
+        try:
+            os.unlink(caminho)
+        except FileNotFoundError:
+            pass
+        total -= tamanho
+        apagados += 1
+    return apagados
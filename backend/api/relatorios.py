@@ -0,0 +1,193 @@
+"""
+Report engine: builds the content of a Relatorio, and the trends of a company, from the daily
+and weekly rollups (api.rollups).
+
+Every figure comes from the rollup tables aggregated in SQL, so the cost depends on how many
+companies and buckets are covered, not on how many complaints there are; Reclamacao is never
+read. Complaints are counted in the period they were created (with their current status) and
+resolution times in the period they were resolved. Percentiles are estimated by linear
+interpolation inside the histogram buckets, so they are exact to the bucket width.
+"""
+import json
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth, TruncQuarter, TruncWeek, TruncYear
+
+from .models import (
+    Reclamacao, ReclamacaoDiaria, ReclamacaoSemanal, Relatorio, ResolucaoDiaria, ResolucaoSemanal, UsuarioEmpresa
+)
+from .rollups import FAIXAS_HORAS, inicio_da_semana, limites_da_faixa
+from .routers import ler_da_replica
+
+AGRUPAMENTOS = {
+    'dia': lambda: F('dia'),
+    'semana': lambda: TruncWeek('dia'),
+    'mes': lambda: TruncMonth('dia'),
+    'trimestre': lambda: TruncQuarter('dia'),
+    'ano': lambda: TruncYear('dia'),
+}
+PERCENTIS = (50, 90, 95, 99)
+# Granularidade das tendências -> (rollup de reclamações, rollup de resoluções, campo do período, passo)
+GRANULARIDADES = {
+    'dia': (ReclamacaoDiaria, ResolucaoDiaria, 'dia', timedelta(days=1)),
+    'semana': (ReclamacaoSemanal, ResolucaoSemanal, 'semana', timedelta(weeks=1)),
+}
+# Períodos de uma série de tendências: o padrão sem inicio e o máximo permitido
+PERIODOS_PADRAO = {'dia': 30, 'semana': 12}
+MAXIMO_PERIODOS = 400
+
+
+def percentis(histograma, percentis=PERCENTIS):
+    """
+    {'p50': hours, ...} estimated from a histogram (list of counts per bucket of FAIXAS_HORAS);
+    None for every percentile when it is empty. In the last, open bucket the lower bound is used.
+    """
+    total = sum(histograma)
+    resultado = {}
+    for percentil in percentis:
+        estimativa = None
+        if total:
+            alvo = total * percentil / 100
+            acumulado = 0
+            for faixa, quantidade in enumerate(histograma):
+                if quantidade and acumulado + quantidade >= alvo:
+                    inferior, superior = limites_da_faixa(faixa)
+                    estimativa = inferior
+                    if superior is not None:
+                        estimativa += (superior - inferior) * (alvo - acumulado) / quantidade
+                    estimativa = round(estimativa, 2)
+                    break
+                acumulado += quantidade
+        resultado[f'p{percentil}'] = estimativa
+    return resultado
+
+
+def tempo_de_resolucao(histograma, soma_horas):
+    resolvidas = sum(histograma)
+    return {
+        'resolvidas': resolvidas,
+        'media_horas': round(soma_horas / resolvidas, 2) if resolvidas else None,
+        **percentis(histograma),
+    }
+
+
+def gerar_conteudo(inicio, fim, agrupamento='mes', empresas=None, top=10):
+    """
+    Report of complaints between the dates `inicio` and `fim` (inclusive), as a JSON-serializable
+    dict: totals per status, per period (`agrupamento`, a key of AGRUPAMENTOS) and per company,
+    resolution-time percentiles overall and per company, and the `top` companies by complaints.
+    `empresas` restricts it to those company ids.
+    """
+    reclamacoes = ReclamacaoDiaria.objects.filter(dia__range=(inicio, fim))
+    resolucoes = ResolucaoDiaria.objects.filter(dia__range=(inicio, fim))
+    if empresas:
+        reclamacoes = reclamacoes.filter(empresa_id__in=empresas)
+        resolucoes = resolucoes.filter(empresa_id__in=empresas)
+
+    def por_status():
+        return dict.fromkeys(Reclamacao.StatusReclamacao.values, 0)
+
+    geral = por_status()
+    por_periodo = defaultdict(por_status)
+    linhas = (reclamacoes.annotate(periodo=AGRUPAMENTOS[agrupamento]()).values('periodo', 'status')
+              .annotate(soma=Sum('total')).order_by())
+    for linha in linhas:
+        por_periodo[linha['periodo']][linha['status']] += linha['soma']
+        geral[linha['status']] += linha['soma']
+
+    por_empresa = defaultdict(por_status)
+    for linha in reclamacoes.values('empresa_id', 'status').annotate(soma=Sum('total')).order_by():
+        por_empresa[linha['empresa_id']][linha['status']] += linha['soma']
+
+    vazio = [0] * (len(FAIXAS_HORAS) + 1)
+    histograma_geral, soma_geral = list(vazio), 0.0
+    histogramas = defaultdict(lambda: [list(vazio), 0.0])
+    linhas = resolucoes.values('empresa_id', 'faixa').annotate(soma=Sum('total'), horas=Sum('soma_horas')).order_by()
+    for linha in linhas:
+        histograma = histogramas[linha['empresa_id']]
+        histograma[0][linha['faixa']] += linha['soma']
+        histograma[1] += linha['horas']
+        histograma_geral[linha['faixa']] += linha['soma']
+        soma_geral += linha['horas']
+
+    ids = por_empresa.keys() | histogramas.keys()
+    nomes = dict(UsuarioEmpresa.objects.filter(pk__in=ids).values_list('pk', 'razao_social'))
+    empresas_relatorio = []
+    for empresa_id in sorted(ids):
+        contagens = por_empresa[empresa_id]
+        histograma, soma_horas = histogramas[empresa_id] if empresa_id in histogramas else (vazio, 0.0)
+        empresas_relatorio.append({
+            'empresa_id': empresa_id,
+            'razao_social': nomes.get(empresa_id),
+            'total': sum(contagens.values()),
+            'por_status': contagens,
+            'tempo_resolucao': tempo_de_resolucao(histograma, soma_horas),
+        })
+    mais_reclamadas = sorted(empresas_relatorio, key=lambda empresa: (-empresa['total'], empresa['empresa_id']))
+
+    return {
+        'periodo': {'inicio': inicio, 'fim': fim, 'agrupamento': agrupamento},
+        'total': sum(geral.values()),
+        'por_status': geral,
+        'tempo_resolucao': tempo_de_resolucao(histograma_geral, soma_geral),
+        'por_periodo': [
+            {'periodo': periodo, 'total': sum(contagens.values()), 'por_status': contagens}
+            for periodo, contagens in sorted(por_periodo.items())
+        ],
+        'top_empresas': [
+            {campo: empresa[campo] for campo in ('empresa_id', 'razao_social', 'total', 'por_status')}
+            for empresa in mais_reclamadas[:top] if empresa['total']
+        ],
+        'empresas': empresas_relatorio,
+    }
+
+
+def tendencias(empresa_id, inicio, fim, granularidade='semana'):
+    """
+    Series of a company's complaints per day or week between `inicio` and `fim` (inclusive),
+    read from the rollups in two queries: complaints created per status and the share of them
+    already closed, plus the complaints resolved in the period and their resolution times.
+    Periods without complaints come as zeros, so the series has no gaps.
+    """
+    reclamacoes, resolucoes, campo, passo = GRANULARIDADES[granularidade]
+    if granularidade == 'semana':
+        inicio, fim = inicio_da_semana(inicio), inicio_da_semana(fim)
+    filtro = {'empresa_id': empresa_id, f'{campo}__range': (inicio, fim), 'total__gt': 0}
+
+    contagens = defaultdict(lambda: dict.fromkeys(Reclamacao.StatusReclamacao.values, 0))
+    for periodo, status, total in reclamacoes.objects.filter(**filtro).values_list(campo, 'status', 'total'):
+        contagens[periodo][status] += total
+    histogramas = defaultdict(lambda: [[0] * (len(FAIXAS_HORAS) + 1), 0.0])
+    for periodo, faixa, total, horas in resolucoes.objects.filter(**filtro).values_list(campo, 'faixa', 'total', 'soma_horas'):
+        histogramas[periodo][0][faixa] += total
+        histogramas[periodo][1] += horas
+
+    serie = []
+    periodo = inicio
+    while periodo <= fim:
+        por_status = contagens[periodo]
+        total = sum(por_status.values())
+        encerradas = por_status[Reclamacao.StatusReclamacao.ENCERRADA]
+        serie.append({
+            'periodo': periodo,
+            'reclamacoes': total,
+            'por_status': por_status,
+            'taxa_resolucao': round(encerradas / total, 4) if total else None,
+            'tempo_resolucao': tempo_de_resolucao(*histogramas[periodo]),
+        })
+        periodo += passo
+    return {'empresa_id': empresa_id, 'granularidade': granularidade, 'inicio': inicio, 'fim': fim, 'serie': serie}
+
+
+def gerar_relatorio(inicio, fim, titulo=None, administrador=None, **opcoes):
+    """Builds the report (reading from a replica, when configured) and saves it as a Relatorio."""
+    with ler_da_replica():
+        conteudo = gerar_conteudo(inicio, fim, **opcoes)
+    return Relatorio.objects.create(
+        administrador=administrador,
+        titulo=titulo or f'Reclamações de {inicio:%d/%m/%Y} a {fim:%d/%m/%Y}',
+        conteudo=json.dumps(conteudo, cls=DjangoJSONEncoder, ensure_ascii=False),
+    )
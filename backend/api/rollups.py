@@ -0,0 +1,177 @@
+"""
+Daily and weekly rollups of complaints, the source of the reports (api.relatorios) and of the
+company trends (tendencias).
+
+ReclamacaoDiaria/ReclamacaoSemanal count complaints per company, day/week of creation and
+current status; ResolucaoDiaria/ResolucaoSemanal are histograms of resolution times per company
+and day/week of resolution, in the FAIXAS_HORAS buckets. The Reclamacao signals apply the
+difference between a complaint's previous and current state as counter increments (or, when
+statistics are deferred, queue the company for a rebuild), so reading any period costs rows
+proportional to the buckets, never to the complaints. reconstruir_rollups
+(command rebuild_rollups) recomputes them from Reclamacao, with the same rules, for backfill and
+repair.
+"""
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import F, Value
+from django.utils import timezone
+
+from .models import (
+    Reclamacao, ReclamacaoDiaria, ReclamacaoSemanal, ResolucaoDiaria, ResolucaoSemanal, UsuarioEmpresa,
+)
+
+# Limites superiores (inclusive), em horas, das faixas do histograma de tempo de resolução.
+# A faixa i cobre (FAIXAS_HORAS[i - 1], FAIXAS_HORAS[i]]; a última, len(FAIXAS_HORAS), é aberta.
+FAIXAS_HORAS = (1, 2, 4, 8, 12, 24, 48, 72, 120, 168, 336, 720, 1440, 2160, 4320, 8760)
+CAMPOS_ESTADO = ('empresa_id', 'status', 'data_criacao', 'data_resolucao')
+# Campos que identificam a linha de cada rollup
+ROLLUPS = {
+    ReclamacaoDiaria: ('empresa_id', 'dia', 'status'),
+    ResolucaoDiaria: ('empresa_id', 'dia', 'faixa'),
+    ReclamacaoSemanal: ('empresa_id', 'semana', 'status'),
+    ResolucaoSemanal: ('empresa_id', 'semana', 'faixa'),
+}
+
+
+def faixa_de(horas):
+    return bisect_left(FAIXAS_HORAS, horas)
+
+
+def limites_da_faixa(faixa):
+    """(lower, upper) bounds in hours of a bucket; upper is None for the last, open one."""
+    inferior = FAIXAS_HORAS[faixa - 1] if faixa > 0 else 0
+    superior = FAIXAS_HORAS[faixa] if faixa < len(FAIXAS_HORAS) else None
+    return inferior, superior
+
+
+def inicio_da_semana(dia):
+    """Monday of the week of `dia`, the same week boundary as TruncWeek."""
+    return dia - timedelta(days=dia.weekday())
+
+
+def valores_salvos(reclamacao):
+    """The complaint's fields as last read from or written to the database, or None when unknown."""
+    valores = getattr(reclamacao, '_valores_carregados', None)
+    if not valores or not set(CAMPOS_ESTADO) <= valores.keys():
+        return None
+    return {campo: valores[campo] for campo in CAMPOS_ESTADO}
+
+
+def valores_atuais(reclamacao):
+    return {campo: getattr(reclamacao, campo) for campo in CAMPOS_ESTADO}
+
+
+def contribuicao_rollups(valores):
+    """
+    Rollup rows a complaint with the given field values counts in, as
+    {(model, ((field, value), ...)): {counter: increment}}.
+    """
+    contagens = {}
+    if valores['data_criacao'] is None:
+        return contagens
+    empresa_id = valores['empresa_id']
+    dia = timezone.localdate(valores['data_criacao'])
+    for modelo, periodo in ((ReclamacaoDiaria, dia), (ReclamacaoSemanal, inicio_da_semana(dia))):
+        chave = tuple(zip(ROLLUPS[modelo], (empresa_id, periodo, valores['status'])))
+        contagens[(modelo, chave)] = {'total': 1}
+    # Mesma regra das estatísticas (api.stats.contribuicao): só encerradas com data de resolução
+    if valores['status'] == Reclamacao.StatusReclamacao.ENCERRADA and valores['data_resolucao'] is not None:
+        horas = max((valores['data_resolucao'] - valores['data_criacao']).total_seconds() / 3600, 0.0)
+        dia = timezone.localdate(valores['data_resolucao'])
+        for modelo, periodo in ((ResolucaoDiaria, dia), (ResolucaoSemanal, inicio_da_semana(dia))):
+            chave = tuple(zip(ROLLUPS[modelo], (empresa_id, periodo, faixa_de(horas))))
+            contagens[(modelo, chave)] = {'total': 1, 'soma_horas': horas}
+    return contagens
+
+
+def travar_empresas(empresa_ids, exclusivo=False):
+    """
+    Locks the companies' UsuarioEmpresa rows, in pk order, until the end of the transaction:
+    shared (FOR SHARE) by writers of rollup changes, exclusive (FOR NO KEY UPDATE) by
+    reconstruir_rollups. A rebuild so waits for the transitions in flight, and the ones that
+    start meanwhile wait for the rebuild: no delta is lost nor counted twice.
+    Only on PostgreSQL; SQLite never lets a write commit between the rebuild's read and rewrite.
+    """
+    ids = sorted(set(empresa_ids))
+    conexao = connections[router.db_for_write(UsuarioEmpresa)]
+    if not ids or conexao.vendor != 'postgresql':
+        return
+    tabela = conexao.ops.quote_name(UsuarioEmpresa._meta.db_table)
+    coluna = conexao.ops.quote_name(UsuarioEmpresa._meta.pk.column)
+    modo = 'NO KEY UPDATE' if exclusivo else 'SHARE'
+    with conexao.cursor() as cursor:
+        cursor.execute(f'SELECT 1 FROM {tabela} WHERE {coluna} = ANY(%s) ORDER BY {coluna} FOR {modo}', [ids])
+
+
+def _incrementar(modelo, chave, delta):
+    incrementos = {campo: F(campo) + Value(valor) for campo, valor in delta.items()}
+    if modelo.objects.filter(**chave).update(**incrementos) or delta['total'] <= 0:
+        # Decremento sem linha: rollups ainda não preenchidos (rebuild_rollups) ou empresa sendo apagada
+        return
+    try:
+        with transaction.atomic():
+            modelo.objects.create(**chave, **delta)
+    except IntegrityError:
+        # Outra transação criou a linha entre o UPDATE e o INSERT
+        modelo.objects.filter(**chave).update(**incrementos)
+
+
+def deltas_da_transicao(anterior, atual):
+    """
+    Rollup rows changed between two states (valores_salvos/valores_atuais) of a complaint, as
+    [((model, key), {counter: increment})] in a fixed order. Either side may be None for
+    creation/deletion; rows that cancel out are left out, so editing a title changes none.
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    for valores, sinal in ((anterior, -1), (atual, 1)):
+        if valores is None:
+            continue
+        for linha, contadores in contribuicao_rollups(valores).items():
+            for campo, valor in contadores.items():
+                deltas[linha][campo] += sinal * valor
+    return [
+        (linha, dict(delta))
+        for linha, delta in sorted(deltas.items(), key=lambda item: (item[0][0]._meta.model_name, item[0][1]))
+        if any(delta.values())
+    ]
+
+
+def aplicar_transicao_rollups(anterior, atual):
+    """
+    Applies the change between two states of a complaint to the rollups (see deltas_da_transicao).
+    Rows are updated in a fixed order to avoid deadlocks between concurrent transitions.
+    """
+    deltas = deltas_da_transicao(anterior, atual)
+    travar_empresas({dict(chave)['empresa_id'] for (modelo, chave), delta in deltas})
+    for (modelo, chave), delta in deltas:
+        _incrementar(modelo, dict(chave), delta)
+
+
+def calcular_rollups(reclamacoes):
+    """Rollup rows of a Reclamacao queryset, {(model, key): counters}; memory grows with rows, not complaints."""
+    linhas = defaultdict(lambda: defaultdict(int))
+    for valores in reclamacoes.values(*CAMPOS_ESTADO).iterator(chunk_size=2000):
+        for linha, contadores in contribuicao_rollups(valores).items():
+            for campo, valor in contadores.items():
+                linhas[linha][campo] += valor
+    return linhas
+
+
+def reconstruir_rollups(empresa_ids):
+    """
+    Recomputes from scratch, in one transaction, the rollups of the given companies. Safe with
+    traffic: the companies stay locked (travar_empresas) from the read to the rewrite.
+    """
+    with transaction.atomic():
+        travar_empresas(empresa_ids, exclusivo=True)
+        linhas = calcular_rollups(Reclamacao.objects.filter(empresa_id__in=empresa_ids))
+        for modelo in ROLLUPS:
+            modelo.objects.filter(empresa_id__in=empresa_ids).delete()
+            modelo.objects.bulk_create(
+                [modelo(**dict(chave), **contadores) for (tipo, chave), contadores in linhas.items() if tipo is modelo],
+                batch_size=1000,
+            )
+    return len(linhas)
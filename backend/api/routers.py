@@ -0,0 +1,73 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Estado da requisição (ou do bloco ler_da_replica) atual; None = fora de qualquer um deles.
+# 'replica' é o alias sorteado para o escopo, ou None quando ele lê do primário
+_estado = ContextVar('leitura_em_replica', default=None)
+
+
+def iniciar_leitura_em_replica(replica=True):
+    """
+    Opens a routing scope: reads go to a replica while `replica` is true and nothing was written.
+    The replica is drawn once here, so every query of the scope sees the same replication lag.
+    """
+    if replica and settings.DATABASE_REPLICAS:
+        replica = random.choice(settings.DATABASE_REPLICAS)
+    else:
+        replica = None
+    return _estado.set({'replica': replica, 'escreveu': False})
+
+
+def encerrar_leitura_em_replica(token):
+    """Closes the scope opened by iniciar_leitura_em_replica; returns whether it wrote to the primary."""
+    estado = _estado.get()
+    _estado.reset(token)
+    return estado['escreveu']
+
+
+@contextmanager
+def ler_da_replica():
+    """Sends the reads of the block to a replica (reports, checks); writes still go to the primary."""
+    token = iniciar_leitura_em_replica()
+    try:
+        yield
+    finally:
+        encerrar_leitura_em_replica(token)
+
+
+class ReplicaRouter:
+    """
+    Sends reads to one of settings.DATABASE_REPLICAS and everything else to the primary.
+
+    Only reads inside a replica scope (safe-method requests, see
+    api.middleware.leitura_em_replica_middleware, or ler_da_replica()) leave the primary, and the
+    scope falls back to the primary for good after its first write or inside a transaction, so a
+    request always reads what it has just written. Code outside any scope (signals of writes,
+    management commands, the shell) keeps reading from the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        estado = _estado.get()
+        if estado is None or estado['replica'] is None or estado['escreveu']:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return estado['replica']
+
+    def db_for_write(self, model, **hints):
+        estado = _estado.get()
+        if estado is not None:
+            estado['escreveu'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplicas têm os mesmos dados do primário
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # As réplicas recebem o schema pela replicação
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,151 @@
+import re
+import unicodedata
+
+from django.db.models import Case, ExpressionWrapper, IntegerField, Q, Value, When
+from django.utils.html import escape
+
+_ESPACOS = re.compile(r'\s+')
+_NAO_DIGITOS = re.compile(r'\D')
+
+
+def normalizar_texto(texto):
+    """Lowercase, accent-folded, single-spaced version of a text ('Café  Açúcar' -> 'cafe acucar')."""
+    if not texto:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', texto)
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return _ESPACOS.sub(' ', sem_acentos.casefold()).strip()
+
+
+def somente_digitos(texto):
+    return _NAO_DIGITOS.sub('', texto or '')
+
+
+def proximo_prefixo(digitos):
+    """Smallest string greater than every string starting with `digitos` ('129' -> '13')."""
+    digitos = digitos.rstrip('9')
+    if not digitos:
+        return ':'  # ':' vem logo depois de '9' na tabela ASCII
+    return digitos[:-1] + str(int(digitos[-1]) + 1)
+
+
+def termos_de_busca(texto):
+    return normalizar_texto(texto).split()
+
+
+def buscar_empresas(queryset, busca):
+    """
+    Filters and ranks UsuarioEmpresa by the search box text.
+
+    Names are matched against the pre-normalized `busca_nome` column (every word of the search
+    must appear), which a trigram GIN index serves on Postgres. A search made only of CNPJ
+    characters (digits, '.', '/', '-') is also matched as a prefix of `cnpj_digitos`.
+    Results are annotated with `relevancia` and ordered by it.
+    """
+    termos = termos_de_busca(busca)
+    if not termos:
+        return queryset.none()
+
+    texto = ' '.join(termos)
+    filtro = Q()
+    for termo in termos:
+        filtro &= Q(busca_nome__contains=termo)
+
+    ranking = [
+        When(busca_nome=texto, then=Value(80)),
+        When(busca_nome__startswith=texto, then=Value(60)),
+        When(busca_nome__contains=f' {texto}', then=Value(40)),
+    ]
+
+    digitos = somente_digitos(busca)
+    if digitos and not re.search(r'[^\d./\-\s]', busca):
+        # Prefixo como intervalo (>= '123' e < '124'): usa o índice B-tree em qualquer banco
+        prefixo = Q(cnpj_digitos__gte=digitos, cnpj_digitos__lt=proximo_prefixo(digitos))
+        filtro |= prefixo
+        ranking = [
+            When(cnpj_digitos=digitos, then=Value(100)),
+            When(prefixo, then=Value(90)),
+        ] + ranking
+
+    return queryset.filter(filtro).annotate(
+        relevancia=Case(*ranking, default=Value(10), output_field=IntegerField())
+    ).order_by('-relevancia', 'razao_social', 'pk')
+
+
+def buscar_reclamacoes(queryset, busca):
+    """
+    Filters and ranks Reclamacao by text over titulo and descricao.
+
+    Every word must appear in the pre-normalized `busca_texto` column (trigram GIN index on
+    Postgres). `relevancia` gives each word 3 points when it is in the title and 1 when it is
+    only in the description, so title matches come first; ties keep the newest complaints first.
+    """
+    termos = termos_de_busca(busca)
+    if not termos:
+        return queryset.none()
+
+    filtro = Q()
+    relevancia = Value(0)
+    for termo in termos:
+        filtro &= Q(busca_texto__contains=termo)
+        relevancia += Case(When(busca_titulo__contains=termo, then=Value(3)), default=Value(1))
+
+    return queryset.filter(filtro).annotate(
+        relevancia=ExpressionWrapper(relevancia, output_field=IntegerField())
+    ).order_by('-relevancia', '-data_criacao', '-id')
+
+
+def _normalizar_com_mapa(texto):
+    """Normalizes char by char, returning the normalized text and, per char, its index in `texto`."""
+    normalizado, mapa = [], []
+    for indice, caractere in enumerate(texto):
+        for convertido in unicodedata.normalize('NFKD', caractere).casefold():
+            if not unicodedata.combining(convertido):
+                normalizado.append(convertido)
+                mapa.append(indice)
+    return ''.join(normalizado), mapa
+
+
+def destacar(texto, termos, tamanho=None):
+    """
+    Returns `texto` HTML-escaped with every occurrence of the (normalized) terms wrapped in <mark>.
+    With `tamanho`, returns only a window of about that many characters around the first match.
+    """
+    texto = texto or ''
+    normalizado, mapa = _normalizar_com_mapa(texto)
+    trechos = []
+    for termo in termos:
+        inicio = normalizado.find(termo)
+        while inicio != -1:
+            trechos.append((mapa[inicio], mapa[inicio + len(termo) - 1] + 1))
+            inicio = normalizado.find(termo, inicio + 1)
+
+    mesclados = []
+    for inicio, fim in sorted(trechos):
+        if mesclados and inicio <= mesclados[-1][1]:
+            mesclados[-1] = (mesclados[-1][0], max(fim, mesclados[-1][1]))
+        else:
+            mesclados.append((inicio, fim))
+
+    janela_inicio, janela_fim = 0, len(texto)
+    if tamanho is not None and len(texto) > tamanho:
+        centro = mesclados[0][0] if mesclados else 0
+        janela_inicio = max(0, min(centro - tamanho // 3, len(texto) - tamanho))
+        janela_fim = janela_inicio + tamanho
+
+    partes, posicao = [], janela_inicio
+    for inicio, fim in mesclados:
+        if fim <= janela_inicio or inicio >= janela_fim:
+            continue
+        inicio, fim = max(inicio, janela_inicio), min(fim, janela_fim)
+        partes.append(escape(texto[posicao:inicio]))
+        partes.append(f'<mark>{escape(texto[inicio:fim])}</mark>')
+        posicao = fim
+    partes.append(escape(texto[posicao:janela_fim]))
+
+    resultado = ''.join(partes)
+    if janela_inicio > 0:
+        resultado = '…' + resultado
+    if janela_fim < len(texto):
+        resultado += '…'
+    return resultado
@@ -1,12 +1,24 @@
 from rest_framework import serializers
+from rest_framework.reverse import reverse
+from django.conf import settings
 from django.contrib.auth.hashers import make_password
 from django.db import transaction
+from django.utils import timezone
+from .armazenamento import calcular_sha256
+from .cache import obter_da_empresa
+from .exportacao import FORMATOS
+from .fieldsets import SparseFieldsetMixin
+from .permissions import eh_administrador, papel
+from .previews import tem_preview
+from .relatorios import AGRUPAMENTOS, GRANULARIDADES, MAXIMO_PERIODOS, PERIODOS_PADRAO
+from .search import destacar
+from .uploads import partes_recebidas
 from .models import (
     Usuario, UsuarioConsumidor, UsuarioEmpresa, Administrador,
-    EstatisticaEmpresa, Reclamacao, Arquivo, RespostaReclamacao, Relatorio
+    EstatisticaEmpresa, Reclamacao, Arquivo, UploadArquivo, RespostaReclamacao, Relatorio
 )
 
-class UsuarioSerializer(serializers.ModelSerializer):
+class UsuarioSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Usuario
         # Added 'phone' field to be readable
@@ -16,7 +28,7 @@ class UsuarioSerializer(serializers.ModelSerializer):
             'phone': {'allow_null': True}
         }
 
-class UsuarioConsumidorSerializer(serializers.ModelSerializer):
+class UsuarioConsumidorSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     nome = serializers.CharField(source="usuario.nome", required=False)
     email = serializers.EmailField(source="usuario.email", required=False)
     phone = serializers.CharField(source="usuario.phone", required=False, allow_null=True, allow_blank=True)
@@ -46,12 +58,24 @@ class UsuarioConsumidorSerializer(serializers.ModelSerializer):
             'display_id', 'date_joined', 'display_nome', 'display_email',
             'totalComplaints', 'resolved', 'helpfulVotes', 'profileViews'
         )
-        
+        # Histórico completo só com ?expand=user_complaints; a listagem paginada fica em
+        # /api/consumidores/perfil/reclamacoes/
+        expandable_fields = ('user_complaints',)
+        field_dependencies = {
+            'totalComplaints': ('total_reclamacoes',),
+            'resolved': ('reclamacoes_resolvidas',),
+            'helpfulVotes': (),
+            'profileViews': (),
+            'user_complaints': (),
+        }
+
     def get_totalComplaints(self, obj):
-        return Reclamacao.objects.filter(usuario_consumidor=obj).count()
+        obj.carregar_contagens()
+        return obj.total_reclamacoes
 
     def get_resolved(self, obj):
-        return Reclamacao.objects.filter(usuario_consumidor=obj, status='ENCERRADA').count()
+        obj.carregar_contagens()
+        return obj.reclamacoes_resolvidas
 
     def get_helpfulVotes(self, obj):
         return 0
@@ -61,7 +85,7 @@ class UsuarioConsumidorSerializer(serializers.ModelSerializer):
 
     def get_user_complaints(self, obj):
         # Retorna as reclamações do usuário consumidor
-        complaints = Reclamacao.objects.filter(usuario_consumidor=obj).order_by('-data_criacao')
+        complaints = Reclamacao.objects.filter(usuario_consumidor=obj).para_listagem().order_by('-data_criacao', '-id')
         return ReclamacaoSerializer(complaints, many=True).data
 
     @transaction.atomic
@@ -114,7 +138,7 @@ class UsuarioConsumidorSerializer(serializers.ModelSerializer):
         # podemos simplesmente retornar a instância.
         return instance
 
-class UsuarioEmpresaSerializer(serializers.ModelSerializer):
+class UsuarioEmpresaSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     nome = serializers.CharField(write_only=True, required=True)
     email = serializers.EmailField(write_only=True, required=True)
     senha = serializers.CharField(write_only=True, required=True, min_length=8)
@@ -147,7 +171,7 @@ class UsuarioEmpresaSerializer(serializers.ModelSerializer):
         EstatisticaEmpresa.objects.create(usuario_empresa=usuario_empresa)
         return usuario_empresa
 
-class EstatisticaEmpresaSerializer(serializers.ModelSerializer):
+class EstatisticaEmpresaSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     usuario_empresa_nome = serializers.CharField(source='usuario_empresa.razao_social', read_only=True)
     class Meta:
         model = EstatisticaEmpresa
@@ -163,13 +187,15 @@ class UsuarioEmpresaProfileSerializer(UsuarioEmpresaSerializer):
     class Meta(UsuarioEmpresaSerializer.Meta):
         fields = [field for field in UsuarioEmpresaSerializer.Meta.fields if field != 'senha'] + ['estatisticas']
         read_only_fields = [field for field in UsuarioEmpresaSerializer.Meta.read_only_fields]
+        field_dependencies = {'estatisticas': ()}  # vem do cache, só precisa da pk
 
     def get_estatisticas(self, obj):
-        stats, created = EstatisticaEmpresa.objects.get_or_create(usuario_empresa=obj)
-        serializer = EstatisticaEmpresaSerializer(stats)
-        return serializer.data
+        def calcular():
+            stats, created = EstatisticaEmpresa.objects.get_or_create(usuario_empresa=obj)
+            return dict(EstatisticaEmpresaSerializer(stats).data)
+        return obter_da_empresa(obj.pk, 'estatisticas', calcular)
 
-class AdministradorSerializer(serializers.ModelSerializer):
+class AdministradorSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     nome = serializers.CharField(source='usuario.nome', read_only=True)
     email = serializers.EmailField(source='usuario.email', read_only=True)
     date_joined = serializers.DateTimeField(source='usuario.date_joined', read_only=True)
@@ -179,13 +205,75 @@ class AdministradorSerializer(serializers.ModelSerializer):
         fields = ('usuario', 'nome', 'email', 'date_joined')
         read_only_fields = ('usuario', 'nome', 'email', 'date_joined')
 
-class ArquivoSerializer(serializers.ModelSerializer):
+class ArquivoSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+    preview_url = serializers.SerializerMethodField()
+
     class Meta:
         model = Arquivo
-        fields = ('id', 'reclamacao', 'arquivo', 'nome_arquivo', 'tipo_arquivo', 'data_upload')
-        read_only_fields = ('id', 'data_upload')
+        # Sem o campo `arquivo`: o caminho no MEDIA_URL pularia a checagem do download_url
+        fields = (
+            'id', 'reclamacao', 'download_url', 'preview_url', 'nome_arquivo', 'tipo_arquivo',
+            'tamanho', 'sha256', 'data_upload'
+        )
+        read_only_fields = ('id', 'tamanho', 'sha256', 'data_upload')
+        field_dependencies = {'download_url': (), 'preview_url': ('tipo_arquivo',)}
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # O SHA-256 identifica o conteúdo: só o dono da reclamação e administradores o recebem
+        if not self.eh_do_dono(instance):
+            data.pop('sha256', None)
+        return data
+
+    def eh_do_dono(self, obj):
+        request = self.context.get('request')
+        if request is None:
+            return False
+        if eh_administrador(request):
+            return True
+        return (papel(request) == Usuario.Papel.CONSUMIDOR
+                and obj.reclamacao.usuario_consumidor_id == request.user.pk)
+
+    def get_download_url(self, obj):
+        return reverse('api:arquivo-download', args=[obj.pk], request=self.context.get('request'))
+
+    def get_preview_url(self, obj):
+        # Miniatura leve para listagens; None para tipos sem pré-visualização
+        if not tem_preview(obj.tipo_arquivo):
+            return None
+        return reverse('api:arquivo-preview', args=[obj.pk], request=self.context.get('request'))
+
+class UploadArquivoSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    total_partes = serializers.IntegerField(read_only=True)
+    partes_recebidas = serializers.SerializerMethodField()
 
-class ReclamacaoSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadArquivo
+        fields = (
+            'id', 'reclamacao', 'nome_arquivo', 'tipo_arquivo', 'tamanho', 'sha256',
+            'tamanho_parte', 'total_partes', 'partes_recebidas', 'data_criacao'
+        )
+        read_only_fields = ('id', 'reclamacao', 'tamanho_parte', 'data_criacao')
+        field_dependencies = {'total_partes': ('tamanho', 'tamanho_parte'), 'partes_recebidas': ()}
+
+    def get_partes_recebidas(self, obj):
+        return partes_recebidas(obj)
+
+    def validate_tamanho(self, value):
+        if value <= 0:
+            raise serializers.ValidationError('O arquivo não pode ser vazio.')
+        if value > settings.UPLOAD_TAMANHO_MAXIMO:
+            raise serializers.ValidationError(f'O arquivo excede o limite de {settings.UPLOAD_TAMANHO_MAXIMO} bytes.')
+        return value
+
+    def validate_sha256(self, value):
+        value = value.lower()
+        if value and (len(value) != 64 or any(c not in '0123456789abcdef' for c in value)):
+            raise serializers.ValidationError('SHA-256 inválido: use 64 dígitos hexadecimais.')
+        return value
+
+class ReclamacaoSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     usuario_consumidor_nome = serializers.SerializerMethodField()
     empresa_razao_social = serializers.CharField(source='empresa.razao_social', read_only=True)
     empresa = serializers.PrimaryKeyRelatedField(queryset=UsuarioEmpresa.objects.all())
@@ -203,6 +291,17 @@ class ReclamacaoSerializer(serializers.ModelSerializer):
             'arquivos_upload', 'arquivos'
         )
         read_only_fields = ('id', 'data_criacao', 'usuario_consumidor', 'arquivos')
+        field_dependencies = {
+            'usuario_consumidor_nome': ('usuario_consumidor__usuario__nome', 'usuario_consumidor__usuario__email'),
+            'resposta': ('ultimas_respostas', 'titulo'),  # reclamacao_titulo da resposta lê a reclamação
+            'arquivos': ('arquivos', 'usuario_consumidor'),  # o sha256 só vai para o dono
+        }
+
+    def get_field_dependencies(self):
+        dependencias = super().get_field_dependencies()
+        if dependencias is not None and self.context.get('termos_busca'):
+            dependencias |= {'titulo', 'descricao'}  # usados no destaque
+        return dependencias
 
     def get_usuario_consumidor_nome(self, obj):
         if obj.usuario_consumidor and obj.usuario_consumidor.usuario:
@@ -211,11 +310,26 @@ class ReclamacaoSerializer(serializers.ModelSerializer):
 
     def get_resposta(self, obj):
         # Modificado para pegar a última resposta, se houver múltiplas
-        resposta = RespostaReclamacao.objects.filter(reclamacao=obj).order_by('-data_criacao').first()
+        # Querysets montados com Reclamacao.objects.para_listagem() já trazem a última resposta
+        if hasattr(obj, 'ultimas_respostas'):
+            resposta = obj.ultimas_respostas[0] if obj.ultimas_respostas else None
+        else:
+            resposta = RespostaReclamacao.objects.filter(reclamacao=obj).order_by('-data_criacao', '-id').first()
         if resposta:
             return RespostaReclamacaoSerializer(resposta).data
         return None
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Em buscas (?search=), inclui título e trecho da descrição com os termos destacados
+        termos = self.context.get('termos_busca')
+        if termos:
+            data['destaque'] = {
+                'titulo': destacar(instance.titulo, termos),
+                'descricao': destacar(instance.descricao, termos, tamanho=200),
+            }
+        return data
+
     def create(self, validated_data):
         arquivos_data = validated_data.pop('arquivos', [])
         reclamacao = Reclamacao.objects.create(**validated_data)
@@ -224,11 +338,13 @@ class ReclamacaoSerializer(serializers.ModelSerializer):
                 reclamacao=reclamacao,
                 arquivo=arquivo_data,
                 nome_arquivo=arquivo_data.name,
-                tipo_arquivo=arquivo_data.content_type
+                tipo_arquivo=arquivo_data.content_type,
+                tamanho=arquivo_data.size,
+                sha256=calcular_sha256(arquivo_data),  # reaproveitado pelo storage
             )
         return reclamacao
 
-class RespostaReclamacaoSerializer(serializers.ModelSerializer):
+class RespostaReclamacaoSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     reclamacao_titulo = serializers.CharField(source='reclamacao.titulo', read_only=True)
     empresa_razao_social = serializers.CharField(source='empresa.razao_social', read_only=True)
     class Meta:
@@ -239,9 +355,52 @@ class RespostaReclamacaoSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('id', 'data_criacao', 'reclamacao', 'empresa')
 
-class RelatorioSerializer(serializers.ModelSerializer):
-    administrador_nome = serializers.CharField(source='administrador.nome', read_only=True)
+class RelatorioSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    administrador_nome = serializers.CharField(source='administrador.usuario.nome', read_only=True)
     class Meta:
         model = Relatorio
         fields = ('id', 'administrador', 'administrador_nome', 'titulo', 'data_geracao', 'conteudo')
-        read_only_fields = ('id', 'data_geracao')
\ No newline at end of file
+        read_only_fields = ('id', 'data_geracao')
+
+class GerarRelatorioSerializer(serializers.Serializer):
+    """Parâmetros de api.relatorios.gerar_relatorio."""
+    titulo = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    inicio = serializers.DateField()
+    fim = serializers.DateField()
+    agrupamento = serializers.ChoiceField(choices=list(AGRUPAMENTOS), default='mes')
+    empresas = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+    top = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+    def validate(self, attrs):
+        if attrs['inicio'] > attrs['fim']:
+            raise serializers.ValidationError({'fim': 'A data final deve ser igual ou posterior à inicial.'})
+        return attrs
+
+class TendenciasSerializer(serializers.Serializer):
+    """Parâmetros de api.relatorios.tendencias (query string de /empresas/<id>/tendencias/)."""
+    granularidade = serializers.ChoiceField(choices=list(GRANULARIDADES), default='semana')
+    inicio = serializers.DateField(required=False)
+    fim = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        passo = GRANULARIDADES[attrs['granularidade']][3]
+        attrs.setdefault('fim', timezone.localdate())
+        attrs.setdefault('inicio', attrs['fim'] - passo * (PERIODOS_PADRAO[attrs['granularidade']] - 1))
+        if attrs['inicio'] > attrs['fim']:
+            raise serializers.ValidationError({'fim': 'A data final deve ser igual ou posterior à inicial.'})
+        if (attrs['fim'] - attrs['inicio']) // passo >= MAXIMO_PERIODOS:
+            raise serializers.ValidationError(f'O período pode ter no máximo {MAXIMO_PERIODOS} pontos.')
+        return attrs
+
+class ExportacaoSerializer(serializers.Serializer):
+    """Parâmetros da exportação de reclamações (api.exportacao), na query string."""
+    formato = serializers.ChoiceField(choices=list(FORMATOS), default='csv')
+    empresa = serializers.IntegerField(min_value=1, required=False)
+    status = serializers.ChoiceField(choices=Reclamacao.StatusReclamacao.choices, required=False)
+    desde = serializers.DateField(required=False)
+    ate = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if 'desde' in attrs and 'ate' in attrs and attrs['desde'] > attrs['ate']:
+            raise serializers.ValidationError({'ate': 'A data final deve ser igual ou posterior à inicial.'})
+        return attrs
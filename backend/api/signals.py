@@ -1,78 +1,155 @@
-from django.db.models.signals import post_save
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.db import transaction
+from django.db.models import QuerySet
 from django.dispatch import receiver
-from django.utils import timezone
-from .models import Reclamacao, RespostaReclamacao, EstatisticaEmpresa, UsuarioEmpresa
+from rest_framework.authtoken.models import Token
+from .authentication import invalidar_token, invalidar_tokens_do_usuario
+from .cache import invalidar_empresa
+from .database import contar_conexao
+from .models import Administrador, Arquivo, Reclamacao, RespostaReclamacao, Usuario, UsuarioConsumidor, UsuarioEmpresa
+from .rollups import (
+    CAMPOS_ESTADO, aplicar_transicao_rollups, deltas_da_transicao, reconstruir_rollups, valores_atuais, valores_salvos,
+)
+from .stats import (
+    apply_complaint_transition, estado_atual, estado_salvo, marcar_estado_salvo, mark_companies_dirty,
+    mark_complaint_transition_dirty, primeira_resolucao, statistics_deferred,
+    update_companies_statistics,
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
-def update_company_statistics(company_user_empresa):
-    """Calculates and updates statistics for a given company."""
-    if not isinstance(company_user_empresa, UsuarioEmpresa):
-        logger.error(f"Invalid company_user_empresa type: {type(company_user_empresa)}")
-        return
 
-    stats, created = EstatisticaEmpresa.objects.get_or_create(usuario_empresa=company_user_empresa)
-
-    all_complaints = Reclamacao.objects.filter(empresa=company_user_empresa)
-    stats.total_reclamacoes = all_complaints.count()
-    stats.reclamacoes_resolvidas = all_complaints.filter(status='Resolvida').count()
-    stats.reclamacoes_pendentes = all_complaints.exclude(status='Resolvida').count()
-
-    resolved_complaints = all_complaints.filter(status='Resolvida')
-    total_resolution_time = timezone.timedelta(0)
-    resolved_count = 0
-
-    for complaint in resolved_complaints:
-        # Find the first response that marked it as 'Resolvida'
-        first_resolved_response = RespostaReclamacao.objects.filter(
-            reclamacao=complaint,
-            status_resolucao='Resolvida'
-        ).order_by('data_criacao').first()
-
-        if first_resolved_response:
-            time_to_resolve = first_resolved_response.data_criacao - complaint.data_criacao
-            total_resolution_time += time_to_resolve
-            resolved_count += 1
-    
-    if resolved_count > 0:
-        average_time_delta = total_resolution_time / resolved_count
-        # Convert timedelta to hours (float)
-        stats.media_tempo_resolucao = average_time_delta.total_seconds() / 3600
-    else:
-        stats.media_tempo_resolucao = 0.0
+def sincronizar_data_resolucao(complaint):
+    """Keeps Reclamacao.data_resolucao equal to the date of its first RESOLVIDA response."""
+    data_resolucao = primeira_resolucao(complaint.pk)
+    if data_resolucao != complaint.data_resolucao:
+        complaint.data_resolucao = data_resolucao
+        complaint.save(update_fields=['data_resolucao']) # This will trigger reclamacao_post_save, which updates statistics
+
+
+def invalidar_empresas_da_transicao(anterior, empresa_id):
+    invalidar_empresa(empresa_id)
+    if anterior is not None and anterior[0] != empresa_id:
+        invalidar_empresa(anterior[0])
+
+
+@receiver(post_save, sender=UsuarioEmpresa)
+@receiver(post_delete, sender=UsuarioEmpresa)
+@receiver(post_save, sender=Usuario)
+def empresa_post_save(sender, instance, **kwargs):
+    """Invalidates the cached public profile (nome/email come from Usuario, whose pk is the company's)."""
+    invalidar_empresa(instance.pk)
+
 
-    stats.save()
-    logger.info(f"Statistics updated for company {company_user_empresa.razao_social} (ID: {company_user_empresa.pk})")
+@receiver(post_delete, sender=Token)
+def token_post_delete(sender, instance, **kwargs):
+    """Logout: the token must stop authenticating right away, not when its cache entry expires."""
+    invalidar_token(instance.key)
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_save, sender=UsuarioConsumidor)
+@receiver(post_delete, sender=UsuarioConsumidor)
+@receiver(post_save, sender=UsuarioEmpresa)
+@receiver(post_delete, sender=UsuarioEmpresa)
+@receiver(post_save, sender=Administrador)
+@receiver(post_delete, sender=Administrador)
+def usuario_autenticado_post_save(sender, instance, **kwargs):
+    """Password changes, deactivation and profile edits must reach the cached token user."""
+    invalidar_tokens_do_usuario(instance.pk)
+
+
+@receiver(pre_save, sender=Reclamacao)
+def reclamacao_pre_save(sender, instance, raw=False, using=None, **kwargs):
+    """
+    Reads the saved state of a complaint whose instance lacks it (loaded with only/defer, or
+    built by hand), so post_save applies a delta instead of recounting its company.
+    """
+    if raw or instance.pk is None or estado_salvo(instance) is not None:
+        return
+    valores = Reclamacao._base_manager.using(using).filter(pk=instance.pk).values(*CAMPOS_ESTADO).first()
+    if valores is None:
+        return
+    instance._valores_carregados = {**(getattr(instance, '_valores_carregados', None) or {}), **valores}
+    # Campos adiados não são gravados por este save(): preenche com o valor lido, sem um SELECT por campo
+    for campo in instance.get_deferred_fields() & valores.keys():
+        setattr(instance, campo, valores[campo])
 
 
 @receiver(post_save, sender=Reclamacao)
 def reclamacao_post_save(sender, instance, created, **kwargs):
-    """Updates company statistics when a Reclamacao is saved."""
+    """Applies the complaint's old → new state delta to its company statistics (or queues it)."""
     logger.info(f"Reclamacao saved: {instance.id}, Created: {created}, Status: {instance.status}")
-    update_company_statistics(instance.empresa)
+
+    anterior = None if created else estado_salvo(instance)
+    invalidar_empresas_da_transicao(anterior, instance.empresa_id)
+    if not created and anterior is None:
+        # Estado anterior desconhecido mesmo após o pre_save (a linha não existia ao ler):
+        # recalcula a empresa do zero, pela fila quando as estatísticas são adiadas
+        if statistics_deferred():
+            mark_companies_dirty([instance.empresa_id], rollups=True)
+        else:
+            update_companies_statistics([instance.empresa_id])
+            reconstruir_rollups([instance.empresa_id])
+    else:
+        antes, depois = None if created else valores_salvos(instance), valores_atuais(instance)
+        if statistics_deferred():
+            # Rollups também pela fila: sem UPDATEs nas linhas quentes de cada empresa por reclamação
+            rollups = bool(deltas_da_transicao(antes, depois))
+            mark_complaint_transition_dirty(anterior, estado_atual(instance), rollups=rollups)
+        else:
+            apply_complaint_transition(anterior, estado_atual(instance))
+            aplicar_transicao_rollups(antes, depois)
+    marcar_estado_salvo(instance)
+
+
+@receiver(post_delete, sender=Reclamacao)
+def reclamacao_post_delete(sender, instance, **kwargs):
+    """Removes the deleted complaint's contribution from its company statistics (or queues it)."""
+    anterior = estado_salvo(instance) or estado_atual(instance)
+    invalidar_empresas_da_transicao(anterior, instance.empresa_id)
+    if statistics_deferred():
+        mark_complaint_transition_dirty(anterior, None, rollups=True)
+    else:
+        apply_complaint_transition(anterior, None)
+        aplicar_transicao_rollups(valores_salvos(instance) or valores_atuais(instance), None)
 
 
 @receiver(post_save, sender=RespostaReclamacao)
 def resposta_reclamacao_post_save(sender, instance, created, **kwargs):
-    """Updates company statistics when a RespostaReclamacao is saved."""
+    """Updates the complaint's resolution date (and so its statistics) when a response is saved."""
     logger.info(f"RespostaReclamacao saved: {instance.id}, Created: {created}, Status: {instance.status_resolucao}")
-    
-    complaint = instance.reclamacao
-    original_complaint_status = complaint.status
-    
-    status_changed = False
-    if instance.status_resolucao == 'Resolvida' and complaint.status != 'Resolvida':
-        complaint.status = 'Resolvida'
-        status_changed = True
-    elif instance.status_resolucao == 'Em Análise' and complaint.status != 'Em Análise':
-        complaint.status = 'Em Análise'
-        status_changed = True
-    
-    if status_changed:
-        complaint.save(update_fields=['status']) # This will trigger reclamacao_post_save, which updates statistics
-    else:
-        # If the complaint status didn't change, still update statistics to reflect
-        # potential changes in resolution time or other metrics
-        update_company_statistics(instance.empresa)
+    invalidar_empresa(instance.empresa_id)
+    # Usa a instância em cache: as views salvam essa mesma reclamação logo depois
+    sincronizar_data_resolucao(instance.reclamacao)
+
+
+@receiver(post_delete, sender=RespostaReclamacao)
+def resposta_reclamacao_post_delete(sender, instance, origin=None, **kwargs):
+    """Updates the complaint's resolution date when a response is deleted."""
+    origem = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origem is not RespostaReclamacao:
+        # Exclusão em cascata: a própria reclamação também está sendo apagada
+        return
+    complaint = Reclamacao.objects.filter(pk=instance.reclamacao_id).first()
+    if complaint is not None:
+        sincronizar_data_resolucao(complaint)
+
+
+@receiver(connection_created)
+def conexao_criada(sender, connection, **kwargs):
+    contar_conexao(connection.alias)
+
+
+@receiver(post_delete, sender=Arquivo)
+def arquivo_post_delete(sender, instance, **kwargs):
+    """Deletes the blob of the attachment after commit, if no other attachment references it."""
+    nome = instance.arquivo.name
+    if not nome:
+        return
+    storage = instance.arquivo.storage
 
+    # apagar_se_antigo() só apaga se nenhum outro anexo referenciar o blob
+    transaction.on_commit(lambda: storage.apagar_se_antigo(nome))
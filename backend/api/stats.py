@@ -0,0 +1,273 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    Case, Count, DurationField, ExpressionWrapper, F, FloatField, Min, OuterRef, Q, Subquery, Sum, Value, When
+)
+from django.utils import timezone
+from .cache import invalidar_empresa
+from .rollups import reconstruir_rollups, travar_empresas
+from .models import (
+    Reclamacao, RespostaReclamacao, EstatisticaEmpresa, EstatisticaEmpresaPendente, UsuarioEmpresa
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_CONTADORES = (
+    'total_reclamacoes', 'reclamacoes_resolvidas', 'reclamacoes_pendentes',
+    'soma_tempo_resolucao', 'reclamacoes_com_tempo_resolucao',
+)
+
+
+def contribuicao(status, data_criacao, data_resolucao):
+    """Returns how much a single complaint in the given state adds to its company's counters."""
+    encerrada = status == Reclamacao.StatusReclamacao.ENCERRADA
+    medida = encerrada and data_resolucao is not None and data_criacao is not None
+    return {
+        'total_reclamacoes': 1,
+        'reclamacoes_resolvidas': 1 if encerrada else 0,
+        'reclamacoes_pendentes': 0 if encerrada else 1,
+        'soma_tempo_resolucao': (data_resolucao - data_criacao).total_seconds() / 3600 if medida else 0.0,
+        'reclamacoes_com_tempo_resolucao': 1 if medida else 0,
+    }
+
+
+def estado_salvo(reclamacao):
+    """
+    Returns (empresa_id, contribuicao) for the complaint as last read from or written to
+    the database, or None when it is unknown (new instance or partially loaded fields).
+    """
+    valores = getattr(reclamacao, '_valores_carregados', None)
+    if not valores or not {'empresa_id', 'status', 'data_criacao', 'data_resolucao'} <= valores.keys():
+        return None
+    return valores['empresa_id'], contribuicao(valores['status'], valores['data_criacao'], valores['data_resolucao'])
+
+
+def estado_atual(reclamacao):
+    return reclamacao.empresa_id, contribuicao(reclamacao.status, reclamacao.data_criacao, reclamacao.data_resolucao)
+
+
+def marcar_estado_salvo(reclamacao):
+    reclamacao._valores_carregados = {
+        'empresa_id': reclamacao.empresa_id,
+        'status': reclamacao.status,
+        'data_criacao': reclamacao.data_criacao,
+        'data_resolucao': reclamacao.data_resolucao,
+    }
+
+
+def apply_statistics_delta(empresa_id, delta, criar=True):
+    """
+    Applies counter deltas to a company's EstatisticaEmpresa with a single atomic UPDATE,
+    recomputing the average resolution time from the running sum/count in the same statement.
+    When the company has no statistics row yet it is computed from scratch, unless criar=False.
+    """
+    if not any(delta.values()):
+        return
+
+    nova_soma = F('soma_tempo_resolucao') + Value(delta['soma_tempo_resolucao'])
+    nova_contagem = F('reclamacoes_com_tempo_resolucao') + Value(delta['reclamacoes_com_tempo_resolucao'])
+    atualizados = EstatisticaEmpresa.objects.filter(usuario_empresa_id=empresa_id).update(
+        media_tempo_resolucao=Case(
+            When(
+                reclamacoes_com_tempo_resolucao__gt=-delta['reclamacoes_com_tempo_resolucao'],
+                then=ExpressionWrapper(nova_soma / nova_contagem, output_field=FloatField()),
+            ),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ),
+        **{campo: F(campo) + Value(valor) for campo, valor in delta.items()}
+    )
+
+    if not atualizados and criar:
+        # Empresa ainda sem linha de estatísticas: calcula tudo uma única vez
+        empresa = UsuarioEmpresa.objects.filter(pk=empresa_id).first()
+        if empresa is not None:
+            update_company_statistics(empresa)
+
+
+def apply_complaint_transition(anterior, atual):
+    """
+    Applies the change between two (empresa_id, contribuicao) states of a complaint.
+    Either side may be None for creation/deletion; deletions never create statistics rows,
+    since the company itself may be in the middle of a cascade delete.
+    """
+    deltas = {}
+    if anterior is not None:
+        empresa_id, valores = anterior
+        delta = deltas.setdefault(empresa_id, dict.fromkeys(CAMPOS_CONTADORES, 0))
+        for campo, valor in valores.items():
+            delta[campo] -= valor
+    if atual is not None:
+        empresa_id, valores = atual
+        delta = deltas.setdefault(empresa_id, dict.fromkeys(CAMPOS_CONTADORES, 0))
+        for campo, valor in valores.items():
+            delta[campo] += valor
+
+    for empresa_id, delta in deltas.items():
+        apply_statistics_delta(empresa_id, delta, criar=atual is not None)
+
+
+def primeira_resolucao(reclamacao_id):
+    """Returns the creation date of the first RESOLVIDA response of a complaint, if any."""
+    return RespostaReclamacao.objects.filter(
+        reclamacao_id=reclamacao_id,
+        status_resolucao=RespostaReclamacao.StatusResolucao.RESOLVIDA,
+    ).aggregate(primeira=Min('data_criacao'))['primeira']
+
+
+def _agregados_estatisticas():
+    """
+    Aggregate expressions for every counter, computed over Reclamacao in a single query.
+    The first RESOLVIDA response of each complaint comes from a correlated Min() subquery,
+    so the resolution time never depends on the denormalized data_resolucao.
+    """
+    primeira_resolucao = Subquery(
+        RespostaReclamacao.objects.filter(
+            reclamacao=OuterRef('pk'), status_resolucao=RespostaReclamacao.StatusResolucao.RESOLVIDA
+        ).values('reclamacao').annotate(primeira=Min('data_criacao')).values('primeira')
+    )
+    encerrada = Q(status=Reclamacao.StatusReclamacao.ENCERRADA)
+    # Count/Sum ignoram NULL: reclamações encerradas sem resposta RESOLVIDA ficam fora da média
+    return {
+        'total_reclamacoes': Count('id'),
+        'reclamacoes_resolvidas': Count('id', filter=encerrada),
+        'reclamacoes_pendentes': Count('id', filter=~encerrada),
+        'reclamacoes_com_tempo_resolucao': Count(primeira_resolucao, filter=encerrada),
+        'tempo_total_resolucao': Sum(
+            primeira_resolucao - F('data_criacao'), filter=encerrada, output_field=DurationField()
+        ),
+    }
+
+
+def _valores_estatisticas(linha=None):
+    """Turns one aggregate row (or None for a company without complaints) into model field values."""
+    valores = dict.fromkeys(CAMPOS_CONTADORES, 0)
+    valores['soma_tempo_resolucao'] = 0.0
+    valores['media_tempo_resolucao'] = 0.0
+    if linha is None:
+        return valores
+
+    for campo in ('total_reclamacoes', 'reclamacoes_resolvidas', 'reclamacoes_pendentes',
+                  'reclamacoes_com_tempo_resolucao'):
+        valores[campo] = linha[campo]
+    if linha['tempo_total_resolucao'] is not None:
+        valores['soma_tempo_resolucao'] = linha['tempo_total_resolucao'].total_seconds() / 3600
+    if valores['reclamacoes_com_tempo_resolucao'] > 0:
+        valores['media_tempo_resolucao'] = valores['soma_tempo_resolucao'] / valores['reclamacoes_com_tempo_resolucao']
+    return valores
+
+
+def calculate_companies_statistics(empresa_ids):
+    """Computes every EstatisticaEmpresa counter from scratch for N companies in one grouped query."""
+    empresa_ids = list(empresa_ids)
+    linhas = (
+        Reclamacao.objects.filter(empresa_id__in=empresa_ids)
+        .values('empresa_id')
+        .annotate(**_agregados_estatisticas())
+        .order_by()
+    )
+    por_empresa = {linha['empresa_id']: linha for linha in linhas}
+    return {empresa_id: _valores_estatisticas(por_empresa.get(empresa_id)) for empresa_id in empresa_ids}
+
+
+def calculate_company_statistics(company_user_empresa):
+    """Computes every EstatisticaEmpresa counter for a company from scratch (single query)."""
+    linha = Reclamacao.objects.filter(empresa=company_user_empresa).aggregate(**_agregados_estatisticas())
+    return _valores_estatisticas(linha)
+
+
+def update_companies_statistics(empresa_ids):
+    """Recomputes and upserts the statistics of N companies: one aggregate query plus one write."""
+    calculadas = calculate_companies_statistics(empresa_ids)
+    if not calculadas:
+        return calculadas
+    campos = list(CAMPOS_CONTADORES) + ['media_tempo_resolucao']
+    EstatisticaEmpresa.objects.bulk_create(
+        [EstatisticaEmpresa(usuario_empresa_id=empresa_id, **valores) for empresa_id, valores in calculadas.items()],
+        update_conflicts=True,
+        unique_fields=['usuario_empresa'],
+        update_fields=campos,
+    )
+    for empresa_id in calculadas:
+        invalidar_empresa(empresa_id)
+    logger.info(f"Statistics updated for {len(calculadas)} companies")
+    return calculadas
+
+
+def update_company_statistics(company_user_empresa):
+    """Calculates and updates statistics for a given company."""
+    if not isinstance(company_user_empresa, UsuarioEmpresa):
+        logger.error(f"Invalid company_user_empresa type: {type(company_user_empresa)}")
+        return
+
+    valores = update_companies_statistics([company_user_empresa.pk])[company_user_empresa.pk]
+    logger.info(f"Statistics updated for company {company_user_empresa.razao_social} (ID: {company_user_empresa.pk})")
+    return valores
+
+
+def statistics_deferred():
+    """True when signals should only queue companies for process_statistics_queue."""
+    return settings.ESTATISTICAS_MAX_STALENESS > 0
+
+
+def mark_companies_dirty(empresa_ids, rollups=False):
+    """
+    Queues companies for recomputation. Deduplicated by the primary key: a company already
+    in the queue keeps its original data_marcacao and only gets data_atualizacao bumped.
+    With `rollups`, the worker also rebuilds their rollups; a later mark without it keeps the flag.
+    """
+    agora = timezone.now()
+    EstatisticaEmpresaPendente.objects.bulk_create(
+        [EstatisticaEmpresaPendente(usuario_empresa_id=empresa_id, data_atualizacao=agora, reconstruir_rollups=rollups)
+         for empresa_id in set(empresa_ids)],
+        update_conflicts=True,
+        unique_fields=['usuario_empresa'],
+        update_fields=['data_atualizacao', 'reconstruir_rollups'] if rollups else ['data_atualizacao'],
+    )
+
+
+def mark_complaint_transition_dirty(anterior, atual, rollups=False):
+    """
+    Deferred counterpart of apply_complaint_transition. With `rollups`, also of
+    aplicar_transicao_rollups: the worker rebuilds the companies' rollups instead.
+    """
+    empresa_ids = {estado[0] for estado in (anterior, atual) if estado is not None}
+    if atual is not None:
+        if rollups:
+            # Um rebuild em andamento termina antes da marca, que fica com data_atualizacao
+            # posterior ao seu corte e continua na fila
+            travar_empresas(empresa_ids)
+        mark_companies_dirty(empresa_ids, rollups=rollups)
+        return
+
+    def marcar_empresas_existentes():
+        # Após o commit: se a exclusão veio da própria empresa, ela não existe mais
+        existentes = UsuarioEmpresa.objects.filter(pk__in=empresa_ids).values_list('pk', flat=True)
+        mark_companies_dirty(existentes, rollups=rollups)
+    transaction.on_commit(marcar_empresas_existentes)
+
+
+def process_dirty_companies(batch_size=100):
+    """
+    Drains one batch of the queue, oldest marks first, recomputing each company once (and its
+    rollups, when flagged). Companies marked again while the batch was being processed stay queued.
+    Returns the number of companies processed.
+    """
+    corte = timezone.now()
+    marcadas = dict(
+        EstatisticaEmpresaPendente.objects.filter(data_atualizacao__lte=corte)
+        .order_by('data_marcacao')
+        .values_list('usuario_empresa_id', 'reconstruir_rollups')[:batch_size]
+    )
+    if not marcadas:
+        return 0
+
+    lote = list(marcadas)
+    existentes = UsuarioEmpresa.objects.filter(pk__in=lote).values_list('pk', flat=True)
+    update_companies_statistics(existentes)
+    rollups = [empresa_id for empresa_id, reconstruir in marcadas.items() if reconstruir]
+    if rollups:
+        reconstruir_rollups(rollups)
+    EstatisticaEmpresaPendente.objects.filter(usuario_empresa_id__in=lote, data_atualizacao__lte=corte).delete()
+    return len(lote)
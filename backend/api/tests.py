@@ -1,9 +1,64 @@
 # tests.py
-from django.test import TestCase
-from rest_framework.test import APITestCase
+from datetime import timedelta
+from io import BytesIO, StringIO
+from concurrent.futures import Future
+import csv
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase, force_authenticate
+from . import hashing, previews, views
+from .authentication import chave_do_token
+from .cache import cache_stats, reset_cache_stats
+from .database import estatisticas_banco, reset_estatisticas_banco
+from .middleware import COOKIE_PRIMARIO, leitura_em_replica_middleware
+from .relatorios import gerar_conteudo, percentis
+from .models import (
+    Usuario, UsuarioConsumidor, UsuarioEmpresa, Administrador, EstatisticaEmpresa, EstatisticaEmpresaPendente,
+    Reclamacao, Arquivo, UploadArquivo, RespostaReclamacao, Relatorio, ReclamacaoDiaria, ResolucaoDiaria,
+    ReclamacaoSemanal
+)
+from .routers import ReplicaRouter, ler_da_replica
+from .stats import mark_companies_dirty
 # from .models import Usuario, Empresa, Consumidor, Administrador
 
 
+def criar_empresa(email='empresa@teste.com', cnpj='00.000.000/0001-00', razao_social='Empresa Teste'):
+    usuario = Usuario.objects.create_user(email=email, password='senha-forte-123', nome=razao_social)
+    return UsuarioEmpresa.objects.create(usuario=usuario, cnpj=cnpj, razao_social=razao_social)
+
+
+def criar_consumidor(email='consumidor@teste.com', nome='Consumidor Teste'):
+    usuario = Usuario.objects.create_user(email=email, password='senha-forte-123', nome=nome)
+    return UsuarioConsumidor.objects.create(usuario=usuario)
+
+
+def criar_reclamacao(consumidor, empresa, titulo='Produto com defeito', **kwargs):
+    return Reclamacao.objects.create(
+        usuario_consumidor=consumidor, empresa=empresa, titulo=titulo,
+        descricao=kwargs.pop('descricao', 'Descrição da reclamação'), **kwargs
+    )
+
+
 class EmpresaCadastroTestCase(APITestCase):
     """Testes para cadastro de empresas"""
     
@@ -63,6 +118,1707 @@ class EmpresaModelTestCase(TestCase):
         pass
     
 
+class ReclamacaoListagemQueriesTestCase(APITestCase):
+    """Testes para o número de queries da listagem de reclamações"""
+
+    def setUp(self):
+        self.empresa = criar_empresa()
+        self.consumidor = criar_consumidor()
+
+    def criar_reclamacoes(self, quantidade):
+        for i in range(quantidade):
+            reclamacao = criar_reclamacao(self.consumidor, self.empresa, titulo=f'Reclamação {i}')
+            Arquivo.objects.create(
+                reclamacao=reclamacao, arquivo=f'arquivos_reclamacoes/nota_{i}.pdf',
+                nome_arquivo=f'nota_{i}.pdf', tipo_arquivo='application/pdf'
+            )
+            for descricao in ('Primeira resposta', 'Última resposta'):
+                RespostaReclamacao.objects.create(reclamacao=reclamacao, empresa=self.empresa, descricao=descricao)
+
+    def contar_queries_da_listagem(self):
+        with self.assertNumQueries(4) as contexto:  # count, reclamações, arquivos, última resposta
+            response = self.client.get('/api/reclamacoes/')
+        self.assertEqual(response.status_code, 200)
+        return response, len(contexto.captured_queries)
+
+    def test_queries_constantes_independente_do_tamanho_da_pagina(self):
+        """Teste: Listagem deve usar o mesmo número de queries para 2 ou 20 reclamações"""
+        self.criar_reclamacoes(2)
+        _, queries_pagina_pequena = self.contar_queries_da_listagem()
+
+        self.criar_reclamacoes(18)
+        response, queries_pagina_cheia = self.contar_queries_da_listagem()
+
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(queries_pagina_pequena, queries_pagina_cheia)
+
+    def test_listagem_retorna_ultima_resposta_e_arquivos(self):
+        """Teste: Cada reclamação listada deve trazer a última resposta, arquivos e nomes relacionados"""
+        self.criar_reclamacoes(1)
+        response, _ = self.contar_queries_da_listagem()
+
+        reclamacao = response.data['results'][0]
+        self.assertEqual(reclamacao['resposta']['descricao'], 'Última resposta')
+        self.assertEqual(reclamacao['resposta']['reclamacao_titulo'], 'Reclamação 0')
+        self.assertEqual(reclamacao['resposta']['empresa_razao_social'], 'Empresa Teste')
+        self.assertEqual(len(reclamacao['arquivos']), 1)
+        self.assertEqual(reclamacao['usuario_consumidor_nome'], 'Consumidor Teste')
+        self.assertEqual(reclamacao['empresa_razao_social'], 'Empresa Teste')
+
+
+class CamposEsparsosTestCase(APITestCase):
+    """Testes para ?fields=/?omit=/?expand= e a poda do queryset correspondente"""
+
+    def setUp(self):
+        self.empresa = criar_empresa()
+        self.consumidor = criar_consumidor()
+        for i in range(5):
+            reclamacao = criar_reclamacao(self.consumidor, self.empresa, titulo=f'Reclamação {i}')
+            RespostaReclamacao.objects.create(reclamacao=reclamacao, empresa=self.empresa, descricao='Resposta')
+
+    def test_fields_dispensa_colunas_e_prefetches(self):
+        """Teste: ?fields=id,titulo lê só essas colunas, sem JOINs nem prefetches"""
+        with CaptureQueriesContext(connection) as contexto:
+            response = self.client.get('/api/reclamacoes/', {'fields': 'id,titulo'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'titulo'})
+        self.assertEqual(len(contexto.captured_queries), 2)  # count, reclamações
+        listagem = contexto.captured_queries[1]['sql']
+        self.assertNotIn('descricao', listagem)
+        self.assertNotIn('JOIN', listagem)
+
+    def test_omit_remove_campos_pesados(self):
+        """Teste: ?omit=arquivos,resposta evita as queries de prefetch"""
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/reclamacoes/', {'omit': 'arquivos,resposta'})
+        self.assertNotIn('arquivos', response.data['results'][0])
+        self.assertIn('usuario_consumidor_nome', response.data['results'][0])
+
+    def test_campos_relacionados_nao_geram_n_mais_1(self):
+        """Teste: Campos de relações e a última resposta continuam carregados em lote"""
+        with self.assertNumQueries(3):  # count, reclamações, última resposta
+            response = self.client.get('/api/reclamacoes/', {'fields': 'empresa_razao_social,resposta'})
+        self.assertEqual(response.data['results'][0]['resposta']['reclamacao_titulo'], 'Reclamação 4')
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/empresas/', {'fields': 'display_id,display_nome'})
+        self.assertEqual(response.data['results'][0], {'display_id': self.empresa.pk, 'display_nome': 'Empresa Teste'})
+
+    def test_cursor_e_busca_com_campos_podados(self):
+        """Teste: O cursor e o destaque da busca leem campos que não foram pedidos"""
+        for i in range(5, 21):
+            criar_reclamacao(self.consumidor, self.empresa, titulo=f'Reclamação {i}')
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/reclamacoes/', {'fields': 'id', 'pagination': 'cursor'})
+        self.assertIsNotNone(response.data['next'])
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/reclamacoes/', {'fields': 'id', 'search': 'reclamacao 20'})
+        self.assertEqual(response.data['results'][0]['destaque']['titulo'], '<mark>Reclamação</mark> <mark>20</mark>')
+
+    def test_fields_na_escrita_so_afeta_a_saida(self):
+        """Teste: Em um POST, ?fields= não impede a validação dos campos enviados"""
+        self.client.force_authenticate(user=self.consumidor.usuario)
+        response = self.client.post('/api/reclamacoes/?fields=id', {
+            'empresa': self.empresa.pk, 'titulo': 'Nova reclamação', 'descricao': 'Detalhes'
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(set(response.data), {'id'})
+        self.assertEqual(Reclamacao.objects.get(pk=response.data['id']).titulo, 'Nova reclamação')
+
+
+class EstatisticaEmpresaIncrementalTestCase(APITestCase):
+    """Testes para a manutenção incremental de EstatisticaEmpresa"""
+
+    def setUp(self):
+        self.empresa = criar_empresa()
+        EstatisticaEmpresa.objects.create(usuario_empresa=self.empresa)
+        self.consumidor = criar_consumidor()
+
+    def estatisticas(self):
+        return EstatisticaEmpresa.objects.get(usuario_empresa=self.empresa)
+
+    def criar_reclamacao_de_duas_horas(self):
+        reclamacao = criar_reclamacao(self.consumidor, self.empresa)
+        Reclamacao.objects.filter(pk=reclamacao.pk).update(data_criacao=reclamacao.data_criacao - timedelta(hours=2))
+        return Reclamacao.objects.get(pk=reclamacao.pk)
+
+    def resolver(self, reclamacao):
+        resposta = RespostaReclamacao.objects.create(reclamacao=reclamacao, empresa=self.empresa, descricao='Resolvido')
+        self.client.force_authenticate(self.consumidor.usuario)
+        response = self.client.patch(
+            f'/api/respostas-reclamacao/{resposta.pk}/status/',
+            {'status_resolucao': RespostaReclamacao.StatusResolucao.RESOLVIDA}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_criacao_incrementa_total_e_pendentes(self):
+        """Teste: Nova reclamação deve contar como total e pendente"""
+        criar_reclamacao(self.consumidor, self.empresa)
+        stats = self.estatisticas()
+        self.assertEqual((stats.total_reclamacoes, stats.reclamacoes_pendentes, stats.reclamacoes_resolvidas), (1, 1, 0))
+
+    def test_resolucao_atualiza_contadores_e_media(self):
+        """Teste: Resolver uma reclamação deve mover o contador e registrar o tempo de resolução"""
+        self.resolver(self.criar_reclamacao_de_duas_horas())
+        criar_reclamacao(self.consumidor, self.empresa)
+
+        stats = self.estatisticas()
+        self.assertEqual((stats.total_reclamacoes, stats.reclamacoes_pendentes, stats.reclamacoes_resolvidas), (2, 1, 1))
+        self.assertEqual(stats.reclamacoes_com_tempo_resolucao, 1)
+        self.assertAlmostEqual(stats.media_tempo_resolucao, 2.0, places=2)
+        call_command('rebuild_company_statistics', verify=True, stdout=StringIO())
+
+    def test_exclusao_remove_contribuicao(self):
+        """Teste: Excluir reclamações (inclusive em cascata) deve zerar os contadores"""
+        reclamacao = self.criar_reclamacao_de_duas_horas()
+        self.resolver(reclamacao)
+        Reclamacao.objects.get(pk=reclamacao.pk).delete()
+
+        stats = self.estatisticas()
+        self.assertEqual((stats.total_reclamacoes, stats.reclamacoes_resolvidas, stats.reclamacoes_com_tempo_resolucao), (0, 0, 0))
+        self.assertEqual(stats.media_tempo_resolucao, 0.0)
+
+    def test_custo_de_criacao_nao_depende_do_historico(self):
+        """Teste: Criar uma reclamação deve custar o mesmo número de queries com 1 ou 30 anteriores"""
+        criar_reclamacao(self.consumidor, self.empresa)
+        # INSERT da reclamação + UPDATE das estatísticas + UPDATE dos rollups diário e semanal
+        with self.assertNumQueries(4) as contexto:
+            criar_reclamacao(self.consumidor, self.empresa)
+        for _ in range(30):
+            criar_reclamacao(self.consumidor, self.empresa)
+        with self.assertNumQueries(len(contexto.captured_queries)):
+            criar_reclamacao(self.consumidor, self.empresa)
+
+    def test_recalculo_em_lote_usa_uma_query_agrupada(self):
+        """Teste: O recálculo de N empresas deve usar uma única query agregada"""
+        from .stats import calculate_company_statistics, calculate_companies_statistics
+
+        outra_empresa = criar_empresa(email='outra@teste.com', cnpj='11.111.111/0001-11', razao_social='Outra')
+        self.resolver(self.criar_reclamacao_de_duas_horas())
+        criar_reclamacao(self.consumidor, outra_empresa)
+        sem_reclamacoes = criar_empresa(email='vazia@teste.com', cnpj='22.222.222/0001-22', razao_social='Vazia')
+
+        ids = [self.empresa.pk, outra_empresa.pk, sem_reclamacoes.pk]
+        with self.assertNumQueries(1):
+            calculadas = calculate_companies_statistics(ids)
+
+        self.assertEqual(calculadas[self.empresa.pk], calculate_company_statistics(self.empresa))
+        self.assertAlmostEqual(calculadas[self.empresa.pk]['media_tempo_resolucao'], 2.0, places=2)
+        self.assertEqual(calculadas[outra_empresa.pk]['reclamacoes_pendentes'], 1)
+        self.assertEqual(calculadas[sem_reclamacoes.pk]['total_reclamacoes'], 0)
+
+    def test_verify_detecta_e_rebuild_corrige_divergencias(self):
+        """Teste: O comando deve apontar contadores divergentes e corrigi-los"""
+        criar_reclamacao(self.consumidor, self.empresa)
+        EstatisticaEmpresa.objects.filter(usuario_empresa=self.empresa).update(total_reclamacoes=99)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_company_statistics', verify=True, stdout=StringIO())
+        call_command('rebuild_company_statistics', stdout=StringIO())
+        self.assertEqual(self.estatisticas().total_reclamacoes, 1)
+
+
+@override_settings(ESTATISTICAS_MAX_STALENESS=60)
+class EstatisticaEmpresaFilaTestCase(TestCase):
+    """Testes para o recálculo adiado das estatísticas (fila de empresas pendentes)"""
+
+    def setUp(self):
+        self.empresa = criar_empresa()
+        EstatisticaEmpresa.objects.create(usuario_empresa=self.empresa)
+        self.consumidor = criar_consumidor()
+
+    def test_signals_apenas_marcam_empresa_uma_vez(self):
+        """Teste: Várias alterações devem gerar uma única entrada na fila, sem tocar nas estatísticas"""
+        for _ in range(3):
+            criar_reclamacao(self.consumidor, self.empresa)
+
+        self.assertEqual(EstatisticaEmpresaPendente.objects.filter(usuario_empresa=self.empresa).count(), 1)
+        self.assertEqual(EstatisticaEmpresa.objects.get(usuario_empresa=self.empresa).total_reclamacoes, 0)
+
+    def test_worker_recalcula_e_esvazia_fila(self):
+        """Teste: O comando deve recalcular as empresas pendentes e removê-las da fila"""
+        for _ in range(3):
+            criar_reclamacao(self.consumidor, self.empresa)
+
+        call_command('process_statistics_queue', stdout=StringIO())
+
+        self.assertEqual(EstatisticaEmpresa.objects.get(usuario_empresa=self.empresa).total_reclamacoes, 3)
+        self.assertFalse(EstatisticaEmpresaPendente.objects.exists())
+
+    def test_exclusao_marca_empresa_apos_commit(self):
+        """Teste: Excluir uma reclamação deve enfileirar a empresa quando a transação confirmar"""
+        reclamacao = criar_reclamacao(self.consumidor, self.empresa)
+        EstatisticaEmpresaPendente.objects.all().delete()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reclamacao.delete()
+        self.assertTrue(EstatisticaEmpresaPendente.objects.filter(usuario_empresa=self.empresa).exists())
+
+    def test_exclusao_da_empresa_nao_enfileira(self):
+        """Teste: Excluir a empresa (cascata nas reclamações) não deve deixar entrada órfã na fila"""
+        criar_reclamacao(self.consumidor, self.empresa)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.empresa.usuario.delete()
+        self.assertFalse(EstatisticaEmpresaPendente.objects.exists())
+
+    def test_rollups_pela_fila(self):
+        """Teste: Com estatísticas adiadas, os rollups também só mudam pelo worker"""
+        reclamacao = criar_reclamacao(self.consumidor, self.empresa)
+        self.assertFalse(ReclamacaoDiaria.objects.exists())
+        self.assertTrue(EstatisticaEmpresaPendente.objects.get(usuario_empresa=self.empresa).reconstruir_rollups)
+        call_command('process_statistics_queue', stdout=StringIO())
+        self.assertEqual(ReclamacaoDiaria.objects.get(empresa=self.empresa).total, 1)
+
+        # Editar o título não muda rollup nenhum: a marca não pede reconstrução
+        reclamacao.titulo = 'Outro título'
+        reclamacao.save()
+        self.assertFalse(EstatisticaEmpresaPendente.objects.get(usuario_empresa=self.empresa).reconstruir_rollups)
+
+    def test_worker_refaz_rollups_marcados(self):
+        """Teste: Empresas marcadas com rollups=True também têm os rollups refeitos pelo worker"""
+        criar_reclamacao(self.consumidor, self.empresa)
+        ReclamacaoDiaria.objects.all().delete()
+        mark_companies_dirty([self.empresa.pk], rollups=True)
+        mark_companies_dirty([self.empresa.pk])  # Marca comum depois: a pendência dos rollups continua
+
+        call_command('process_statistics_queue', stdout=StringIO())
+        self.assertEqual(ReclamacaoDiaria.objects.get(empresa=self.empresa).total, 1)
+        self.assertFalse(EstatisticaEmpresaPendente.objects.exists())
+
+
+class PaginacaoCursorTestCase(APITestCase):
+    """Testes para a paginação por cursor (keyset) e sem COUNT"""
+
+    def setUp(self):
+        empresa = criar_empresa()
+        consumidor = criar_consumidor()
+        for i in range(45):
+            criar_reclamacao(consumidor, empresa, titulo=f'Reclamação {i}')
+        # Datas repetidas: o id precisa desempatar sem pular nem repetir linhas
+        primeira = Reclamacao.objects.order_by('data_criacao').first()
+        Reclamacao.objects.filter(pk__lte=primeira.pk + 20).update(data_criacao=primeira.data_criacao)
+        self.esperado = list(Reclamacao.objects.order_by('-data_criacao', '-id').values_list('id', flat=True))
+
+    def test_cursor_percorre_todas_as_reclamacoes_sem_count(self):
+        """Teste: Seguir o `next` do cursor deve trazer todas as reclamações, em ordem, sem COUNT(*)"""
+        ids, url = [], '/api/reclamacoes/?pagination=cursor'
+        while url:
+            with self.assertNumQueries(3) as contexto:  # página, arquivos, última resposta
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(any('COUNT(' in query['sql'] for query in contexto.captured_queries))
+            self.assertIsNone(response.data['count'])
+            ids += [reclamacao['id'] for reclamacao in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(ids, self.esperado)
+
+    def test_cursor_invalido(self):
+        """Teste: Cursor adulterado deve retornar 404"""
+        response = self.client.get('/api/reclamacoes/?cursor=invalido')
+        self.assertEqual(response.status_code, 404)
+
+    def test_paginas_sem_total(self):
+        """Teste: ?count=false deve manter as páginas numeradas, sem o total"""
+        response = self.client.get('/api/reclamacoes/?count=false&page=2')
+        self.assertIsNone(response.data['count'])
+        self.assertEqual([r['id'] for r in response.data['results']], self.esperado[20:40])
+        self.assertIn('page=3', response.data['next'])
+        self.assertNotIn('page=', response.data['previous'])
+
+    def test_cursor_de_empresas(self):
+        """Teste: Empresas devem ser paginadas por cursor sobre a chave primária"""
+        for i in range(1, 22):
+            criar_empresa(email=f'empresa{i}@teste.com', cnpj=f'{i:014d}', razao_social=f'Empresa {i}')
+        primeira = self.client.get('/api/empresas/?pagination=cursor')
+        segunda = self.client.get(primeira.data['next'])
+        ids = [e['display_id'] for e in primeira.data['results'] + segunda.data['results']]
+        self.assertEqual(ids, list(UsuarioEmpresa.objects.order_by('pk').values_list('pk', flat=True)))
+        self.assertIsNone(segunda.data['next'])
+
+    def test_busca_ignora_cursor_e_mantem_relevancia(self):
+        """Teste: Com ?search= o modo cursor é ignorado e a ordem continua sendo a relevância"""
+        no_titulo = Reclamacao.objects.order_by('id').first()
+        Reclamacao.objects.filter(pk=no_titulo.pk).update(busca_titulo='geladeira', busca_texto='geladeira')
+        na_descricao = Reclamacao.objects.order_by('-id').first()
+        Reclamacao.objects.filter(pk=na_descricao.pk).update(busca_texto='reclamacao geladeira')
+
+        response = self.client.get('/api/reclamacoes/', {'search': 'geladeira', 'pagination': 'cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['id'] for r in response.data['results']], [no_titulo.pk, na_descricao.pk])
+        self.assertEqual(response.data['count'], 2)
+
+    def test_paginas_numeradas_continuam_padrao(self):
+        """Teste: Sem parâmetros a resposta continua com count e páginas numeradas"""
+        response = self.client.get('/api/reclamacoes/')
+        self.assertEqual(response.data['count'], 45)
+        self.assertIn('page=2', response.data['next'])
+
+
+class BuscaEmpresasTestCase(APITestCase):
+    """Testes para a busca de empresas (nome normalizado e prefixo de CNPJ)"""
+
+    def setUp(self):
+        self.padaria = criar_empresa(email='padaria@teste.com', cnpj='12.345.678/0001-90', razao_social='Padaria São João')
+        self.cafe = criar_empresa(email='cafe@teste.com', cnpj='98.765.432/0001-10', razao_social='Café do João')
+        self.sao = criar_empresa(email='sao@teste.com', cnpj='55.555.555/0001-55', razao_social='São Paulo Transportes')
+
+    def buscar(self, termo):
+        response = self.client.get('/api/empresas/', {'search': termo})
+        self.assertEqual(response.status_code, 200)
+        return [empresa['display_id'] for empresa in response.data['results']]
+
+    def test_busca_ignora_acentos_e_maiusculas(self):
+        """Teste: 'SAO JOAO' deve encontrar 'Padaria São João'"""
+        self.assertEqual(self.buscar('SAO JOAO'), [self.padaria.pk])
+
+    def test_busca_por_prefixo_de_cnpj(self):
+        """Teste: Dígitos (com ou sem pontuação) devem casar com o início do CNPJ"""
+        self.assertEqual(self.buscar('12.345'), [self.padaria.pk])
+        self.assertEqual(self.buscar('9876543200'), [self.cafe.pk])
+        self.assertEqual(self.buscar('45678'), [])
+
+    def test_ranking_prioriza_inicio_do_nome(self):
+        """Teste: Empresas cujo nome começa com o termo vêm antes das que só o contêm"""
+        self.assertEqual(self.buscar('sao'), [self.sao.pk, self.padaria.pk])
+
+    def test_campos_de_busca_acompanham_edicao(self):
+        """Teste: Alterar o nome social deve atualizar a coluna de busca"""
+        self.cafe.nome_social = 'Cafeteria Aurora'
+        self.cafe.save(update_fields=['nome_social'])
+        self.assertEqual(self.buscar('aurora'), [self.cafe.pk])
+
+    def test_nome_que_cresce_ao_normalizar(self):
+        """Teste: 'ß' vira 'ss' na normalização; a coluna de busca é cortada no seu tamanho"""
+        empresa = criar_empresa(email='longa@teste.com', cnpj='22.222.222/0001-22', razao_social='ß' * 255)
+        empresa.nome_social = 'ß' * 255
+        empresa.save()
+        self.assertEqual(len(empresa.busca_nome), 511)
+        self.assertEqual(self.buscar('ssss'), [empresa.pk])
+
+    def test_busca_vazia_lista_todas(self):
+        """Teste: ?search= vazio (ou só espaços) não filtra a listagem"""
+        todas = [self.padaria.pk, self.cafe.pk, self.sao.pk]
+        self.assertEqual(self.buscar(''), todas)
+        self.assertEqual(self.buscar('   '), todas)
+
+
+class BuscaReclamacoesTestCase(APITestCase):
+    """Testes para a busca textual de reclamações"""
+
+    def setUp(self):
+        empresa = criar_empresa()
+        consumidor = criar_consumidor()
+        self.no_titulo = criar_reclamacao(consumidor, empresa, titulo='Geladeira quebrada',
+                                          descricao='Chegou com a porta amassada.')
+        self.na_descricao = criar_reclamacao(consumidor, empresa, titulo='Entrega atrasada',
+                                             descricao='Além do atraso, a GELADEIRA veio sem manual.')
+        criar_reclamacao(consumidor, empresa, titulo='Cobrança indevida', descricao='Fatura em dobro.')
+
+    def buscar(self, termo):
+        response = self.client.get('/api/reclamacoes/', {'search': termo})
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_busca_ordena_por_relevancia(self):
+        """Teste: Reclamações com o termo no título vêm antes das que só o têm na descrição"""
+        ids = [reclamacao['id'] for reclamacao in self.buscar('geladeira')]
+        self.assertEqual(ids, [self.no_titulo.pk, self.na_descricao.pk])
+
+    def test_busca_exige_todos_os_termos_sem_acentos(self):
+        """Teste: Todos os termos devem aparecer, ignorando acentos e maiúsculas"""
+        ids = [reclamacao['id'] for reclamacao in self.buscar('ALEM geladeira')]
+        self.assertEqual(ids, [self.na_descricao.pk])
+
+    def test_busca_retorna_destaque(self):
+        """Teste: Resultados de busca trazem os termos destacados"""
+        resultado = self.buscar('geladeira')[1]
+        self.assertEqual(resultado['destaque']['descricao'], 'Além do atraso, a <mark>GELADEIRA</mark> veio sem manual.')
+
+    def test_edicao_atualiza_coluna_de_busca(self):
+        """Teste: Editar a descrição deve refletir na busca"""
+        self.no_titulo.descricao = 'Motor barulhento'
+        self.no_titulo.save(update_fields=['descricao'])
+        self.assertEqual([r['id'] for r in self.buscar('barulhento')], [self.no_titulo.pk])
+
+    def test_listagem_sem_busca_nao_tem_destaque(self):
+        response = self.client.get('/api/reclamacoes/')
+        self.assertNotIn('destaque', response.data['results'][0])
+
+    def test_titulo_que_cresce_ao_normalizar(self):
+        """Teste: Um título de 200 'ß' vira 400 's'; a coluna de busca é cortada no seu tamanho"""
+        reclamacao = criar_reclamacao(self.no_titulo.usuario_consumidor, self.no_titulo.empresa, titulo='ß' * 200)
+        self.assertEqual(reclamacao.busca_titulo, 's' * 200)
+        self.assertIn(reclamacao.pk, [r['id'] for r in self.buscar('ssss')])
+
+    def test_busca_vazia_lista_todas(self):
+        """Teste: ?search= vazio (ou só espaços) não filtra a listagem nem traz destaque"""
+        for termo in ('', '  '):
+            resultados = self.buscar(termo)
+            self.assertEqual(len(resultados), 3)
+            self.assertNotIn('destaque', resultados[0])
+
+    def test_admin_busca_texto_e_nomes(self):
+        """Teste: A busca do admin casa título/descrição e também o nome do consumidor e da empresa"""
+        outra = criar_reclamacao(criar_consumidor(email='maria@teste.com', nome='Maria Souza'),
+                                 criar_empresa(email='loja@teste.com', cnpj='11.111.111/0001-11', razao_social='Loja Azul'))
+        admin = Usuario.objects.create_superuser(email='admin@teste.com', password='senha-forte-123')
+        self.client.force_login(admin)
+
+        def buscar_no_admin(termo):
+            response = self.client.get('/admin/api/reclamacao/', {'q': termo})
+            self.assertEqual(response.status_code, 200)
+            return {reclamacao.pk for reclamacao in response.context['cl'].result_list}
+
+        self.assertEqual(buscar_no_admin('geladeira'), {self.no_titulo.pk, self.na_descricao.pk})
+        self.assertEqual(buscar_no_admin('souza'), {outra.pk})
+        self.assertEqual(buscar_no_admin('loja azul'), {outra.pk})
+
+
+class IndicesReclamacaoExplainTestCase(TestCase):
+    """
+    Testes dos planos de execução (EXPLAIN) das consultas de listagem e filtro.
+    Funcionam em SQLite e Postgres: o nome do índice aparece no plano dos dois.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        empresas = [criar_empresa(email=f'empresa{i}@teste.com', cnpj=f'{i:014d}', razao_social=f'Empresa {i}')
+                    for i in range(5)]
+        consumidores = [criar_consumidor(email=f'consumidor{i}@teste.com') for i in range(5)]
+        reclamacoes = Reclamacao.objects.bulk_create([
+            Reclamacao(
+                usuario_consumidor=consumidores[i % 5], empresa=empresas[i % 5], titulo=f'Reclamação {i}',
+                descricao='Seed', status=Reclamacao.StatusReclamacao.choices[i % 2][0],
+            )
+            for i in range(500)
+        ])
+        RespostaReclamacao.objects.bulk_create([
+            RespostaReclamacao(reclamacao=reclamacao, empresa_id=reclamacao.empresa_id, descricao='Seed')
+            for reclamacao in reclamacoes
+        ])
+        cls.empresa, cls.consumidor, cls.reclamacao = empresas[0], consumidores[0], reclamacoes[0]
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertUsaIndice(self, queryset, indice):
+        if connection.vendor == 'postgresql':
+            # Com poucas linhas o Postgres prefere seq scan; o que interessa é o índice ser elegível
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        plano = queryset.explain()
+        self.assertIn(indice, plano, f'Plano não usa {indice}:\n{plano}')
+
+    def test_listagem_publica(self):
+        self.assertUsaIndice(Reclamacao.objects.order_by('-data_criacao')[:20], 'reclamacao_data_id_idx')
+
+    def test_filtro_por_empresa(self):
+        self.assertUsaIndice(
+            Reclamacao.objects.filter(empresa=self.empresa).order_by('-data_criacao'), 'reclamacao_empresa_data_idx'
+        )
+
+    def test_filtro_por_empresa_e_status(self):
+        self.assertUsaIndice(
+            Reclamacao.objects.filter(empresa=self.empresa, status=Reclamacao.StatusReclamacao.ABERTA)
+            .order_by('-data_criacao'),
+            'reclamacao_emp_status_data_idx'
+        )
+
+    def test_filtro_por_consumidor(self):
+        self.assertUsaIndice(
+            Reclamacao.objects.filter(usuario_consumidor=self.consumidor).order_by('-data_criacao'),
+            'reclamacao_consum_data_idx'
+        )
+
+    def test_ultima_resposta(self):
+        self.assertUsaIndice(
+            RespostaReclamacao.objects.filter(reclamacao=self.reclamacao).order_by('-data_criacao')[:1],
+            'resposta_reclamacao_data_idx'
+        )
+
+    def test_primeira_resposta_resolvida(self):
+        self.assertUsaIndice(
+            RespostaReclamacao.objects.filter(
+                reclamacao=self.reclamacao, status_resolucao=RespostaReclamacao.StatusResolucao.RESOLVIDA
+            ).order_by('data_criacao')[:1],
+            'resposta_recl_status_data_idx'
+        )
+
+
+class PerfilConsumidorTestCase(APITestCase):
+    """Testes para o perfil leve do consumidor e o histórico paginado de reclamações"""
+
+    def setUp(self):
+        self.empresa = criar_empresa()
+        self.consumidor = criar_consumidor()
+        for i in range(12):
+            status = Reclamacao.StatusReclamacao.ENCERRADA if i < 3 else Reclamacao.StatusReclamacao.ABERTA
+            criar_reclamacao(self.consumidor, self.empresa, titulo=f'Reclamação {i}', status=status)
+        self.client.force_authenticate(user=self.consumidor.usuario)
+
+    def test_perfil_nao_inclui_historico(self):
+        """Teste: O perfil traz só as contagens, calculadas na mesma query do consumidor"""
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/consumidores/perfil/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('user_complaints', response.data)
+        self.assertEqual(response.data['totalComplaints'], 12)
+        self.assertEqual(response.data['resolved'], 3)
+
+    def test_expand_inclui_historico(self):
+        """Teste: ?expand=user_complaints mantém o formato antigo para quem precisa"""
+        response = self.client.get('/api/consumidores/perfil/', {'expand': 'user_complaints'})
+        self.assertEqual(len(response.data['user_complaints']), 12)
+
+    def test_fields_seleciona_campos(self):
+        """Teste: ?fields= devolve apenas os campos pedidos"""
+        response = self.client.get('/api/consumidores/perfil/', {'fields': 'display_id,totalComplaints'})
+        self.assertEqual(set(response.data), {'display_id', 'totalComplaints'})
+
+    def test_login_retorna_perfil_leve(self):
+        """Teste: O login não serializa o histórico de reclamações"""
+        self.client.force_authenticate(user=None)
+        Token.objects.create(user=self.consumidor.usuario)
+        with self.assertNumQueries(3):  # usuário com perfis, token, contagens
+            response = self.client.post(
+                '/api/consumidores/login/', {'email': 'consumidor@teste.com', 'senha': 'senha-forte-123'}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('user_complaints', response.data['usuario_consumidor'])
+        self.assertEqual(response.data['usuario_consumidor']['resolved'], 3)
+
+    def test_historico_paginado(self):
+        """Teste: O histórico fica em um sub-recurso paginado e filtrável por status"""
+        response = self.client.get('/api/consumidores/perfil/reclamacoes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 12)
+        self.assertEqual(response.data['results'][0]['titulo'], 'Reclamação 11')
+
+        response = self.client.get('/api/consumidores/perfil/reclamacoes/', {'status': 'ENCERRADA'})
+        self.assertEqual(response.data['count'], 3)
+
+    def test_historico_exige_consumidor(self):
+        """Teste: Empresas não têm histórico de consumidor"""
+        self.client.force_authenticate(user=self.empresa.usuario)
+        response = self.client.get('/api/consumidores/perfil/reclamacoes/')
+        self.assertEqual(response.status_code, 403)
+
+
+class PapelDoUsuarioTestCase(APITestCase):
+    """Testes para a resolução do papel do usuário (consumidor, empresa, administrador)"""
+
+    def setUp(self):
+        self.empresa = criar_empresa()
+        self.consumidor = criar_consumidor()
+
+    def test_papel_carrega_perfis_em_uma_query(self):
+        """Teste: Descobrir o papel custa uma query, mesmo para quem não tem o primeiro perfil testado"""
+        usuario = Usuario.objects.get(pk=self.consumidor.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(usuario.papel, Usuario.Papel.CONSUMIDOR)
+            self.assertEqual(usuario.perfil, self.consumidor)
+            self.assertFalse(hasattr(usuario, 'usuarioempresa'))
+            self.assertIs(usuario.perfil.usuario, usuario)
+
+        usuario = Usuario.objects.get(pk=self.empresa.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(usuario.papel, Usuario.Papel.EMPRESA)
+
+    def test_usuario_sem_perfil(self):
+        """Teste: Usuário sem perfil não tem papel"""
+        usuario = Usuario.objects.create_user(email='semperfil@teste.com', password='senha-forte-123')
+        self.assertIsNone(usuario.papel)
+        self.assertIsNone(usuario.perfil)
+
+    def test_usuario_sem_perfil_nao_ve_reclamacoes(self):
+        """Teste: Logado sem papel não vê reclamação nenhuma; anônimos (listagem pública) e administradores veem todas"""
+        criar_reclamacao(self.consumidor, self.empresa)
+        self.assertEqual(self.client.get('/api/reclamacoes/').data['count'], 1)
+
+        self.client.force_authenticate(user=Usuario.objects.create_user(email='semperfil@teste.com', password='x'))
+        self.assertEqual(self.client.get('/api/reclamacoes/').data['count'], 0)
+
+        self.client.force_authenticate(user=Usuario.objects.create_superuser(email='admin@teste.com', password='x'))
+        self.assertEqual(self.client.get('/api/reclamacoes/').data['count'], 1)
+
+    def test_permissoes_por_papel(self):
+        """Teste: Só o consumidor dono da reclamação atualiza o status da resposta"""
+        reclamacao = criar_reclamacao(self.consumidor, self.empresa)
+        resposta = RespostaReclamacao.objects.create(reclamacao=reclamacao, empresa=self.empresa, descricao='Resposta')
+        outro = criar_consumidor(email='outro@teste.com')
+        url = f'/api/respostas-reclamacao/{resposta.pk}/status/'
+
+        for usuario in (self.empresa.usuario, outro.usuario):
+            self.client.force_authenticate(user=usuario)
+            response = self.client.patch(url, {'status_resolucao': 'RESOLVIDA'})
+            self.assertEqual(response.status_code, 403)
+
+        self.client.force_authenticate(user=self.consumidor.usuario)
+        response = self.client.patch(url, {'status_resolucao': 'RESOLVIDA'})
+        self.assertEqual(response.status_code, 200)
+
+
+class LoginHashTestCase(APITestCase):
+    """Testes para o hash de senhas no login (scrypt, rehash de hashes antigos e pool limitado)"""
+
+    def setUp(self):
+        self.consumidor = criar_consumidor()
+        self.usuario = self.consumidor.usuario
+
+    def login(self, senha='senha-forte-123'):
+        return self.client.post('/api/consumidores/login/', {'email': self.usuario.email, 'senha': senha})
+
+    def test_senhas_novas_usam_scrypt(self):
+        """Teste: O hasher padrão é o scrypt"""
+        self.assertTrue(self.usuario.password.startswith('scrypt$'))
+
+    def test_hash_antigo_refeito_no_login(self):
+        """Teste: Um hash PBKDF2 continua válido e vira scrypt no primeiro login"""
+        self.usuario.password = make_password('senha-forte-123', hasher='pbkdf2_sha256')
+        self.usuario.save()
+
+        self.assertEqual(self.login(senha='senha-errada-123').status_code, 401)
+        self.usuario.refresh_from_db()
+        self.assertTrue(self.usuario.password.startswith('pbkdf2_sha256$'))
+
+        self.assertEqual(self.login().status_code, 200)
+        self.usuario.refresh_from_db()
+        self.assertTrue(self.usuario.password.startswith('scrypt$'))
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_pool_cheio_responde_429(self):
+        """Teste: Com o pool e a fila de hashes ocupados, o login falha rápido"""
+        _, vagas = hashing._executor_e_vagas()
+        ocupadas = 0
+        while vagas.acquire(blocking=False):
+            ocupadas += 1
+        try:
+            self.assertEqual(self.login().status_code, 429)
+        finally:
+            for _ in range(ocupadas):
+                vagas.release()
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_pool_cheio_no_login_do_admin(self):
+        """Teste: O login do admin mostra o erro no formulário em vez de falhar com 500"""
+        Usuario.objects.create_superuser(email='admin@teste.com', password='senha-forte-123')
+        _, vagas = hashing._executor_e_vagas()
+        ocupadas = 0
+        while vagas.acquire(blocking=False):
+            ocupadas += 1
+        try:
+            response = self.client.post('/admin/login/', {'username': 'admin@teste.com', 'password': 'senha-forte-123'})
+        finally:
+            for _ in range(ocupadas):
+                vagas.release()
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Muitos logins simultâneos')
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class AutenticacaoTokenEmCacheTestCase(APITestCase):
+    """Testes para a autenticação por token com usuário e papel em cache"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.empresa = criar_empresa()
+        self.consumidor = criar_consumidor()
+        self.token_empresa = Token.objects.create(user=self.empresa.usuario)
+        self.token_consumidor = Token.objects.create(user=self.consumidor.usuario)
+
+    def autenticar(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def test_requisicao_autenticada_sem_queries(self):
+        """Teste: Com token e perfil em cache, o perfil da empresa não toca no banco"""
+        self.autenticar(self.token_empresa)
+        self.assertEqual(self.client.get('/api/empresas/perfil/').status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/empresas/perfil/')
+        self.assertEqual(response.data['razao_social'], 'Empresa Teste')
+
+    def test_papel_resolvido_sem_queries(self):
+        """Teste: Checar o papel do usuário na listagem não gera queries além da listagem"""
+        criar_reclamacao(self.consumidor, self.empresa)
+        self.autenticar(self.token_consumidor)
+        self.client.get('/api/reclamacoes/')
+        with self.assertNumQueries(4):  # count, reclamações, arquivos, última resposta
+            response = self.client.get('/api/reclamacoes/')
+        self.assertEqual(response.data['count'], 1)
+
+    def test_cache_sem_hash_da_senha(self):
+        """Teste: O cache guarda só a identidade do usuário, nunca o hash da senha nem o perfil inteiro"""
+        self.autenticar(self.token_empresa)
+        self.client.get('/api/empresas/perfil/')
+        identidade = caches['default'].get(chave_do_token(self.token_empresa.key))
+        self.assertEqual(identidade, {
+            'id': self.empresa.pk, 'email': 'empresa@teste.com', 'is_active': True, 'is_staff': False,
+            'is_superuser': False, 'papel': Usuario.Papel.EMPRESA, 'perfil': self.empresa.pk,
+        })
+
+        # O usuário reconstruído busca o que não está no cache, inclusive ao editar o perfil
+        response = self.client.patch('/api/empresas/perfil/', {'razao_social': 'Empresa Renomeada'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['razao_social'], 'Empresa Renomeada')
+        self.empresa.refresh_from_db()
+        self.assertEqual(self.empresa.cnpj, '00.000.000/0001-00')
+
+    def test_logout_invalida_token(self):
+        """Teste: Depois do logout o token em cache não autentica mais"""
+        self.autenticar(self.token_consumidor)
+        self.client.get('/api/consumidores/perfil/')
+        response = self.client.post('/api/consumidores/logout/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/consumidores/perfil/').status_code, 401)
+
+    def test_troca_de_senha_e_desativacao_invalidam_cache(self):
+        """Teste: Salvar o usuário descarta o usuário em cache"""
+        self.autenticar(self.token_consumidor)
+        self.client.get('/api/consumidores/perfil/')
+        response = self.client.put('/api/consumidores/perfil/', {'senha': 'outra-senha-123'})
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(2):  # token + usuário, perfil com contagens
+            self.client.get('/api/consumidores/perfil/')
+
+        usuario = self.consumidor.usuario
+        usuario.is_active = False
+        usuario.save()
+        self.assertEqual(self.client.get('/api/consumidores/perfil/').status_code, 401)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class LeituraPublicaAssincronaTestCase(TestCase):
+    """Testes para os endpoints públicos assíncronos (/api/public/...)"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.empresa = criar_empresa(razao_social='Padaria São João')
+        self.consumidor = criar_consumidor()
+        for i in range(25):
+            reclamacao = criar_reclamacao(self.consumidor, self.empresa, titulo=f'Reclamação {i}')
+            RespostaReclamacao.objects.create(reclamacao=reclamacao, empresa=self.empresa, descricao=f'Resposta {i}')
+
+    def test_listagem_igual_a_sincrona(self):
+        """Teste: A listagem assíncrona devolve o mesmo conteúdo da listagem por cursor do DRF"""
+        assincrona = self.client.get('/api/public/reclamacoes/').json()
+        sincrona = self.client.get('/api/reclamacoes/', {'pagination': 'cursor'}).json()
+        self.assertEqual(assincrona['results'], sincrona['results'])
+        self.assertEqual(assincrona['results'][0]['resposta']['descricao'], 'Resposta 24')
+
+        segunda = self.client.get(assincrona['next']).json()
+        self.assertEqual(len(segunda['results']), 5)
+        self.assertIsNone(segunda['next'])
+
+    def test_busca_e_detalhe(self):
+        """Teste: Busca com destaque, detalhe e 404"""
+        response = self.client.get('/api/public/reclamacoes/', {'search': 'reclamacao 24'}).json()
+        self.assertEqual(response['results'][0]['destaque']['titulo'], '<mark>Reclamação</mark> <mark>24</mark>')
+
+        reclamacao = Reclamacao.objects.get(titulo='Reclamação 3')
+        response = self.client.get(f'/api/public/reclamacoes/{reclamacao.pk}/')
+        self.assertEqual(response.json()['titulo'], 'Reclamação 3')
+        self.assertEqual(self.client.get('/api/public/reclamacoes/999999/').status_code, 404)
+        self.assertEqual(self.client.get('/api/public/reclamacoes/', {'cursor': 'invalido'}).status_code, 404)
+
+    def test_busca_de_empresas(self):
+        """Teste: A busca pública de empresas usa a mesma busca normalizada"""
+        response = self.client.get('/api/public/empresas/', {'search': 'SAO JOAO'}).json()
+        self.assertEqual([empresa['display_id'] for empresa in response['results']], [self.empresa.pk])
+
+    def test_perfil_da_empresa_com_estatisticas(self):
+        """Teste: O perfil público traz as estatísticas e é servido do cache na segunda leitura"""
+        reset_cache_stats()
+        response = self.client.get(f'/api/public/empresas/{self.empresa.pk}/').json()
+        self.assertEqual(response['razao_social'], 'Padaria São João')
+        self.assertEqual(response['estatisticas']['total_reclamacoes'], 25)
+        self.client.get(f'/api/public/empresas/{self.empresa.pk}/')
+        self.assertEqual(cache_stats()['hits'], 2)
+        self.assertEqual(self.client.get('/api/public/empresas/999999/').status_code, 404)
+
+    def test_somente_leitura(self):
+        """Teste: Os endpoints públicos só aceitam GET"""
+        self.assertEqual(self.client.post('/api/public/reclamacoes/').status_code, 405)
+
+    async def test_cliente_asgi(self):
+        """Teste: As views rodam no cliente assíncrono (caminho ASGI)"""
+        response = await self.async_client.get('/api/public/reclamacoes/', {'status': 'ABERTA'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 20)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CacheEmpresaTestCase(APITestCase):
+    """Testes para o cache do perfil público e das estatísticas das empresas"""
+
+    def setUp(self):
+        caches['default'].clear()
+        reset_cache_stats()
+        self.empresa = criar_empresa()
+        self.consumidor = criar_consumidor()
+
+    def test_perfil_publico_servido_do_cache(self):
+        """Teste: A segunda leitura da página da empresa não deve tocar no banco"""
+        primeira = self.client.get(f'/api/empresas/{self.empresa.pk}/')
+        self.assertEqual(primeira.status_code, 200)
+        with self.assertNumQueries(0):
+            segunda = self.client.get(f'/api/empresas/{self.empresa.pk}/')
+        self.assertEqual(segunda.data, primeira.data)
+        self.assertEqual(cache_stats()['misses'], 1)
+        self.assertEqual(cache_stats()['hits'], 1)
+        self.assertEqual(cache_stats()['hit_ratio'], 0.5)
+
+    def test_edicao_da_empresa_invalida_cache(self):
+        """Teste: Salvar a empresa deve descartar o perfil em cache"""
+        self.client.get(f'/api/empresas/{self.empresa.pk}/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.empresa.razao_social = 'Empresa Renomeada'
+            self.empresa.save()
+        response = self.client.get(f'/api/empresas/{self.empresa.pk}/')
+        self.assertEqual(response.data['razao_social'], 'Empresa Renomeada')
+        self.assertEqual(cache_stats()['invalidacoes'], 1)
+
+    def test_reclamacao_e_resposta_invalidam_estatisticas(self):
+        """Teste: Novas reclamações e respostas devem aparecer nas estatísticas do perfil"""
+        self.client.force_authenticate(user=self.empresa.usuario)
+        response = self.client.get('/api/empresas/perfil/')
+        self.assertEqual(response.data['estatisticas']['total_reclamacoes'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reclamacao = criar_reclamacao(self.consumidor, self.empresa)
+        response = self.client.get('/api/empresas/perfil/')
+        self.assertEqual(response.data['estatisticas']['total_reclamacoes'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RespostaReclamacao.objects.create(
+                reclamacao=reclamacao, empresa=self.empresa, descricao='Resolvido',
+                status_resolucao=RespostaReclamacao.StatusResolucao.RESOLVIDA
+            )
+            reclamacao.status = Reclamacao.StatusReclamacao.ENCERRADA
+            reclamacao.save()
+        response = self.client.get('/api/empresas/perfil/')
+        self.assertEqual(response.data['estatisticas']['reclamacoes_resolvidas'], 1)
+
+    def test_invalidacao_so_vale_apos_commit(self):
+        """Teste: Sem commit, a versão em cache continua valendo"""
+        self.client.get(f'/api/empresas/{self.empresa.pk}/')
+        criar_reclamacao(self.consumidor, self.empresa)
+        with self.assertNumQueries(0):
+            self.client.get(f'/api/empresas/{self.empresa.pk}/')
+
+    def test_estatisticas_do_cache_para_administradores(self):
+        """Teste: Os contadores do cache são para o papel de administrador, não para is_staff"""
+        self.client.force_authenticate(user=self.empresa.usuario)
+        self.assertEqual(self.client.get('/api/cache/estatisticas/').status_code, 403)
+
+        usuario = Usuario.objects.create_user(email='admin@teste.com', password='senha-forte-123', nome='Admin')
+        Administrador.objects.create(usuario=usuario)
+        self.client.force_authenticate(user=usuario)
+        response = self.client.get('/api/cache/estatisticas/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('hits', response.data)
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': os.path.join(tempfile.gettempdir(), 'chie-aqui-testes-cache'),
+}})
+class CacheEmpresaArquivoTestCase(CacheEmpresaTestCase):
+    """Os mesmos testes com o backend de arquivos"""
+
+
+class ConexoesBancoTestCase(APITestCase):
+    """Testes para o reuso de conexões e as métricas do banco"""
+
+    def test_conexoes_persistentes_por_padrao(self):
+        """Teste: Sem DB_CONN_MAX_AGE, a conexão é reaproveitada e testada antes do reuso"""
+        self.assertEqual(connection.settings_dict['CONN_MAX_AGE'], 60)
+        self.assertTrue(connection.settings_dict['CONN_HEALTH_CHECKS'])
+
+    def test_conexao_criada_e_contada(self):
+        """Teste: Cada conexão nova com o banco deve entrar no contador do processo"""
+        reset_estatisticas_banco()
+        connection_created.send(sender=connection.__class__, connection=connection)
+        self.assertEqual(estatisticas_banco()['default']['conexoes_abertas'], 1)
+
+    def test_estatisticas_apenas_para_administradores(self):
+        """Teste: As métricas do banco são só para administradores"""
+        empresa = criar_empresa()
+        self.client.force_authenticate(user=empresa.usuario)
+        self.assertEqual(self.client.get('/api/banco/estatisticas/').status_code, 403)
+
+        usuario = Usuario.objects.create_user(email='admin@teste.com', password='senha-forte-123', nome='Admin')
+        Administrador.objects.create(usuario=usuario)
+        self.client.force_authenticate(user=usuario)
+        response = self.client.get('/api/banco/estatisticas/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['default']['conn_max_age'], 60)
+        self.assertIsNone(response.data['default']['pool'])
+        self.assertIn('latencia_ms', response.data['default'])
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], READ_YOUR_WRITES_SECONDS=5)
+class RoteamentoReplicaTestCase(SimpleTestCase):
+    """Testes para o envio das leituras às réplicas (sem banco: só as decisões do router)"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def rotear(self, request, escrever=False):
+        """Passa a requisição pelo middleware; a 'view' devolve o banco escolhido para ler."""
+        def view(request):
+            if escrever:
+                self.router.db_for_write(Reclamacao)
+            return HttpResponse(self.router.db_for_read(Reclamacao))
+        return leitura_em_replica_middleware(view)(request)
+
+    def test_fora_de_requisicao_le_do_primario(self):
+        """Teste: Signals, comandos e shell continuam lendo do primário"""
+        self.assertEqual(self.router.db_for_read(Reclamacao), 'default')
+        with ler_da_replica():
+            self.assertEqual(self.router.db_for_read(Reclamacao), 'replica1')
+
+    def test_get_le_da_replica_e_post_do_primario(self):
+        """Teste: Só os métodos seguros leem das réplicas"""
+        self.assertEqual(self.rotear(self.factory.get('/api/reclamacoes/')).content, b'replica1')
+        self.assertEqual(self.rotear(self.factory.post('/api/reclamacoes/')).content, b'default')
+
+    def test_escrita_na_requisicao_volta_ao_primario(self):
+        """Teste: Depois de escrever, a própria requisição lê do primário"""
+        with ler_da_replica():
+            self.router.db_for_write(Reclamacao)
+            self.assertEqual(self.router.db_for_read(Reclamacao), 'default')
+
+    def test_cliente_que_escreveu_le_do_primario(self):
+        """Teste: O mesmo token lê do primário durante a janela após uma escrita"""
+        token = {'HTTP_AUTHORIZATION': 'Token abc'}
+        response = self.rotear(self.factory.post('/api/reclamacoes/', **token), escrever=True)
+        self.assertIn(COOKIE_PRIMARIO, response.cookies)
+        self.assertEqual(response.cookies[COOKIE_PRIMARIO]['max-age'], 5)
+
+        self.assertEqual(self.rotear(self.factory.get('/api/reclamacoes/', **token)).content, b'default')
+        outro = {'HTTP_AUTHORIZATION': 'Token xyz'}
+        self.assertEqual(self.rotear(self.factory.get('/api/reclamacoes/', **outro)).content, b'replica1')
+
+        request = self.factory.get('/api/reclamacoes/')
+        request.COOKIES[COOKIE_PRIMARIO] = '1'
+        self.assertEqual(self.rotear(request).content, b'default')
+
+    @override_settings(DATABASE_REPLICAS=['replica1', 'replica2', 'replica3'])
+    def test_mesma_replica_durante_o_escopo(self):
+        """Teste: Todas as leituras de uma requisição vão para a mesma réplica"""
+        for _ in range(10):
+            with ler_da_replica():
+                escolhidas = {self.router.db_for_read(Reclamacao) for _ in range(20)}
+            self.assertEqual(len(escolhidas), 1)
+
+    def test_replicas_nao_migram(self):
+        """Teste: O schema só é migrado no primário"""
+        self.assertTrue(self.router.allow_migrate('default', 'api'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'api'))
+
+
+@override_settings(UPLOAD_TAMANHO_PARTE=4)
+class UploadEmPartesTestCase(APITestCase):
+    """Testes para o envio de anexos em partes"""
+
+    conteudo = b'hello world'  # 11 bytes: partes de 4, 4 e 3
+
+    def setUp(self):
+        self.media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=self.media))
+        self.consumidor = criar_consumidor()
+        self.reclamacao = criar_reclamacao(self.consumidor, criar_empresa())
+        self.client.force_authenticate(user=self.consumidor.usuario)
+
+    def abrir(self, **dados):
+        dados = {'nome_arquivo': 'nota.txt', 'tipo_arquivo': 'text/plain', 'tamanho': len(self.conteudo), **dados}
+        response = self.client.post(f'/api/reclamacoes/{self.reclamacao.pk}/uploads/', dados, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def enviar(self, upload_id, numero, dados):
+        return self.client.put(f'/api/uploads/{upload_id}/partes/{numero}/', dados,
+                               content_type='application/octet-stream')
+
+    def test_partes_fora_de_ordem_viram_um_anexo(self):
+        """Teste: As partes podem chegar em qualquer ordem e o anexo sai com o SHA-256 do conteúdo"""
+        upload_id = self.abrir(sha256=hashlib.sha256(self.conteudo).hexdigest())
+        for numero in (2, 0):
+            response = self.enviar(upload_id, numero, self.conteudo[numero * 4:numero * 4 + 4])
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['sha256'], hashlib.sha256(b'hell').hexdigest())
+
+        # Retomada: o estado diz o que falta enviar
+        response = self.client.get(f'/api/uploads/{upload_id}/')
+        self.assertEqual(response.data['total_partes'], 3)
+        self.assertEqual(response.data['partes_recebidas'], [0, 2])
+        response = self.client.post(f'/api/uploads/{upload_id}/concluir/')
+        self.assertEqual(response.status_code, 400)
+
+        self.enviar(upload_id, 1, self.conteudo[4:8])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/uploads/{upload_id}/concluir/')
+        self.assertEqual(response.status_code, 201)
+        arquivo = Arquivo.objects.get(pk=response.data['id'])
+        self.assertEqual(arquivo.reclamacao, self.reclamacao)
+        self.assertEqual(arquivo.sha256, hashlib.sha256(self.conteudo).hexdigest())
+        self.assertEqual(arquivo.tamanho, 11)
+        with arquivo.arquivo.open('rb') as f:
+            self.assertEqual(f.read(), self.conteudo)
+        self.assertFalse(UploadArquivo.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media, 'arquivos_reclamacoes', '.partes')), [])
+
+    def test_parte_com_tamanho_errado(self):
+        """Teste: Cada parte precisa ter exatamente o tamanho combinado"""
+        upload_id = self.abrir()
+        self.assertEqual(self.enviar(upload_id, 0, b'hel').status_code, 400)
+        self.assertEqual(self.enviar(upload_id, 3, b'x').status_code, 400)
+        self.assertEqual(self.client.get(f'/api/uploads/{upload_id}/').data['partes_recebidas'], [])
+
+    def test_parte_sem_content_length(self):
+        """Teste: Parte enviada sem Content-Length (chunked) é recusada com 411, sem erro interno"""
+        upload_id = self.abrir()
+        request = RequestFactory().put(f'/api/uploads/{upload_id}/partes/0/', b'hell',
+                                       content_type='application/octet-stream', HTTP_TRANSFER_ENCODING='chunked')
+        del request.META['CONTENT_LENGTH']
+        force_authenticate(request, user=self.consumidor.usuario)
+        self.assertEqual(views.upload_parte(request, pk=upload_id, numero=0).status_code, 411)
+        self.assertEqual(self.client.get(f'/api/uploads/{upload_id}/').data['partes_recebidas'], [])
+
+    def test_sha256_divergente_recusa_o_anexo(self):
+        """Teste: Conteúdo que não confere com o SHA-256 informado não vira anexo"""
+        upload_id = self.abrir(sha256='0' * 64)
+        for numero in range(3):
+            self.enviar(upload_id, numero, self.conteudo[numero * 4:numero * 4 + 4])
+        self.assertEqual(self.client.post(f'/api/uploads/{upload_id}/concluir/').status_code, 400)
+        self.assertFalse(Arquivo.objects.exists())
+
+    def test_apenas_o_dono_da_reclamacao(self):
+        """Teste: Outro consumidor não abre nem continua envios na reclamação"""
+        upload_id = self.abrir()
+        outro = criar_consumidor(email='outro@teste.com')
+        self.client.force_authenticate(user=outro.usuario)
+        response = self.client.post(f'/api/reclamacoes/{self.reclamacao.pk}/uploads/',
+                                    {'nome_arquivo': 'a.txt', 'tamanho': 1}, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.enviar(upload_id, 0, b'hell').status_code, 404)
+
+    def test_limpar_uploads_expirados(self):
+        """Teste: Envios abandonados são descartados com as partes"""
+        upload_id = self.abrir()
+        self.enviar(upload_id, 0, b'hell')
+        UploadArquivo.objects.update(data_criacao=timezone.now() - timedelta(hours=25))
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('limpar_uploads', stdout=StringIO())
+        self.assertFalse(UploadArquivo.objects.exists())
+        self.assertFalse(os.path.exists(os.path.join(self.media, 'arquivos_reclamacoes', '.partes', upload_id)))
+
+
+@override_settings(ARQUIVOS_GC_CARENCIA=0)
+class ArmazenamentoPorConteudoTestCase(TestCase):
+    """Testes para o armazenamento único por conteúdo dos anexos"""
+
+    def setUp(self):
+        self.media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=self.media))
+        self.consumidor = criar_consumidor()
+        self.empresa = criar_empresa()
+
+    def anexar(self, reclamacao, conteudo, nome='recibo.PDF'):
+        return Arquivo.objects.create(
+            reclamacao=reclamacao, arquivo=ContentFile(conteudo, name=nome),
+            nome_arquivo=nome, tipo_arquivo='application/pdf', tamanho=len(conteudo),
+        )
+
+    def arquivos_em_disco(self):
+        return [os.path.join(raiz, nome) for raiz, _, nomes in os.walk(self.media) for nome in nomes]
+
+    def test_conteudo_igual_gravado_uma_vez(self):
+        """Teste: O mesmo recibo em duas reclamações ocupa um arquivo só, nomeado pelo SHA-256"""
+        sha256 = hashlib.sha256(b'recibo').hexdigest()
+        primeiro = self.anexar(criar_reclamacao(self.consumidor, self.empresa), b'recibo')
+        segundo = self.anexar(criar_reclamacao(self.consumidor, self.empresa), b'recibo', nome='copia.pdf')
+        self.assertEqual(primeiro.arquivo.name, f'arquivos_reclamacoes/{sha256[:2]}/{sha256[2:4]}/{sha256}.pdf')
+        self.assertEqual(segundo.arquivo.name, primeiro.arquivo.name)
+        self.assertEqual(len(self.arquivos_em_disco()), 1)
+
+        self.anexar(criar_reclamacao(self.consumidor, self.empresa), b'outro recibo')
+        self.assertEqual(len(self.arquivos_em_disco()), 2)
+
+    def test_envios_simultaneos_do_mesmo_conteudo(self):
+        """Teste: Quem perde a corrida do exists() grava por cima do mesmo blob, sem nome com sufixo"""
+        armazenamento = Arquivo._meta.get_field('arquivo').storage
+        primeiro = armazenamento.save('arquivos_reclamacoes/recibo.pdf', ContentFile(b'recibo'))
+        # Storage.save pula a checagem de blob existente, como um envio que a fez antes do outro gravar
+        segundo = Storage.save(armazenamento, primeiro, ContentFile(b'recibo'))
+        self.assertEqual(segundo, primeiro)
+        self.assertEqual(self.arquivos_em_disco(), [armazenamento.path(primeiro)])
+
+    def test_blob_coletado_durante_o_reuso(self):
+        """Teste: Se a coleta apaga o blob entre o exists() e o utime(), o envio grava o blob de novo"""
+        armazenamento = Arquivo._meta.get_field('arquivo').storage
+        nome = armazenamento.save('arquivos_reclamacoes/recibo.pdf', ContentFile(b'recibo'))
+        os.remove(armazenamento.path(nome))
+        with mock.patch.object(armazenamento, 'exists', return_value=True):
+            self.assertEqual(armazenamento.save('arquivos_reclamacoes/copia.pdf', ContentFile(b'recibo')), nome)
+        with armazenamento.open(nome) as f:
+            self.assertEqual(f.read(), b'recibo')
+
+    def test_coleta_reconfere_referencias(self):
+        """Teste: A coleta não apaga um blob que ganhou referência depois da sua listagem"""
+        arquivo = self.anexar(criar_reclamacao(self.consumidor, self.empresa), b'recibo')
+        self.assertFalse(arquivo.arquivo.storage.apagar_se_antigo(arquivo.arquivo.name))
+        self.assertTrue(os.path.exists(arquivo.arquivo.path))
+
+    def test_arquivo_apagado_com_a_ultima_referencia(self):
+        """Teste: Apagar reclamações (cascata) só apaga o arquivo quando ninguém mais o usa"""
+        primeira = criar_reclamacao(self.consumidor, self.empresa)
+        segunda = criar_reclamacao(self.consumidor, self.empresa)
+        caminho = self.anexar(primeira, b'recibo').arquivo.path
+        self.anexar(segunda, b'recibo')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            primeira.delete()
+        self.assertTrue(os.path.exists(caminho))
+        with self.captureOnCommitCallbacks(execute=True):
+            segunda.delete()
+        self.assertFalse(os.path.exists(caminho))
+
+    def test_comando_migra_coleta_e_relata_economia(self):
+        """Teste: Arquivos antigos vão para o armazenamento por conteúdo e a economia é relatada"""
+        reclamacao = criar_reclamacao(self.consumidor, self.empresa)
+        antigos = []
+        for nome in ('a.pdf', 'b.pdf'):
+            caminho = os.path.join(self.media, 'arquivos_reclamacoes', nome)
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            with open(caminho, 'wb') as f:
+                f.write(b'x' * 1000)
+            arquivo = Arquivo(reclamacao=reclamacao, nome_arquivo=nome, tipo_arquivo='application/pdf')
+            arquivo.arquivo.name = f'arquivos_reclamacoes/{nome}'
+            antigos.append(arquivo)
+        Arquivo.objects.bulk_create(antigos)
+        orfao = os.path.join(self.media, 'arquivos_reclamacoes', 'orfao.pdf')
+        with open(orfao, 'wb') as f:
+            f.write(b'y')
+
+        saida = StringIO()
+        call_command('armazenamento_arquivos', '--migrar', '--coletar', stdout=saida)
+        self.assertIn('2 anexo(s) migrado(s)', saida.getvalue())
+        self.assertIn('1 arquivo(s) sem referência apagado(s)', saida.getvalue())
+        self.assertIn('Economia: 1000 B (50.0%)', saida.getvalue())
+        self.assertEqual(len(self.arquivos_em_disco()), 1)
+        self.assertEqual(set(Arquivo.objects.values_list('sha256', flat=True)),
+                         {hashlib.sha256(b'x' * 1000).hexdigest()})
+
+
+@override_settings(PREVIEW_TAMANHOS=[64, 256])
+class PreviewArquivoTestCase(APITestCase):
+    """Testes para as pré-visualizações dos anexos"""
+
+    def setUp(self):
+        self.media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=self.media))
+        self.consumidor = criar_consumidor()
+        self.reclamacao = criar_reclamacao(self.consumidor, criar_empresa())
+        self.client.force_authenticate(user=self.consumidor.usuario)
+
+    def anexar(self, conteudo, nome, tipo):
+        return Arquivo.objects.create(
+            reclamacao=self.reclamacao, arquivo=ContentFile(conteudo, name=nome),
+            nome_arquivo=nome, tipo_arquivo=tipo, sha256=hashlib.sha256(conteudo).hexdigest(),
+        )
+
+    def test_tipo_sem_preview(self):
+        """Teste: Anexos sem pré-visualização saem com preview_url nulo"""
+        arquivo = self.anexar(b'texto', 'nota.txt', 'text/plain')
+        response = self.client.get(f'/api/reclamacoes/{self.reclamacao.pk}/')
+        self.assertIsNone(response.data['arquivos'][0]['preview_url'])
+        self.assertEqual(self.client.get(f'/api/arquivos/{arquivo.pk}/preview/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/arquivos/{arquivo.pk}/preview/?tamanho=100').status_code, 400)
+
+    def test_preview_so_para_quem_ve_a_reclamacao(self):
+        """Teste: Anônimos e outros consumidores não veem a pré-visualização do anexo"""
+        arquivo = self.anexar(b'%PDF-1.4', 'extrato.pdf', 'application/pdf')
+        # Tamanho inválido: o dono recebe 400, então o 404 dos outros vem da visibilidade
+        url = f'/api/arquivos/{arquivo.pk}/preview/?tamanho=100'
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_authenticate(user=criar_consumidor(email='outro@teste.com').usuario)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    @override_settings(PREVIEW_CACHE_MAXIMO=250)
+    def test_cache_descarta_os_menos_usados(self):
+        """Teste: Acima do limite, saem as pré-visualizações usadas há mais tempo"""
+        arquivos = [self.anexar(bytes([i]), f'{i}.png', 'image/png') for i in range(3)]
+        agora = time.time()
+        for idade, arquivo in zip((300, 200, 100), arquivos):
+            caminho = previews.caminho_do_preview(arquivo, 64)
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            with open(caminho, 'wb') as f:
+                f.write(b'x' * 100)
+            os.utime(caminho, (agora - idade, agora - idade))
+
+        # Servir o mais antigo o coloca no início da fila
+        self.assertIsNotNone(previews.preview_pronto(arquivos[0], 64))
+        self.assertEqual(previews.aplicar_limite_do_cache(), 1)
+        self.assertIsNotNone(previews.preview_pronto(arquivos[0], 64))
+        self.assertIsNone(previews.preview_pronto(arquivos[1], 64))
+        self.assertIsNotNone(previews.preview_pronto(arquivos[2], 64))
+
+    @skipUnless(previews.PILLOW_DISPONIVEL, 'Pillow não instalado')
+    def test_miniatura_de_imagem(self):
+        """Teste: A miniatura é gerada no primeiro pedido, limitada ao tamanho, e reaproveitada"""
+        from PIL import Image
+
+        imagem = BytesIO()
+        Image.new('RGB', (800, 400), 'red').save(imagem, 'PNG')
+        arquivo = self.anexar(imagem.getvalue(), 'foto.png', 'image/png')
+        response = self.client.get(f'/api/reclamacoes/{self.reclamacao.pk}/')
+        self.assertTrue(response.data['arquivos'][0]['preview_url'].endswith(f'/api/arquivos/{arquivo.pk}/preview/'))
+
+        response = self.client.get(f'/api/arquivos/{arquivo.pk}/preview/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Cache-Control'], 'private, max-age=31536000, immutable')
+        with Image.open(BytesIO(b''.join(response.streaming_content))) as miniatura:
+            self.assertEqual(miniatura.size, (64, 32))
+        self.assertIsNotNone(previews.preview_pronto(arquivo, 64))
+
+    def test_preview_apagado_pelo_limite_e_gerado_de_novo(self):
+        """Teste: Se o limite do cache apaga o preview logo antes do open(), ele é gerado de novo"""
+        arquivo = self.anexar(b'png', 'foto.png', 'image/png')
+        caminho = previews.caminho_do_preview(arquivo, 64)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        with open(caminho, 'wb') as f:
+            f.write(b'jpeg novo')
+        gerado = Future()
+        gerado.set_result(caminho)
+
+        # preview_pronto achou o arquivo, mas ele some antes do open()
+        apagado = os.path.join(self.media, 'apagado.jpg')
+        with mock.patch('api.views.tem_preview', return_value=True), \
+                mock.patch('api.views.preview_pronto', return_value=apagado), \
+                mock.patch('api.views.agendar_preview', return_value=gerado) as agendar:
+            response = self.client.get(f'/api/arquivos/{arquivo.pk}/preview/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'jpeg novo')
+        agendar.assert_called_once()
+
+
+class DownloadArquivoTestCase(APITestCase):
+    """Testes para o download de anexos com Range e cabeçalhos condicionais"""
+
+    conteudo = bytes(range(256)) * 4  # 1024 bytes
+
+    def setUp(self):
+        self.media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=self.media))
+        self.consumidor = criar_consumidor()
+        self.empresa = criar_empresa()
+        reclamacao = criar_reclamacao(self.consumidor, self.empresa)
+        self.arquivo = Arquivo.objects.create(
+            reclamacao=reclamacao, arquivo=ContentFile(self.conteudo, name='extrato.pdf'),
+            nome_arquivo='extrato de março.pdf', tipo_arquivo='application/pdf',
+            sha256=hashlib.sha256(self.conteudo).hexdigest(),
+        )
+        self.url = f'/api/arquivos/{self.arquivo.pk}/download/'
+        self.client.force_authenticate(user=self.consumidor.usuario)
+
+    def corpo(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_download_completo(self):
+        """Teste: O arquivo vem inteiro, com ETag do conteúdo e nome para salvar"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.corpo(response), self.conteudo)
+        self.assertEqual(response['ETag'], f'"{self.arquivo.sha256}"')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Length'], '1024')
+        self.assertIn("filename*=utf-8''extrato%20de%20mar%C3%A7o.pdf", response['Content-Disposition'])
+
+    def test_intervalos(self):
+        """Teste: Range devolve 206 com o trecho pedido; fora do arquivo, 416"""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 100-199/1024')
+        self.assertEqual(self.corpo(response), self.conteudo[100:200])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-24')
+        self.assertEqual(self.corpo(response), self.conteudo[-24:])
+        response = self.client.get(self.url, HTTP_RANGE='bytes=1000-')
+        self.assertEqual(response['Content-Range'], 'bytes 1000-1023/1024')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1024')
+
+        # If-Range com outra versão: arquivo inteiro
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"outra"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_none_match(self):
+        """Teste: Com o ETag atual, a resposta é 304 sem corpo"""
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=f'"{self.arquivo.sha256}"')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    @override_settings(DOWNLOAD_ACCEL_REDIRECT='/media-protegida/')
+    def test_delegado_ao_proxy(self):
+        """Teste: Com DOWNLOAD_ACCEL_REDIRECT o corpo fica vazio e o nginx envia o arquivo"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/media-protegida/{self.arquivo.arquivo.name}')
+        self.assertEqual(response.content, b'')
+
+    def test_apenas_quem_ve_a_reclamacao(self):
+        """Teste: Outro consumidor e anônimos não baixam o anexo; a empresa reclamada sim"""
+        self.client.force_authenticate(user=criar_consumidor(email='outro@teste.com').usuario)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.force_authenticate(user=self.empresa.usuario)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_listagens_so_expoem_o_download_url(self):
+        """Teste: Listagens não trazem o caminho do arquivo, e o SHA-256 só vai para o dono da reclamação"""
+        response = self.client.get('/api/reclamacoes/')
+        anexo = response.data['results'][0]['arquivos'][0]
+        self.assertNotIn('arquivo', anexo)
+        self.assertEqual(anexo['sha256'], self.arquivo.sha256)
+        self.assertTrue(anexo['download_url'].endswith(self.url))
+
+        self.client.force_authenticate(user=self.empresa.usuario)
+        self.assertNotIn('sha256', self.client.get('/api/reclamacoes/').data['results'][0]['arquivos'][0])
+        self.client.force_authenticate(user=None)
+        self.assertNotIn('sha256', self.client.get('/api/reclamacoes/').data['results'][0]['arquivos'][0])
+        anexo = self.client.get('/api/public/reclamacoes/').json()['results'][0]['arquivos'][0]
+        self.assertEqual(set(anexo) & {'arquivo', 'sha256'}, set())
+
+
+class RelatorioTestCase(APITestCase):
+    """Testes para os rollups diários e os relatórios gerados a partir deles"""
+
+    def setUp(self):
+        self.consumidor = criar_consumidor()
+        self.empresa = criar_empresa()
+        self.outra = criar_empresa(email='outra@teste.com', cnpj='11.111.111/0001-11', razao_social='Outra')
+        self.hoje = timezone.localdate()
+
+    def encerrar(self, reclamacao, horas):
+        reclamacao.status = Reclamacao.StatusReclamacao.ENCERRADA
+        reclamacao.data_resolucao = reclamacao.data_criacao + timedelta(hours=horas)
+        reclamacao.save()
+
+    def contagens(self, empresa):
+        return dict(ReclamacaoDiaria.objects.filter(empresa=empresa, total__gt=0).values_list('status', 'total'))
+
+    def test_rollups_acompanham_as_transicoes(self):
+        """Teste: Criar, encerrar e apagar reclamações deve mover os contadores do dia"""
+        reclamacao = criar_reclamacao(self.consumidor, self.empresa)
+        criar_reclamacao(self.consumidor, self.empresa)
+        self.assertEqual(self.contagens(self.empresa), {'ABERTA': 2})
+
+        self.encerrar(reclamacao, horas=3)
+        self.assertEqual(self.contagens(self.empresa), {'ABERTA': 1, 'ENCERRADA': 1})
+        resolucao = ResolucaoDiaria.objects.get(empresa=self.empresa, total__gt=0)
+        self.assertEqual((resolucao.faixa, resolucao.soma_horas), (2, 3.0))  # faixa (2h, 4h]
+
+        reclamacao.titulo = 'Outro título'
+        with self.assertNumQueries(1):  # Só o UPDATE da reclamação: nenhum contador muda
+            reclamacao.save()
+
+        reclamacao.delete()
+        self.assertEqual(self.contagens(self.empresa), {'ABERTA': 1})
+        self.assertFalse(ResolucaoDiaria.objects.filter(total__gt=0).exists())
+        call_command('rebuild_rollups', verify=True, stdout=StringIO())
+
+    def test_instancia_parcial_aplica_delta(self):
+        """Teste: Salvar uma instância carregada com only() lê o estado salvo e move as duas empresas"""
+        reclamacao = criar_reclamacao(self.consumidor, self.empresa)
+        parcial = Reclamacao.objects.only('id', 'titulo').get(pk=reclamacao.pk)
+        parcial.empresa = self.outra
+        with CaptureQueriesContext(connection) as consultas:
+            parcial.save()
+        # Delta nas duas empresas, sem apagar e recontar os rollups
+        self.assertFalse([c for c in consultas.captured_queries if c['sql'].startswith('DELETE')])
+        self.assertEqual(self.contagens(self.empresa), {})
+        self.assertEqual(self.contagens(self.outra), {'ABERTA': 1})
+        call_command('rebuild_rollups', verify=True, stdout=StringIO())
+
+    def test_empresas_travadas(self):
+        """Teste: Quem aplica deltas trava a empresa (compartilhado) e a reconstrução a trava (exclusivo)"""
+        with mock.patch('api.rollups.travar_empresas') as travar:
+            reclamacao = criar_reclamacao(self.consumidor, self.empresa)
+            travar.assert_called_once_with({self.empresa.pk})
+
+            travar.reset_mock()
+            reclamacao.titulo = 'Outro título'
+            reclamacao.save()
+            travar.assert_called_once_with(set())
+
+            travar.reset_mock()
+            call_command('rebuild_rollups', empresas=[self.empresa.pk], stdout=StringIO())
+            travar.assert_called_once_with([self.empresa.pk], exclusivo=True)
+
+    def test_reconstrucao(self):
+        """Teste: rebuild_rollups deve refazer os contadores a partir das reclamações"""
+        reclamacao = criar_reclamacao(self.consumidor, self.empresa)
+        # update() não dispara signals: os rollups ficam desatualizados
+        Reclamacao.objects.filter(pk=reclamacao.pk).update(data_criacao=reclamacao.data_criacao - timedelta(days=3))
+        with self.assertRaises(CommandError):
+            call_command('rebuild_rollups', verify=True, stdout=StringIO())
+
+        call_command('rebuild_rollups', stdout=StringIO())
+        self.assertEqual(
+            list(ReclamacaoDiaria.objects.filter(total__gt=0).values_list('dia', 'total')),
+            [(self.hoje - timedelta(days=3), 1)],
+        )
+        call_command('rebuild_rollups', verify=True, stdout=StringIO())
+
+    def test_percentis(self):
+        """Teste: Os percentis são interpolados dentro das faixas do histograma"""
+        histograma = [0] * 17
+        histograma[1] = 10  # 10 reclamações resolvidas entre 1h e 2h
+        self.assertEqual(percentis(histograma, (50, 100)), {'p50': 1.5, 'p100': 2.0})
+        histograma[16] = 10  # e 10 em mais de um ano: a faixa aberta usa o limite inferior
+        self.assertEqual(percentis(histograma, (50, 99)), {'p50': 2.0, 'p99': 8760})
+        self.assertEqual(percentis([0] * 17, (50,)), {'p50': None})
+
+    def test_conteudo_vem_so_dos_rollups(self):
+        """Teste: O relatório deve trazer totais, percentis e ranking sem consultar Reclamacao"""
+        for _ in range(2):
+            criar_reclamacao(self.consumidor, self.outra)
+        self.encerrar(criar_reclamacao(self.consumidor, self.empresa), horas=10)
+
+        with CaptureQueriesContext(connection) as contexto:
+            # A resolução (10h depois da criação) pode cair no dia seguinte
+            conteudo = gerar_conteudo(self.hoje - timedelta(days=365), self.hoje + timedelta(days=1), agrupamento='dia')
+        self.assertFalse([q for q in contexto.captured_queries if '"api_reclamacao"' in q['sql']])
+
+        self.assertEqual(conteudo['total'], 3)
+        self.assertEqual(conteudo['por_status'], {'ABERTA': 2, 'ENCERRADA': 1})
+        self.assertEqual(conteudo['por_periodo'], [
+            {'periodo': self.hoje, 'total': 3, 'por_status': {'ABERTA': 2, 'ENCERRADA': 1}},
+        ])
+        self.assertEqual([empresa['razao_social'] for empresa in conteudo['top_empresas']], ['Outra', 'Empresa Teste'])
+        self.assertEqual(conteudo['tempo_resolucao']['resolvidas'], 1)
+        self.assertEqual(conteudo['tempo_resolucao']['media_horas'], 10.0)
+
+        # Período sem reclamações
+        conteudo = gerar_conteudo(self.hoje - timedelta(days=30), self.hoje - timedelta(days=1))
+        self.assertEqual((conteudo['total'], conteudo['empresas']), (0, []))
+
+    def test_api_apenas_para_administradores(self):
+        """Teste: Só administradores geram e listam relatórios; o autor fica registrado"""
+        criar_reclamacao(self.consumidor, self.empresa)
+        parametros = {'inicio': str(self.hoje.replace(day=1)), 'fim': str(self.hoje), 'agrupamento': 'mes'}
+        self.client.force_authenticate(user=self.empresa.usuario)
+        self.assertEqual(self.client.post('/api/relatorios/', parametros, format='json').status_code, 403)
+
+        usuario = Usuario.objects.create_user(email='admin@teste.com', password='senha-forte-123', nome='Admin')
+        administrador = Administrador.objects.create(usuario=usuario)
+        self.client.force_authenticate(user=usuario)
+        response = self.client.post('/api/relatorios/', parametros, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['administrador'], administrador.pk)
+        self.assertEqual(response.data['administrador_nome'], 'Admin')
+        self.assertEqual(json.loads(response.data['conteudo'])['total'], 1)
+
+        response = self.client.post('/api/relatorios/', {**parametros, 'fim': '2000-01-01'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/relatorios/', {'omit': 'conteudo'})
+        self.assertEqual(response.data['count'], 1)
+        self.assertNotIn('conteudo', response.data['results'][0])
+
+    def test_comando(self):
+        """Teste: gerar_relatorio deve salvar o relatório do período"""
+        criar_reclamacao(self.consumidor, self.empresa)
+        call_command('gerar_relatorio', inicio=self.hoje, titulo='Hoje', stdout=StringIO())
+        relatorio = Relatorio.objects.get()
+        self.assertEqual(relatorio.titulo, 'Hoje')
+        self.assertEqual(json.loads(relatorio.conteudo)['top_empresas'][0]['empresa_id'], self.empresa.pk)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TendenciasEmpresaTestCase(APITestCase):
+    """Testes para as tendências por dia/semana lidas dos rollups"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.consumidor = criar_consumidor()
+        self.empresa = criar_empresa()
+        self.hoje = timezone.localdate()
+        self.semana = self.hoje - timedelta(days=self.hoje.weekday())
+        self.url = f'/api/empresas/{self.empresa.pk}/tendencias/'
+
+    def test_serie_semanal(self):
+        """Teste: A série tem um ponto por semana, com zeros nas semanas sem reclamações"""
+        with self.captureOnCommitCallbacks(execute=True):
+            criar_reclamacao(self.consumidor, self.empresa)
+            reclamacao = criar_reclamacao(self.consumidor, self.empresa)
+            reclamacao.status = Reclamacao.StatusReclamacao.ENCERRADA
+            reclamacao.save()
+        self.assertEqual(ReclamacaoSemanal.objects.get(status='ABERTA').semana, self.semana)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        serie = response.data['serie']
+        self.assertEqual(len(serie), 12)
+        self.assertEqual(serie[-1]['periodo'], self.semana)
+        self.assertEqual(serie[-1]['reclamacoes'], 2)
+        self.assertEqual(serie[-1]['taxa_resolucao'], 0.5)
+        self.assertEqual(serie[0]['reclamacoes'], 0)
+        self.assertIsNone(serie[0]['taxa_resolucao'])
+
+    def test_custo_nao_depende_das_reclamacoes(self):
+        """Teste: A série lê só os rollups: as mesmas queries com 1 ou 20 reclamações"""
+        criar_reclamacao(self.consumidor, self.empresa)
+        with self.assertNumQueries(3):  # Empresa existe + rollup de reclamações + rollup de resoluções
+            self.client.get(self.url, {'granularidade': 'dia'})
+        for _ in range(20):
+            criar_reclamacao(self.consumidor, self.empresa)
+        caches['default'].clear()
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {'granularidade': 'dia'})
+        self.assertEqual(len(response.data['serie']), 30)
+        self.assertEqual(response.data['serie'][-1]['reclamacoes'], 21)
+
+    def test_cache_invalidado_por_nova_reclamacao(self):
+        """Teste: A série fica em cache até uma reclamação da empresa mudar"""
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            criar_reclamacao(self.consumidor, self.empresa)
+        self.assertEqual(self.client.get(self.url).data['serie'][-1]['reclamacoes'], 1)
+
+    def test_intervalo_livre_nao_vai_para_o_cache(self):
+        """Teste: Só a janela padrão fica em cache; datas escolhidas pelo cliente são lidas na hora"""
+        parametros = {'inicio': '2026-01-01', 'fim': '2026-02-01'}
+        self.assertEqual(self.client.get(self.url, parametros).status_code, 200)
+        with self.assertNumQueries(3):
+            self.client.get(self.url, parametros)
+
+    def test_parametros(self):
+        """Teste: Empresa inexistente é 404; período invertido ou longo demais é 400"""
+        self.assertEqual(self.client.get('/api/empresas/9999/tendencias/').status_code, 404)
+        self.assertEqual(self.client.get(self.url, {'inicio': '2026-02-01', 'fim': '2026-01-01'}).status_code, 400)
+        response = self.client.get(self.url, {'granularidade': 'dia', 'inicio': '2020-01-01', 'fim': '2026-01-01'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.url, {'granularidade': 'semana', 'inicio': '2020-01-01', 'fim': '2026-01-01'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_backfill(self):
+        """Teste: rebuild_rollups também preenche os rollups semanais"""
+        reclamacao = criar_reclamacao(self.consumidor, self.empresa)
+        Reclamacao.objects.filter(pk=reclamacao.pk).update(data_criacao=reclamacao.data_criacao - timedelta(weeks=2))
+        ReclamacaoSemanal.objects.all().delete()
+        call_command('rebuild_rollups', empresas=[self.empresa.pk], stdout=StringIO())
+        self.assertEqual(
+            list(ReclamacaoSemanal.objects.values_list('semana', 'total')), [(self.semana - timedelta(weeks=2), 1)]
+        )
+
+
+class ExportacaoReclamacoesTestCase(APITestCase):
+    """Testes para a exportação em streaming das reclamações"""
+
+    url = '/api/reclamacoes/exportar/'
+
+    def setUp(self):
+        self.consumidor = criar_consumidor()
+        self.empresa = criar_empresa()
+        self.outra = criar_empresa(email='outra@teste.com', cnpj='11.111.111/0001-11', razao_social='Outra')
+        self.reclamacao = criar_reclamacao(self.consumidor, self.empresa, titulo='Cobrança, "indevida"')
+        RespostaReclamacao.objects.create(reclamacao=self.reclamacao, empresa=self.empresa, descricao='Primeira')
+        RespostaReclamacao.objects.create(reclamacao=self.reclamacao, empresa=self.empresa, descricao='Última')
+        criar_reclamacao(self.consumidor, self.outra)
+        admin = Usuario.objects.create_superuser(email='admin@teste.com', password='senha-forte-123')
+        self.client.force_authenticate(user=admin)
+
+    def corpo(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_streaming_assincrono_sob_asgi(self):
+        """Teste: Sob ASGI o corpo é um iterador assíncrono, enviado sem ser juntado em memória"""
+        request = AsyncRequestFactory().get(self.url, {'formato': 'jsonl'})
+        force_authenticate(request, user=Usuario.objects.get(email='admin@teste.com'))
+        response = views.reclamacoes_exportar(request)
+        self.assertTrue(response.is_async)
+        self.assertTrue(hasattr(response.streaming_content, '__aiter__'))
+
+        async def ler():
+            return b''.join([bloco async for bloco in response.streaming_content])
+        self.assertEqual(len(async_to_sync(ler)().decode().splitlines()), 2)
+
+    def test_csv(self):
+        """Teste: O CSV traz cabeçalho, empresa, consumidor e a última resposta de cada reclamação"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment', response['Content-Disposition'])
+        linhas = list(csv.DictReader(self.corpo(response).decode().splitlines()))
+        self.assertEqual(len(linhas), 2)
+        self.assertEqual(linhas[0]['titulo'], 'Cobrança, "indevida"')
+        self.assertEqual(linhas[0]['empresa_razao_social'], 'Empresa Teste')
+        self.assertEqual(linhas[0]['consumidor_nome'], 'Consumidor Teste')
+        self.assertEqual(linhas[0]['ultima_resposta_descricao'], 'Última')
+        self.assertEqual(linhas[1]['ultima_resposta_descricao'], '')
+
+    def test_csv_sem_formulas(self):
+        """Teste: Textos que uma planilha leria como fórmula saem com ' na frente, só no CSV"""
+        titulos = ['=HYPERLINK("http://x","y")', '+1', '-1', '@SUM(A1)', '\tx', '\rx']
+        Reclamacao.objects.all().delete()
+        for titulo in titulos:
+            criar_reclamacao(self.consumidor, self.empresa, titulo=titulo)
+        response = self.client.get(self.url)
+        linhas = list(csv.DictReader(StringIO(self.corpo(response).decode(), newline='')))
+        self.assertEqual([linha['titulo'] for linha in linhas], ["'" + titulo for titulo in titulos])
+
+        response = self.client.get(self.url, {'formato': 'jsonl'})
+        linhas = self.corpo(response).decode().splitlines()
+        self.assertEqual([json.loads(linha)['titulo'] for linha in linhas], titulos)
+
+    def test_jsonl_filtrado_e_compactado(self):
+        """Teste: Com Accept-Encoding gzip o JSON Lines vem compactado e respeita os filtros"""
+        response = self.client.get(
+            self.url, {'formato': 'jsonl', 'empresa': self.outra.pk}, HTTP_ACCEPT_ENCODING='gzip, br'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        linhas = gzip.decompress(self.corpo(response)).decode().splitlines()
+        self.assertEqual([json.loads(linha)['empresa_id'] for linha in linhas], [self.outra.pk])
+
+    def test_uma_query_para_todas_as_linhas(self):
+        """Teste: A exportação lê tudo numa única query, com os JOINs e subqueries no SQL"""
+        for _ in range(10):
+            criar_reclamacao(self.consumidor, self.empresa)
+        response = self.client.get(self.url, {'formato': 'jsonl'})
+        with CaptureQueriesContext(connection) as contexto:
+            linhas = self.corpo(response).decode().splitlines()
+        self.assertEqual(len(linhas), 12)
+        self.assertEqual(len(contexto.captured_queries), 1)
+
+    def test_apenas_administradores(self):
+        """Teste: Empresas e consumidores não exportam; parâmetros inválidos são 400"""
+        self.assertEqual(self.client.get(self.url, {'formato': 'xml'}).status_code, 400)
+        self.client.force_authenticate(user=self.empresa.usuario)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_comando(self):
+        """Teste: exportar_reclamacoes grava o arquivo compactado quando termina em .gz"""
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, 'reclamacoes.csv.gz')
+            call_command('exportar_reclamacoes', saida=caminho, status='ABERTA', stdout=StringIO())
+            with gzip.open(caminho, 'rt') as arquivo:
+                linhas = list(csv.DictReader(arquivo))
+        self.assertEqual(len(linhas), 2)
+
+
 # Teste adicional para garantir que os testes estão rodando
 class SmokeTestCase(TestCase):
     """Teste básico para verificar se a suite de testes está funcionando"""
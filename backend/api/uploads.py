@@ -0,0 +1,125 @@
+"""
+Chunked, resumable uploads of complaint attachments.
+
+Each part is streamed from the request body straight to a file under
+MEDIA_ROOT/arquivos_reclamacoes/.partes/<upload id>/, in fixed-size blocks and hashing as it
+goes, so memory stays constant whatever the file size. Parts are independent files, so they can
+be sent in parallel and in any order; the parts on disk are the state of the upload (what a
+client resuming an upload has to send again). Completing the upload concatenates the parts into
+the final file, computing the SHA-256 of the whole content in the same pass, and moves it into
+the content-addressed storage without copying (or drops it, when that content is already stored).
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+
+from .models import Arquivo
+
+BLOCO = 64 * 1024
+DIRETORIO_ARQUIVOS = Arquivo._meta.get_field('arquivo').upload_to.rstrip('/')
+
+
+class UploadInvalido(Exception):
+    pass
+
+
+class ArquivoMontado(File):
+    """File already on disk: FileSystemStorage moves it (os.rename) instead of copying it."""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def diretorio_das_partes(upload):
+    return os.path.join(settings.MEDIA_ROOT, DIRETORIO_ARQUIVOS, '.partes', str(upload.pk))
+
+
+def caminho_da_parte(upload, numero):
+    return os.path.join(diretorio_das_partes(upload), f'{numero}.parte')
+
+
+def partes_recebidas(upload):
+    """Numbers of the parts already on disk, in order."""
+    try:
+        nomes = os.listdir(diretorio_das_partes(upload))
+    except FileNotFoundError:
+        return []
+    return sorted(int(nome.split('.')[0]) for nome in nomes if nome.endswith('.parte'))
+
+
+def gravar_parte(upload, numero, stream):
+    """
+    Streams part `numero` from `stream` (the request body) to disk. Returns its SHA-256;
+    raises UploadInvalido when the body is not exactly the size of the part.
+    """
+    if not 0 <= numero < upload.total_partes:
+        raise UploadInvalido(f'Parte {numero} inexistente: o upload tem {upload.total_partes} parte(s).')
+
+    diretorio = diretorio_das_partes(upload)
+    os.makedirs(diretorio, exist_ok=True)
+    esperado = upload.tamanho_da_parte(numero)
+    sha256 = hashlib.sha256()
+    # Grava num temporário e renomeia: uma parte interrompida nunca aparece como recebida
+    descritor, temporario = tempfile.mkstemp(dir=diretorio, suffix='.tmp')
+    try:
+        with os.fdopen(descritor, 'wb') as destino:
+            restante = esperado
+            while restante:
+                bloco = stream.read(min(BLOCO, restante))
+                if not bloco:
+                    raise UploadInvalido(f'Parte {numero} incompleta: esperados {esperado} bytes.')
+                destino.write(bloco)
+                sha256.update(bloco)
+                restante -= len(bloco)
+            if stream.read(1):
+                raise UploadInvalido(f'Parte {numero} maior que os {esperado} bytes esperados.')
+        os.replace(temporario, caminho_da_parte(upload, numero))
+    except BaseException:
+        os.unlink(temporario)
+        raise
+    return sha256.hexdigest()
+
+
+def montar(upload):
+    """
+    Concatenates the parts into one file (name, in the storage, of the attachment) and returns
+    (name, size, SHA-256). Raises UploadInvalido if a part is missing or the content does not
+    match the SHA-256 declared when the upload was created.
+    """
+    faltando = sorted(set(range(upload.total_partes)) - set(partes_recebidas(upload)))
+    if faltando:
+        raise UploadInvalido(f'Partes faltando: {", ".join(map(str, faltando))}.')
+
+    sha256 = hashlib.sha256()
+    descritor, montado = tempfile.mkstemp(dir=diretorio_das_partes(upload), suffix='.montado')
+    try:
+        with os.fdopen(descritor, 'wb') as destino:
+            for numero in range(upload.total_partes):
+                with open(caminho_da_parte(upload, numero), 'rb') as parte:
+                    while bloco := parte.read(BLOCO):
+                        destino.write(bloco)
+                        sha256.update(bloco)
+        if upload.sha256 and sha256.hexdigest() != upload.sha256.lower():
+            raise UploadInvalido('O conteúdo recebido não confere com o SHA-256 informado.')
+        with open(montado, 'rb') as arquivo:
+            conteudo = ArquivoMontado(arquivo)
+            conteudo.sha256 = sha256.hexdigest()
+            # Conteúdo já armazenado: o arquivo montado é descartado e o anexo reusa o blob
+            nome = Arquivo._meta.get_field('arquivo').storage.save(
+                f'{DIRETORIO_ARQUIVOS}/{os.path.basename(upload.nome_arquivo)}', conteudo
+            )
+    finally:
+        if os.path.exists(montado):
+            os.unlink(montado)
+    return nome, upload.tamanho, sha256.hexdigest()
+
+
+def descartar_partes(upload):
+    """Deletes the parts on disk once the current transaction commits (call before upload.delete())."""
+    diretorio = diretorio_das_partes(upload)
+    transaction.on_commit(lambda: shutil.rmtree(diretorio, ignore_errors=True))
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import async_views, views
 
 app_name = 'api'
 
@@ -18,15 +18,35 @@ urlpatterns = [
     path('empresas/logout/', views.usuario_empresa_logout, name='empresa-logout'),
     path('empresas/perfil/', views.UsuarioEmpresaPerfilView.as_view(), name='empresa-perfil'),
     path('empresas/lista/', views.UsuarioEmpresaListView.as_view(), name='empresa-list'),
+    path('empresas/<int:pk>/tendencias/', views.empresa_tendencias, name='empresa-tendencias'),
 
     path('consumidores/cadastro/', views.UsuarioConsumidorCadastroView.as_view(), name='consumidor-cadastro'),
     path('consumidores/login/', views.usuario_consumidor_login, name='consumidor-login'),
     path('consumidores/logout/', views.usuario_consumidor_logout, name='consumidor-logout'),
     path('consumidores/perfil/', views.UsuarioConsumidorPerfilView.as_view(), name='consumidor-perfil'),
+    path('consumidores/perfil/reclamacoes/', views.UsuarioConsumidorReclamacoesView.as_view(), name='consumidor-reclamacoes'),
 
+    path('reclamacoes/exportar/', views.reclamacoes_exportar, name='reclamacao-exportar'),
     path('reclamacoes/<int:reclamacao_id>/responder/', views.RespostaReclamacaoCreateAPIView.as_view(), name='reclamacao-responder'),
+    path('reclamacoes/<int:reclamacao_id>/uploads/', views.UploadArquivoCreateView.as_view(), name='reclamacao-uploads'),
+    path('uploads/<uuid:pk>/', views.UploadArquivoView.as_view(), name='upload-detail'),
+    path('uploads/<uuid:pk>/partes/<int:numero>/', views.upload_parte, name='upload-parte'),
+    path('uploads/<uuid:pk>/concluir/', views.upload_concluir, name='upload-concluir'),
+    path('arquivos/<int:pk>/download/', views.arquivo_download, name='arquivo-download'),
+    path('arquivos/<int:pk>/preview/', views.arquivo_preview, name='arquivo-preview'),
     path('respostas-reclamacao/<int:pk>/status/', views.RespostaReclamacaoUpdateAPIView.as_view(), name='respostareclamacao-update-status'), # New URL for updating response status
 
+    path('relatorios/', views.RelatorioListCreateView.as_view(), name='relatorio-list'),
+    path('relatorios/<int:pk>/', views.RelatorioDetailView.as_view(), name='relatorio-detail'),
+
+    path('cache/estatisticas/', views.cache_estatisticas, name='cache-estatisticas'),
+    path('banco/estatisticas/', views.banco_estatisticas, name='banco-estatisticas'),
+
+    # Leitura pública assíncrona (ASGI)
+    path('public/reclamacoes/', async_views.reclamacoes, name='public-reclamacao-list'),
+    path('public/reclamacoes/<int:pk>/', async_views.reclamacao, name='public-reclamacao-detail'),
+    path('public/empresas/', async_views.empresas, name='public-empresa-list'),
+    path('public/empresas/<int:pk>/', async_views.empresa, name='public-empresa-detail'),
     path('', views.api_root),
     path('', include(router.urls)),
 ]
\ No newline at end of file
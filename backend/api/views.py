@@ -1,22 +1,74 @@
+import re
+import time
+from concurrent.futures import TimeoutError as FuturoNaoConcluido
+
+from django.conf import settings
 from rest_framework import viewsets, status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly
 from django.contrib.auth import authenticate
-from django.db.models import Q
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connection, router, transaction
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.http import content_disposition_header
 from rest_framework.authtoken.models import Token
 from rest_framework.reverse import reverse
 from .models import (
     Usuario, UsuarioConsumidor, UsuarioEmpresa, Administrador,
-    Reclamacao, RespostaReclamacao
+    Reclamacao, Arquivo, UploadArquivo, RespostaReclamacao, Relatorio
 )
+from .cache import cache_stats, obter_da_empresa
+from .database import estatisticas_banco
+from .fieldsets import SparseFieldsetMixin, SparseFieldsetViewMixin, parametro_lista
+from .hashing import HashIndisponivel
+from .pagination import ReclamacaoPagination, UsuarioEmpresaPagination
+from .permissions import IsAdministrador, IsConsumidor, eh_administrador, papel, reclamacoes_visiveis
+from .search import buscar_empresas, buscar_reclamacoes, termos_de_busca
 from .serializers import (
     UsuarioSerializer, UsuarioConsumidorSerializer, UsuarioEmpresaSerializer,
     UsuarioEmpresaProfileSerializer,
-    AdministradorSerializer, ReclamacaoSerializer, RespostaReclamacaoSerializer
+    AdministradorSerializer, ReclamacaoSerializer, RespostaReclamacaoSerializer,
+    ArquivoSerializer, UploadArquivoSerializer, RelatorioSerializer, GerarRelatorioSerializer,
+    TendenciasSerializer, ExportacaoSerializer
 )
+from .downloads import servir_arquivo
+from .exportacao import FORMATOS, em_async, exportar, filtrar
+from .previews import PreviewIndisponivel, agendar_preview, preview_pronto, tem_preview
+from .relatorios import gerar_relatorio, tendencias
+from .uploads import UploadInvalido, descartar_partes, gravar_parte, montar
 from rest_framework import exceptions # Import exceptions
 
+def nome_no_cache(request, nome):
+    """Cache entry name for a response shaped by ?fields=/?omit=/?expand=."""
+    selecao = [
+        f'{param}={",".join(sorted(parametro_lista(request, param)))}'
+        for param in (SparseFieldsetMixin.fields_query_param, SparseFieldsetMixin.omit_query_param,
+                      SparseFieldsetMixin.expand_query_param)
+        if request.query_params.get(param)
+    ]
+    return ':'.join([nome, *selecao])
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdministrador])
+def cache_estatisticas(request):
+    """Contadores de hit/miss do cache de empresas neste processo."""
+    return Response(cache_stats())
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdministrador])
+def banco_estatisticas(request):
+    """Conexões com o banco deste processo (reuso, pool) e a latência de um SELECT 1."""
+    dados = estatisticas_banco()
+    inicio = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    dados[connection.alias]['latencia_ms'] = round((time.perf_counter() - inicio) * 1000, 3)
+    return Response(dados)
+
 @api_view(['GET'])
 def api_root(request, format=None):
     return Response({
@@ -38,13 +90,13 @@ def api_root(request, format=None):
     })
 
 # Views para Usuario
-class UsuarioViewSet(viewsets.ModelViewSet):
+class UsuarioViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Usuario.objects.all()
     serializer_class = UsuarioSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
 # Views para UsuarioConsumidor
-class UsuarioConsumidorViewSet(viewsets.ModelViewSet):
+class UsuarioConsumidorViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = UsuarioConsumidorSerializer
     permission_classes = [IsAuthenticated]
 
@@ -57,17 +109,17 @@ class UsuarioConsumidorViewSet(viewsets.ModelViewSet):
         # Se ele buscou o próprio email, permitir
         email = self.request.query_params.get('email', None)
         if email == user.email:
-            return UsuarioConsumidor.objects.filter(usuario=user)
+            return UsuarioConsumidor.objects.com_contagens().filter(usuario=user)
 
         # Admin pode tudo
-        if hasattr(user, 'administrador') or user.is_superuser:
-            queryset = UsuarioConsumidor.objects.all()
+        if eh_administrador(self.request):
+            queryset = UsuarioConsumidor.objects.com_contagens().order_by('pk')
             if email is not None:
                 queryset = queryset.filter(usuario__email__icontains=email)
             return queryset
 
         # Usuário comum sem filtro → retorna apenas ele mesmo
-        return UsuarioConsumidor.objects.filter(usuario=user)
+        return UsuarioConsumidor.objects.com_contagens().filter(usuario=user)
 
 class UsuarioConsumidorCadastroView(generics.CreateAPIView):
     serializer_class = UsuarioConsumidorSerializer
@@ -85,7 +137,7 @@ class UsuarioConsumidorCadastroView(generics.CreateAPIView):
 
         response_data = {
             'message': 'Consumidor cadastrado com sucesso!',
-            'usuario_consumidor': UsuarioConsumidorSerializer(usuario_consumidor).data,
+            'usuario_consumidor': self.get_serializer(usuario_consumidor).data,
             'token': token.key
         }
         return Response(response_data, status=status.HTTP_201_CREATED)
@@ -111,7 +163,7 @@ class UsuarioConsumidorPerfilView(generics.RetrieveUpdateDestroyAPIView):
                 raise exceptions.PermissionDenied({'detail': 'Usuário não autenticado'})
 
             # Get the UsuarioConsumidor object associated with the authenticated user.
-            return UsuarioConsumidor.objects.get(usuario=user)
+            return UsuarioConsumidor.objects.com_contagens().get(usuario=user)
 
         except UsuarioConsumidor.DoesNotExist:
             print(f"[DEBUG] UsuarioConsumidor not found for user PK: {user.pk}")
@@ -124,37 +176,89 @@ class UsuarioConsumidorPerfilView(generics.RetrieveUpdateDestroyAPIView):
             # Raise a generic APIException for other errors, ensuring a JSON response.
             raise exceptions.APIException({'detail': 'Erro interno ao buscar perfil de consumidor.'}, code=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class UsuarioConsumidorReclamacoesView(SparseFieldsetViewMixin, generics.ListAPIView):
+    """Histórico de reclamações do consumidor autenticado, paginado (?status= filtra)."""
+    serializer_class = ReclamacaoSerializer
+    permission_classes = [IsAuthenticated, IsConsumidor]
+    pagination_class = ReclamacaoPagination
+
+    def get_queryset(self):
+        queryset = Reclamacao.objects.filter(usuario_consumidor=self.request.user.perfil)
+        status_filtro = self.request.query_params.get('status', None)
+        if status_filtro is not None:
+            queryset = queryset.filter(status=status_filtro)
+        return queryset.para_listagem().order_by('-data_criacao', '-id')
+
 # Views para UsuarioEmpresa
-class UsuarioEmpresaViewSet(viewsets.ModelViewSet):
+class UsuarioEmpresaViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = UsuarioEmpresaSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = UsuarioEmpresaPagination
 
     def get_queryset(self):
-        queryset = UsuarioEmpresa.objects.all()
-        user = self.request.user
+        queryset = UsuarioEmpresa.objects.order_by('pk')
 
         # Admin-specific filter
-        if hasattr(user, 'administrador') or user.is_superuser:
+        if eh_administrador(self.request):
             cnpj = self.request.query_params.get('cnpj', None)
             if cnpj is not None:
                 queryset = queryset.filter(cnpj__icontains=cnpj)
         
         # Public search functionality
-        search_query = self.request.query_params.get('search', None)
-        if search_query is not None:
-            queryset = queryset.filter(
-                Q(nome_social__icontains=search_query) |
-                Q(razao_social__icontains=search_query) |
-                Q(cnpj__icontains=search_query)
-            )
+        search_query = self.request.query_params.get('search', '').strip()
+        if search_query:
+            queryset = buscar_empresas(queryset, search_query)
             
         return queryset
 
+    def retrieve(self, request, *args, **kwargs):
+        # Página pública da empresa: servida do cache sem tocar no banco
+        empresa_id = kwargs.get(self.lookup_field)
+        if not str(empresa_id).isdigit():
+            return super().retrieve(request, *args, **kwargs)
+
+        def calcular():
+            return dict(self.get_serializer(self.get_object()).data)
+        return Response(obter_da_empresa(int(empresa_id), nome_no_cache(request, 'publico'), calcular))
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def empresa_tendencias(request, pk):
+    """
+    GET /empresas/<id>/tendencias/?granularidade=dia|semana&inicio=&fim=: série de reclamações,
+    taxa de resolução e tempos de resolução por período, lida só dos rollups (api.relatorios).
+    Só a janela padrão (sem inicio/fim) vai para o cache: datas livres criariam uma entrada
+    por intervalo pedido.
+    """
+    parametros = TendenciasSerializer(data=request.query_params)
+    parametros.is_valid(raise_exception=True)
+    dados = parametros.validated_data
+
+    def calcular():
+        if not UsuarioEmpresa.objects.filter(pk=pk).exists():
+            raise Http404
+        return tendencias(pk, **dados)
+    if 'inicio' in request.query_params or 'fim' in request.query_params:
+        return Response(calcular())
+    nome = f'tendencias:{dados["granularidade"]}:{dados["fim"]}'
+    return Response(obter_da_empresa(pk, nome, calcular))
+
+
 class UsuarioEmpresaPerfilView(generics.RetrieveUpdateAPIView):
 
     serializer_class = UsuarioEmpresaProfileSerializer
     permission_classes = [IsAuthenticated]
 
+    def retrieve(self, request, *args, **kwargs):
+        # Perfil em cache não precisa da linha da empresa; a pk do perfil é a do usuário
+        if papel(request) != Usuario.Papel.EMPRESA:
+            return self.get_object()
+
+        def calcular():
+            return dict(self.get_serializer(self.get_object()).data)
+        return Response(obter_da_empresa(request.user.pk, nome_no_cache(request, 'perfil'), calcular))
+
     def get_object(self):
         user = self.request.user
 
@@ -167,6 +271,7 @@ class UsuarioEmpresaPerfilView(generics.RetrieveUpdateAPIView):
             return Response({'error': 'Usuário não autenticado'}, status=status.HTTP_403_FORBIDDEN)
 
         try:
+            # A autenticação por token só traz a pk do perfil
             return UsuarioEmpresa.objects.get(usuario=user)
 
         except UsuarioEmpresa.DoesNotExist:
@@ -183,6 +288,13 @@ class UsuarioEmpresaPerfilView(generics.RetrieveUpdateAPIView):
             )
 
 
+def autenticar(email, senha):
+    """authenticate() dos logins da API: pool de hashes cheio vira 429 (api.hashing)."""
+    try:
+        return authenticate(username=email, password=senha)
+    except HashIndisponivel:
+        raise exceptions.Throttled(wait=1, detail='Muitos logins simultâneos. Tente novamente em instantes.')
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def usuario_empresa_login(request):
@@ -190,7 +302,6 @@ def usuario_empresa_login(request):
     senha = request.data.get('senha')
     
     print(f"[DEBUG] Attempting company login for email: {email}")
-    print(f"[DEBUG] Provided password: {senha}")
 
     if not email or not senha:
         print("[DEBUG] Email or password missing for company login.")
@@ -199,12 +310,12 @@ def usuario_empresa_login(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    user = authenticate(username=email, password=senha)
+    user = autenticar(email, senha)
     
     print(f"[DEBUG] Authenticate returned user for company: {user}")
 
     if user is not None:
-        if hasattr(user, 'usuarioempresa'):
+        if user.papel == Usuario.Papel.EMPRESA:
             token, created = Token.objects.get_or_create(user=user)
             usuario_empresa = user.usuarioempresa
             
@@ -236,17 +347,17 @@ def usuario_empresa_logout(request):
         return Response({'error': 'Erro ao realizar logout'}, 
                        status=status.HTTP_400_BAD_REQUEST)
 
-class UsuarioEmpresaListView(generics.ListAPIView):
+class UsuarioEmpresaListView(SparseFieldsetViewMixin, generics.ListAPIView):
     serializer_class = UsuarioEmpresaSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        if hasattr(self.request.user, 'administrador'):
+        if papel(self.request) == Usuario.Papel.ADMINISTRADOR:
             return UsuarioEmpresa.objects.all()
         return UsuarioEmpresa.objects.none()
 
 # Views para Administrador
-class AdministradorViewSet(viewsets.ModelViewSet):
+class AdministradorViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Administrador.objects.all()
     serializer_class = AdministradorSerializer
 
@@ -257,7 +368,6 @@ def usuario_consumidor_login(request):
     senha = request.data.get('senha')
     
     print(f"[DEBUG] Attempting consumer login for email: {email}")
-    print(f"[DEBUG] Provided password: {senha}")
 
     if not email or not senha:
         print("[DEBUG] Email or password missing for consumer login.")
@@ -266,19 +376,19 @@ def usuario_consumidor_login(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    user = authenticate(username=email, password=senha)
+    user = autenticar(email, senha)
     
     print(f"[DEBUG] Authenticate returned user for consumer: {user}")
 
     if user is not None:
-        if hasattr(user, 'usuarioconsumidor'):
+        if user.papel == Usuario.Papel.CONSUMIDOR:
             token, created = Token.objects.get_or_create(user=user)
             usuario_consumidor = user.usuarioconsumidor
             
             return Response({
                 'message': 'Login realizado com sucesso',
                 'token': token.key,
-                'usuario_consumidor': UsuarioConsumidorSerializer(usuario_consumidor).data
+                'usuario_consumidor': UsuarioConsumidorSerializer(usuario_consumidor, context={'request': request}).data
             })
         else:
             print(f"[DEBUG] User {email} is authenticated but is not a consumer user.")
@@ -304,29 +414,22 @@ def usuario_consumidor_logout(request):
                        status=status.HTTP_400_BAD_REQUEST)
 
 # Views para Reclamacao
-class ReclamacaoViewSet(viewsets.ModelViewSet):
+class ReclamacaoViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = ReclamacaoSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = ReclamacaoPagination
     ordering = ['-data_criacao'] # Adicionado para ordenar por data de criação descendente
 
     def perform_create(self, serializer):
-        if not hasattr(self.request.user, 'usuarioconsumidor'):
+        if papel(self.request) != Usuario.Papel.CONSUMIDOR:
             raise exceptions.PermissionDenied("Apenas consumidores podem criar reclamações.")
         print(f"[DEBUG] Reclamacao validated data: {serializer.validated_data}")
-        serializer.save(usuario_consumidor=self.request.user.usuarioconsumidor)
+        serializer.save(usuario_consumidor=self.request.user.perfil)
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = Reclamacao.objects.all()
-
-        if hasattr(user, 'usuarioconsumidor'):
-            queryset = queryset.filter(usuario_consumidor=user.usuarioconsumidor)
-        elif hasattr(user, 'usuarioempresa'):
-            queryset = queryset.filter(empresa=user.usuarioempresa)
-        elif not (hasattr(user, 'administrador') or user.is_superuser):
-             # For unauthenticated users, or users that are not consumers, companies or admins,
-             # return all complaints. This is now a public view.
-             pass
+        queryset = Reclamacao.objects.para_listagem().order_by(*self.ordering, '-id')
+        # Consumidores veem as suas e empresas as dirigidas a elas; anônimos e administradores, todas
+        queryset = reclamacoes_visiveis(self.request, queryset, publico=True)
 
         # Filtros para todos os usuários autorizados
         status_filtro = self.request.query_params.get('status', None)
@@ -336,9 +439,216 @@ class ReclamacaoViewSet(viewsets.ModelViewSet):
         empresa_id = self.request.query_params.get('empresa_id', None)
         if empresa_id is not None:
             queryset = queryset.filter(empresa__usuario_id=empresa_id)
-            
+
+        # Busca textual em título e descrição, ordenada por relevância
+        search_query = self.request.query_params.get('search', '').strip()
+        if search_query:
+            queryset = buscar_reclamacoes(queryset, search_query)
+
         return queryset
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        search_query = self.request.query_params.get('search', '').strip()
+        if search_query:
+            context['termos_busca'] = termos_de_busca(search_query)
+        return context
+
+# Views para anexos enviados em partes (api.uploads)
+
+class UploadArquivoCreateView(generics.CreateAPIView):
+    """POST /reclamacoes/<id>/uploads/: abre o envio em partes de um anexo da reclamação."""
+    serializer_class = UploadArquivoSerializer
+    permission_classes = [IsAuthenticated, IsConsumidor]
+
+    def perform_create(self, serializer):
+        reclamacao = get_object_or_404(
+            Reclamacao, pk=self.kwargs['reclamacao_id'], usuario_consumidor_id=self.request.user.pk
+        )
+        serializer.save(reclamacao=reclamacao, usuario=self.request.user, tamanho_parte=settings.UPLOAD_TAMANHO_PARTE)
+
+
+class UploadArquivoView(generics.RetrieveDestroyAPIView):
+    """GET: estado do envio (partes recebidas, para retomar); DELETE: cancela e apaga as partes."""
+    serializer_class = UploadArquivoSerializer
+    permission_classes = [IsAuthenticated, IsConsumidor]
+
+    def get_queryset(self):
+        return UploadArquivo.objects.filter(usuario=self.request.user)
+
+    def perform_destroy(self, instance):
+        descartar_partes(instance)
+        instance.delete()
+
+
+@api_view(['PUT'])
+@permission_classes([IsAuthenticated, IsConsumidor])
+def upload_parte(request, pk, numero):
+    """
+    PUT /uploads/<id>/partes/<n>/ com o conteúdo da parte no corpo (application/octet-stream).
+    O corpo vai direto para o disco, sem passar pelos upload handlers do Django.
+    """
+    upload = get_object_or_404(UploadArquivo, pk=pk, usuario=request.user)
+    if numero < upload.total_partes:
+        esperado = upload.tamanho_da_parte(numero)
+        # Sem Content-Length (Transfer-Encoding: chunked) o DRF não expõe o corpo em request.stream
+        if not request.META.get('CONTENT_LENGTH'):
+            return Response({'detail': 'Envie a parte com Content-Length, sem Transfer-Encoding: chunked.'},
+                            status=status.HTTP_411_LENGTH_REQUIRED)
+        if request.META['CONTENT_LENGTH'] != str(esperado):
+            return Response({'detail': f'A parte {numero} deve ter {esperado} bytes.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+    try:
+        sha256 = gravar_parte(upload, numero, request.stream)
+    except UploadInvalido as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'numero': numero, 'tamanho': upload.tamanho_da_parte(numero), 'sha256': sha256})
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsConsumidor])
+def upload_concluir(request, pk):
+    """POST /uploads/<id>/concluir/: junta as partes e anexa o arquivo à reclamação."""
+    with transaction.atomic():
+        # Trava o upload: duas conclusões simultâneas não geram dois anexos
+        upload = get_object_or_404(UploadArquivo.objects.select_for_update(), pk=pk, usuario=request.user)
+        try:
+            nome, tamanho, sha256 = montar(upload)
+        except UploadInvalido as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        arquivo = Arquivo(
+            reclamacao_id=upload.reclamacao_id, nome_arquivo=upload.nome_arquivo,
+            tipo_arquivo=upload.tipo_arquivo, tamanho=tamanho, sha256=sha256,
+        )
+        arquivo.arquivo.name = nome
+        arquivo.save()
+        descartar_partes(upload)
+        upload.delete()
+    return Response(ArquivoSerializer(arquivo, context={'request': request}).data, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def arquivo_preview(request, pk):
+    """
+    GET /arquivos/<id>/preview/?tamanho=: JPEG reduzido do anexo (imagem ou 1ª página do PDF).
+    Só para quem pode ver a reclamação, como o download. Gerado no primeiro pedido, fora da
+    thread da requisição; se demorar mais que PREVIEW_ESPERA, responde 202 e o cliente tenta de novo.
+    """
+    visiveis = reclamacoes_visiveis(request, Reclamacao.objects.all())
+    arquivo = get_object_or_404(
+        Arquivo.objects.only('id', 'arquivo', 'tipo_arquivo', 'sha256'), pk=pk, reclamacao__in=visiveis.values('pk'),
+    )
+    try:
+        tamanho = int(request.query_params.get('tamanho', settings.PREVIEW_TAMANHOS[0]))
+    except ValueError:
+        tamanho = None
+    if tamanho not in settings.PREVIEW_TAMANHOS:
+        return Response({'detail': f'tamanho deve ser um de: {", ".join(map(str, settings.PREVIEW_TAMANHOS))}.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if not tem_preview(arquivo.tipo_arquivo):
+        return Response({'detail': 'Este tipo de arquivo não tem pré-visualização.'}, status=status.HTTP_404_NOT_FOUND)
+
+    caminho = preview_pronto(arquivo, tamanho)
+    # Uma segunda volta cobre o preview apagado pelo limite do cache entre a checagem e o open()
+    for _ in range(2):
+        if caminho is None:
+            try:
+                caminho = agendar_preview(arquivo, tamanho).result(timeout=settings.PREVIEW_ESPERA)
+            except FuturoNaoConcluido:
+                return Response({'detail': 'Pré-visualização em preparo.'}, status=status.HTTP_202_ACCEPTED,
+                                headers={'Retry-After': '1'})
+            except (PreviewIndisponivel, FileNotFoundError):
+                break
+        try:
+            jpeg = open(caminho, 'rb')
+        except FileNotFoundError:
+            caminho = None
+            continue
+        response = FileResponse(jpeg, content_type='image/jpeg')
+        # O preview é do conteúdo (SHA-256) do anexo, que nunca muda; privado porque o anexo também é
+        response['Cache-Control'] = 'private, max-age=31536000, immutable'
+        return response
+    return Response({'detail': 'Não foi possível gerar a pré-visualização.'}, status=status.HTTP_404_NOT_FOUND)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def arquivo_download(request, pk):
+    """
+    GET /arquivos/<id>/download/: o anexo, para quem pode ver a reclamação. Suporta Range,
+    If-None-Match/If-Range e, com DOWNLOAD_ACCEL_REDIRECT, delega o envio ao nginx.
+    """
+    visiveis = reclamacoes_visiveis(request, Reclamacao.objects.all())
+    arquivo = get_object_or_404(
+        Arquivo.objects.only('id', 'arquivo', 'nome_arquivo', 'tipo_arquivo', 'sha256'),
+        pk=pk, reclamacao__in=visiveis.values('pk'),
+    )
+    try:
+        return servir_arquivo(request, arquivo)
+    except FileNotFoundError:
+        return Response({'detail': 'Arquivo não encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+
+
+# Relatórios (api.relatorios)
+
+class RelatorioListCreateView(SparseFieldsetViewMixin, generics.ListCreateAPIView):
+    """
+    GET /relatorios/: relatórios gerados (use ?omit=conteudo para listar sem o conteúdo).
+    POST: gera um relatório a partir dos rollups diários (GerarRelatorioSerializer).
+    """
+    queryset = Relatorio.objects.select_related('administrador__usuario').order_by('-data_geracao', '-id')
+    serializer_class = RelatorioSerializer
+    permission_classes = [IsAuthenticated, IsAdministrador]
+
+    def create(self, request, *args, **kwargs):
+        parametros = GerarRelatorioSerializer(data=request.data)
+        parametros.is_valid(raise_exception=True)
+        # Superusuários sem perfil de Administrador geram relatórios sem autor
+        administrador = request.user.perfil if papel(request) == Usuario.Papel.ADMINISTRADOR else None
+        relatorio = gerar_relatorio(administrador=administrador, **parametros.validated_data)
+        return Response(RelatorioSerializer(relatorio).data, status=status.HTTP_201_CREATED)
+
+
+class RelatorioDetailView(generics.RetrieveDestroyAPIView):
+    queryset = Relatorio.objects.select_related('administrador__usuario')
+    serializer_class = RelatorioSerializer
+    permission_classes = [IsAuthenticated, IsAdministrador]
+
+
+# Exportação em massa (api.exportacao)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdministrador])
+def reclamacoes_exportar(request):
+    """
+    GET /reclamacoes/exportar/?formato=csv|jsonl&empresa=&status=&desde=&ate=: todas as
+    reclamações filtradas, geradas em streaming (api.exportacao) e em gzip quando o cliente aceita.
+    """
+    parametros = ExportacaoSerializer(data=request.query_params)
+    parametros.is_valid(raise_exception=True)
+    filtros = dict(parametros.validated_data)
+    formato = filtros.pop('formato')
+
+    # O corpo é gerado depois que a view retorna, fora do escopo do middleware de réplicas:
+    # o banco de leitura é escolhido agora
+    reclamacoes = filtrar(Reclamacao.objects.using(router.db_for_read(Reclamacao)), **filtros)
+    compactar = re.search(r'\bgzip\b', request.headers.get('Accept-Encoding', '')) is not None
+    tipo, extensao = FORMATOS[formato]
+    blocos = exportar(formato, reclamacoes, compactar=compactar)
+    if isinstance(request._request, ASGIRequest):
+        # Sob ASGI um iterador síncrono seria lido inteiro para uma lista antes do envio
+        blocos = em_async(blocos)
+    response = StreamingHttpResponse(blocos, content_type=tipo)
+    response['Content-Disposition'] = content_disposition_header(
+        True, f'reclamacoes-{timezone.localdate():%Y%m%d}.{extensao}'
+    )
+    if compactar:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
 # Views para RespostaReclamacao
 
 class RespostaReclamacaoCreateAPIView(generics.CreateAPIView):
@@ -360,7 +670,7 @@ class RespostaReclamacaoCreateAPIView(generics.CreateAPIView):
 
 
 class RespostaReclamacaoUpdateAPIView(generics.UpdateAPIView):
-    queryset = RespostaReclamacao.objects.all()
+    queryset = RespostaReclamacao.objects.select_related('reclamacao')
     serializer_class = RespostaReclamacaoSerializer
     permission_classes = [IsAuthenticated]
     lookup_field = 'pk'
@@ -369,7 +679,7 @@ class RespostaReclamacaoUpdateAPIView(generics.UpdateAPIView):
         obj = super().get_object()
         user = self.request.user
 
-        if not hasattr(user, 'usuarioconsumidor') or obj.reclamacao.usuario_consumidor != user.usuarioconsumidor:
+        if papel(self.request) != Usuario.Papel.CONSUMIDOR or obj.reclamacao.usuario_consumidor_id != user.pk:
             raise exceptions.PermissionDenied("Você não tem permissão para atualizar esta resposta.")
         
         return obj
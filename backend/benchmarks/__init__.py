@@ -0,0 +1,58 @@
+"""
+Benchmarks executados fora da suíte de testes.
+
+Cada módulo é um script: `python -m benchmarks.<nome> --help` (a partir de backend/).
+Os dados sintéticos são criados num banco de teste descartável, como o `manage.py test`,
+então os benchmarks nunca tocam no banco configurado.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def configurar_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
+    django.setup()
+
+
+@contextmanager
+def banco_de_teste():
+    """Cria o banco de teste (com migrations), entrega o controle e o destrói no final."""
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from django.test.runner import DiscoverRunner
+
+    setup_test_environment()
+    runner = DiscoverRunner(verbosity=0, interactive=False)
+    antigos = runner.setup_databases()
+    try:
+        yield
+    finally:
+        runner.teardown_databases(antigos)
+        teardown_test_environment()
+
+
+@contextmanager
+def cronometro(resultados, nome):
+    """Acumula em resultados[nome] o tempo (s) do bloco."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        resultados[nome] = time.perf_counter() - inicio
+
+
+@contextmanager
+def contar_queries(resultados, nome, using='default'):
+    """Acumula em resultados[nome] o número de queries do bloco (sem o limite do connection.queries)."""
+    from django.db import connections
+
+    resultados[nome] = 0
+
+    def contar(execute, sql, params, many, context):
+        resultados[nome] += 1
+        return execute(sql, params, many, context)
+
+    with connections[using].execute_wrapper(contar):
+        yield
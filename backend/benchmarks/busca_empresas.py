@@ -0,0 +1,92 @@
+"""
+Compara a busca antiga de empresas (nome_social/razao_social/cnpj __icontains) com
+api.search.buscar_empresas sobre um cadastro sintético.
+
+Uso (a partir de backend/):
+    python -m benchmarks.busca_empresas --empresas 1000000
+"""
+import argparse
+import random
+import statistics
+
+from benchmarks import banco_de_teste, configurar_django, cronometro
+
+PALAVRAS = (
+    'São', 'João', 'Padaria', 'Açougue', 'Comércio', 'Distribuidora', 'Farmácia', 'Mercado', 'Construções',
+    'Transportes', 'Telecomunicações', 'Serviços', 'Alimentos', 'Tecnologia', 'Café', 'Irmãos', 'Brasil',
+    'Paulista', 'Nordeste', 'Ótica', 'Livraria', 'Elétrica', 'Veículos', 'Móveis', 'Calçados', 'Saúde',
+)
+BUSCAS = ('joao', 'farmacia sao', 'TELECOMUNICAÇÕES', 'otica brasil', '12.3', '4567', 'inexistente xyz')
+
+
+def semear(total, seed, lote=20000):
+    from api.models import Usuario, UsuarioEmpresa
+
+    aleatorio = random.Random(seed)
+    for inicio in range(0, total, lote):
+        fim = min(inicio + lote, total)
+        usuarios = Usuario.objects.bulk_create(
+            [Usuario(email=f'empresa{i}@bench.local', password='!') for i in range(inicio, fim)]
+        )
+        empresas = []
+        for i, usuario in zip(range(inicio, fim), usuarios):
+            empresa = UsuarioEmpresa(
+                usuario=usuario,
+                cnpj=f'{aleatorio.randrange(10 ** 14):014d}',
+                razao_social=' '.join(aleatorio.sample(PALAVRAS, 3)) + f' {i}',
+                nome_social=' '.join(aleatorio.sample(PALAVRAS, 2)) if aleatorio.random() < 0.5 else None,
+            )
+            empresa.preencher_campos_busca()  # bulk_create não chama save()
+            empresas.append(empresa)
+        UsuarioEmpresa.objects.bulk_create(empresas)
+
+
+def busca_antiga(queryset, termo):
+    from django.db.models import Q
+    return queryset.filter(
+        Q(nome_social__icontains=termo) | Q(razao_social__icontains=termo) | Q(cnpj__icontains=termo)
+    ).order_by('pk')
+
+
+def medir(funcao, repeticoes):
+    tempos = {}
+    amostras = []
+    for i in range(repeticoes):
+        with cronometro(tempos, i):
+            funcao()
+        amostras.append(tempos[i])
+    return statistics.median(amostras)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--empresas', type=int, default=1_000_000)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    configurar_django()
+    from django.db import connection
+    from api.models import UsuarioEmpresa
+    from api.search import buscar_empresas
+
+    with banco_de_teste():
+        tempos = {}
+        with cronometro(tempos, 'semeadura'):
+            semear(args.empresas, args.seed)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        print(f'{args.empresas} empresas, banco: {connection.vendor}, semeadura: {tempos["semeadura"]:.1f}s')
+        print(f'{"busca":>20} | {"antiga (ms)":>11} | {"nova (ms)":>9} | resultados antiga/nova (primeira página)')
+        for termo in BUSCAS:
+            empresas = UsuarioEmpresa.objects.all()
+            antiga = medir(lambda: list(busca_antiga(empresas, termo)[:20]), args.repeticoes)
+            nova = medir(lambda: list(buscar_empresas(empresas, termo)[:20]), args.repeticoes)
+            encontrados_antiga = len(busca_antiga(empresas, termo)[:20])
+            encontrados_nova = len(buscar_empresas(empresas, termo)[:20])
+            print(f'{termo:>20} | {antiga * 1000:11.1f} | {nova * 1000:9.1f} | {encontrados_antiga}/{encontrados_nova}')
+
+
+if __name__ == '__main__':
+    main()
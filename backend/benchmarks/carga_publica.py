@@ -0,0 +1,106 @@
+"""
+Teste de carga dos endpoints públicos de leitura: DRF síncrono (WSGI) x views assíncronas (ASGI).
+
+Suba os dois servidores com o mesmo número de workers, apontando para o mesmo banco:
+
+    gunicorn project.wsgi:application --workers 4 --bind 127.0.0.1:8000
+    gunicorn project.asgi:application --workers 4 -k uvicorn.workers.UvicornWorker --bind 127.0.0.1:8001
+
+e rode (a partir de backend/):
+
+    python -m benchmarks.carga_publica --wsgi http://127.0.0.1:8000 --asgi http://127.0.0.1:8001 \\
+        --empresa 1 --concorrencia 64 --duracao 20
+
+Cada cliente mantém uma conexão keep-alive e percorre os endpoints em sequência
+(listagem, busca de reclamações, busca de empresas e perfil da empresa).
+"""
+import argparse
+import http.client
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+
+def caminhos(modo, empresa, busca):
+    if modo == 'wsgi':
+        return [
+            '/api/reclamacoes/?pagination=cursor',
+            f'/api/reclamacoes/?search={busca}&count=false',
+            f'/api/empresas/?search={busca}&count=false',
+            f'/api/empresas/{empresa}/',
+        ]
+    return [
+        '/api/public/reclamacoes/',
+        f'/api/public/reclamacoes/?search={busca}',
+        f'/api/public/empresas/?search={busca}',
+        f'/api/public/empresas/{empresa}/',
+    ]
+
+
+def cliente(url_base, lista, fim, latencias, erros, lock):
+    partes = urlsplit(url_base)
+    conexao = http.client.HTTPConnection(partes.hostname, partes.port or 80, timeout=30)
+    minhas, meus_erros, i = [], 0, 0
+    while time.monotonic() < fim:
+        caminho = lista[i % len(lista)]
+        i += 1
+        inicio = time.perf_counter()
+        try:
+            conexao.request('GET', caminho, headers={'Accept': 'application/json'})
+            resposta = conexao.getresponse()
+            resposta.read()
+            if resposta.status != 200:
+                meus_erros += 1
+                continue
+        except (OSError, http.client.HTTPException):
+            meus_erros += 1
+            conexao.close()
+            conexao = http.client.HTTPConnection(partes.hostname, partes.port or 80, timeout=30)
+            continue
+        minhas.append(time.perf_counter() - inicio)
+    conexao.close()
+    with lock:
+        latencias.extend(minhas)
+        erros[0] += meus_erros
+
+
+def medir(url_base, lista, concorrencia, duracao):
+    latencias, erros, lock = [], [0], threading.Lock()
+    fim = time.monotonic() + duracao
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        for _ in range(concorrencia):
+            executor.submit(cliente, url_base, lista, fim, latencias, erros, lock)
+    return latencias, erros[0]
+
+
+def percentil(valores, p):
+    if not valores:
+        return float('nan')
+    return statistics.quantiles(valores, n=100)[p - 1] if len(valores) > 1 else valores[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--wsgi', default='http://127.0.0.1:8000')
+    parser.add_argument('--asgi', default='http://127.0.0.1:8001')
+    parser.add_argument('--empresa', type=int, default=1, help='pk de uma empresa existente')
+    parser.add_argument('--busca', default='produto')
+    parser.add_argument('--concorrencia', type=int, default=64)
+    parser.add_argument('--duracao', type=float, default=20, help='Segundos por servidor')
+    parser.add_argument('--aquecimento', type=float, default=3)
+    args = parser.parse_args()
+
+    print(f'{args.concorrencia} clientes, {args.duracao:.0f}s por servidor')
+    print(f'{"servidor":>8} | {"req/s":>8} | {"p50 (ms)":>8} | {"p95 (ms)":>8} | {"p99 (ms)":>8} | erros')
+    for modo, url in (('wsgi', args.wsgi), ('asgi', args.asgi)):
+        lista = caminhos(modo, args.empresa, args.busca)
+        medir(url, lista, args.concorrencia, args.aquecimento)
+        latencias, erros = medir(url, lista, args.concorrencia, args.duracao)
+        print(f'{modo:>8} | {len(latencias) / args.duracao:8.1f} | {percentil(latencias, 50) * 1000:8.1f} | '
+              f'{percentil(latencias, 95) * 1000:8.1f} | {percentil(latencias, 99) * 1000:8.1f} | {erros}')
+
+
+if __name__ == '__main__':
+    main()
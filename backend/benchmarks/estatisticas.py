@@ -0,0 +1,136 @@
+"""
+Compara o recálculo de EstatisticaEmpresa:
+
+- legado: 3 COUNTs + uma query por reclamação encerrada (implementação anterior);
+- agregado: uma query agregada por empresa (update_company_statistics);
+- em lote: uma query agrupada para todas as empresas (update_companies_statistics).
+
+Uso (a partir de backend/):
+    python -m benchmarks.estatisticas --reclamacoes 50000 --empresas 20
+"""
+import argparse
+import random
+from datetime import timedelta
+
+from benchmarks import banco_de_teste, configurar_django, contar_queries, cronometro
+
+
+def semear(total_reclamacoes, total_empresas, proporcao_encerradas, seed):
+    from django.utils import timezone
+    from api.models import Reclamacao, RespostaReclamacao, Usuario, UsuarioConsumidor, UsuarioEmpresa
+
+    aleatorio = random.Random(seed)
+    usuarios = Usuario.objects.bulk_create(
+        [Usuario(email=f'empresa{i}@bench.local', nome=f'Empresa {i}', password='!') for i in range(total_empresas)]
+        + [Usuario(email='consumidor@bench.local', nome='Consumidor', password='!')]
+    )
+    empresas = UsuarioEmpresa.objects.bulk_create([
+        UsuarioEmpresa(usuario=usuario, cnpj=f'{i:014d}', razao_social=usuario.nome)
+        for i, usuario in enumerate(usuarios[:-1])
+    ])
+    consumidor = UsuarioConsumidor.objects.create(usuario=usuarios[-1])
+
+    # bulk_create + auto_now_add sobrescreveria as datas sintéticas
+    campos_auto = [Reclamacao._meta.get_field('data_criacao'), RespostaReclamacao._meta.get_field('data_criacao')]
+    for campo in campos_auto:
+        campo.auto_now_add = False
+    try:
+        agora = timezone.now()
+        reclamacoes = Reclamacao.objects.bulk_create([
+            Reclamacao(
+                usuario_consumidor=consumidor,
+                empresa=aleatorio.choice(empresas),
+                titulo=f'Reclamação {i}',
+                descricao='Gerada pelo benchmark',
+                data_criacao=agora - timedelta(hours=aleatorio.randint(24, 24 * 365)),
+                status=(Reclamacao.StatusReclamacao.ENCERRADA if aleatorio.random() < proporcao_encerradas
+                        else Reclamacao.StatusReclamacao.ABERTA),
+            )
+            for i in range(total_reclamacoes)
+        ], batch_size=5000)
+
+        respostas = []
+        for reclamacao in reclamacoes:
+            if reclamacao.status != Reclamacao.StatusReclamacao.ENCERRADA:
+                continue
+            data = reclamacao.data_criacao + timedelta(hours=aleatorio.randint(1, 72))
+            respostas.append(RespostaReclamacao(
+                reclamacao=reclamacao, empresa_id=reclamacao.empresa_id, descricao='Em análise', data_criacao=data,
+            ))
+            respostas.append(RespostaReclamacao(
+                reclamacao=reclamacao, empresa_id=reclamacao.empresa_id, descricao='Resolvido',
+                data_criacao=data + timedelta(hours=aleatorio.randint(1, 72)),
+                status_resolucao=RespostaReclamacao.StatusResolucao.RESOLVIDA,
+            ))
+        RespostaReclamacao.objects.bulk_create(respostas, batch_size=5000)
+    finally:
+        for campo in campos_auto:
+            campo.auto_now_add = True
+    return empresas
+
+
+def update_company_statistics_legado(empresa):
+    """Implementação anterior, mantida aqui apenas como linha de base."""
+    from api.models import EstatisticaEmpresa, Reclamacao, RespostaReclamacao
+
+    stats, _ = EstatisticaEmpresa.objects.get_or_create(usuario_empresa=empresa)
+    encerrada = Reclamacao.StatusReclamacao.ENCERRADA
+    all_complaints = Reclamacao.objects.filter(empresa=empresa)
+    stats.total_reclamacoes = all_complaints.count()
+    stats.reclamacoes_resolvidas = all_complaints.filter(status=encerrada).count()
+    stats.reclamacoes_pendentes = all_complaints.exclude(status=encerrada).count()
+
+    total_resolution_time = timedelta(0)
+    resolved_count = 0
+    for complaint in all_complaints.filter(status=encerrada):
+        first_resolved_response = RespostaReclamacao.objects.filter(
+            reclamacao=complaint, status_resolucao=RespostaReclamacao.StatusResolucao.RESOLVIDA
+        ).order_by('data_criacao').first()
+        if first_resolved_response:
+            total_resolution_time += first_resolved_response.data_criacao - complaint.data_criacao
+            resolved_count += 1
+    stats.media_tempo_resolucao = (
+        (total_resolution_time / resolved_count).total_seconds() / 3600 if resolved_count else 0.0
+    )
+    stats.save()
+    return stats.media_tempo_resolucao
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reclamacoes', type=int, default=50000)
+    parser.add_argument('--empresas', type=int, default=20)
+    parser.add_argument('--encerradas', type=float, default=0.6, help='Proporção de reclamações encerradas')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    configurar_django()
+    from django.db import connection
+    from api.stats import update_companies_statistics, update_company_statistics
+
+    with banco_de_teste():
+        resultados, queries = {}, {}
+        with cronometro(resultados, 'semeadura'):
+            empresas = semear(args.reclamacoes, args.empresas, args.encerradas, args.seed)
+
+        medias = {}
+        for nome, executar in (
+            ('legado', lambda: [update_company_statistics_legado(e) for e in empresas]),
+            ('agregado', lambda: [update_company_statistics(e)['media_tempo_resolucao'] for e in empresas]),
+            ('em lote', lambda: [v['media_tempo_resolucao']
+                                 for v in update_companies_statistics([e.pk for e in empresas]).values()]),
+        ):
+            with contar_queries(queries, nome), cronometro(resultados, nome):
+                medias[nome] = executar()
+
+        print(f'{args.reclamacoes} reclamações, {args.empresas} empresas, banco: {connection.vendor}')
+        print(f'semeadura: {resultados["semeadura"]:.1f}s')
+        for nome in ('legado', 'agregado', 'em lote'):
+            print(f'{nome:>9}: {resultados[nome] * 1000:10.1f} ms  {queries[nome]:6d} queries  '
+                  f'{resultados["legado"] / resultados[nome]:6.1f}x')
+        diferenca = max(abs(a - b) for a, b in zip(medias['legado'], medias['em lote']))
+        print(f'maior diferença entre as médias (legado x em lote): {diferenca:.6f} h')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Mede logins/s (e logins/s por core) com authenticate(), como nas views de login:
+
+- pbkdf2: configuração anterior (PBKDF2 como hasher preferido);
+- scrypt / argon2: hasher preferido atual, com as senhas já migradas;
+- migração: senhas ainda em PBKDF2 com scrypt preferido (verifica PBKDF2 e refaz em scrypt).
+
+Uso (a partir de backend/):
+    python -m benchmarks.login --usuarios 200 --threads 4
+"""
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import banco_de_teste, configurar_django, cronometro
+
+SENHA = 'senha-forte-123'
+
+
+def preparar_usuarios(total, hasher):
+    from django.contrib.auth.hashers import make_password
+    from api.models import Usuario
+
+    Usuario.objects.all().delete()
+    # Um hash só (mesmo sal) para todos: o custo de verificar é o mesmo
+    senha = make_password(SENHA, hasher=hasher)
+    Usuario.objects.bulk_create(
+        [Usuario(email=f'usuario{i}@bench.local', password=senha) for i in range(total)]
+    )
+    return [f'usuario{i}@bench.local' for i in range(total)]
+
+
+def logar_todos(emails, threads):
+    from django.contrib.auth import authenticate
+    from django.db import connection
+
+    def logar(email):
+        try:
+            return authenticate(username=email, password=SENHA) is not None
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return sum(executor.map(logar, emails))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--usuarios', type=int, default=200, help='Logins por cenário (um por usuário)')
+    parser.add_argument('--threads', type=int, default=os.cpu_count() or 1, help='Requisições simultâneas')
+    args = parser.parse_args()
+
+    configurar_django()
+    from django.conf import settings
+    from django.test.utils import override_settings
+
+    # As threads do benchmark abrem conexões próprias: o banco de teste precisa ser um arquivo
+    banco = settings.DATABASES['default']
+    if banco['ENGINE'].endswith('sqlite3'):
+        banco.setdefault('TEST', {})['NAME'] = os.path.join(settings.BASE_DIR, 'benchmark_login.sqlite3')
+
+    hashers = {
+        'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+        'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    }
+    cenarios = [('pbkdf2', 'pbkdf2', 'pbkdf2_sha256'), ('scrypt', 'scrypt', 'scrypt'), ('migração', 'scrypt', 'pbkdf2_sha256')]
+    if 'argon2' in ''.join(settings.PASSWORD_HASHERS):
+        cenarios.insert(2, ('argon2', 'argon2', 'argon2'))
+
+    cores = os.cpu_count() or 1
+    with banco_de_teste():
+        print(f'{args.usuarios} logins por cenário, {args.threads} threads, {cores} cores, '
+              f'pool de hash: {settings.LOGIN_HASH_WORKERS} workers')
+        print(f'{"cenário":>10} | {"logins/s":>9} | {"por core":>9} | {"ms/login":>8}')
+        for nome, preferido, hasher_inicial in cenarios:
+            ordem = [hashers[preferido]] + [h for h in settings.PASSWORD_HASHERS if h != hashers[preferido]]
+            with override_settings(PASSWORD_HASHERS=ordem):
+                emails = preparar_usuarios(args.usuarios, hasher_inicial)
+                tempos = {}
+                with cronometro(tempos, nome):
+                    sucessos = logar_todos(emails, args.threads)
+            assert sucessos == args.usuarios, f'{nome}: {sucessos}/{args.usuarios} logins válidos'
+            por_segundo = args.usuarios / tempos[nome]
+            print(f'{nome:>10} | {por_segundo:9.1f} | {por_segundo / cores:9.1f} | '
+                  f'{tempos[nome] * 1000 / args.usuarios * args.threads:8.1f}')
+
+
+if __name__ == '__main__':
+    main()
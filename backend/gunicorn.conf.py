@@ -0,0 +1,68 @@
+"""
+Configuração do gunicorn (scripts/commands.sh roda `gunicorn -c gunicorn.conf.py`).
+
+Tudo vem de variáveis de ambiente:
+
+- SERVER_MODE: 'wsgi' (padrão, workers gthread com o DRF) ou 'asgi' (workers uvicorn, para
+  as views assíncronas de /api/public/; desliga o CONN_MAX_AGE, veja DB_POOL no settings);
+- WEB_CONCURRENCY: processos (padrão 2 x cores + 1);
+- GUNICORN_THREADS: threads por processo no modo wsgi (padrão 4);
+- GUNICORN_PRELOAD: carrega o Django no master antes do fork (padrão 1), os workers
+  compartilham a memória do código e sobem mais rápido;
+- GUNICORN_MAX_REQUESTS / GUNICORN_MAX_REQUESTS_JITTER: recicla cada worker após ~N requisições;
+- GUNICORN_TIMEOUT / GUNICORN_GRACEFUL_TIMEOUT / GUNICORN_KEEPALIVE: em segundos;
+- GUNICORN_RELOAD: reinicia ao editar o código (padrão = DEBUG; incompatível com preload).
+
+Para recarregar sem derrubar conexões: `kill -HUP <pid do master>` (novos workers sobem e os
+antigos terminam as requisições em andamento dentro do graceful_timeout).
+"""
+import multiprocessing
+import os
+
+
+def _inteiro(nome, padrao):
+    return int(os.getenv(nome, padrao))
+
+
+def _booleano(nome, padrao):
+    return bool(int(os.getenv(nome, padrao)))
+
+
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+if SERVER_MODE not in ('wsgi', 'asgi'):
+    raise RuntimeError(f"SERVER_MODE deve ser 'wsgi' ou 'asgi', não {SERVER_MODE!r}")
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = _inteiro('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1)
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'project.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'project.wsgi:application'
+    worker_class = 'gthread'
+    threads = _inteiro('GUNICORN_THREADS', 4)
+
+reload = _booleano('GUNICORN_RELOAD', os.getenv('DEBUG', 0))
+preload_app = _booleano('GUNICORN_PRELOAD', 1) and not reload
+
+max_requests = _inteiro('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _inteiro('GUNICORN_MAX_REQUESTS_JITTER', 100)
+timeout = _inteiro('GUNICORN_TIMEOUT', 30)
+graceful_timeout = _inteiro('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _inteiro('GUNICORN_KEEPALIVE', 5)
+
+accesslog = os.getenv('GUNICORN_ACCESSLOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOGLEVEL', 'info')
+# Evita que um worker ocupado com I/O lento em disco (overlay do container) pareça travado
+worker_tmp_dir = os.getenv('GUNICORN_WORKER_TMP_DIR', '/dev/shm' if os.path.isdir('/dev/shm') else None)
+
+
+def post_fork(server, worker):
+    # Com preload, nada aberto no master (conexões com o banco) pode ser herdado pelos workers
+    if not server.cfg.preload_app:
+        return
+    from django.db import connections
+
+    connections.close_all()
@@ -9,8 +9,10 @@ https://docs.djangoproject.com/en/5.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
+import importlib.util
 import os
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv() 
@@ -53,7 +55,7 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -90,6 +92,7 @@ AUTH_PASSWORD_VALIDATORS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'api.middleware.leitura_em_replica_middleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -121,6 +124,9 @@ WSGI_APPLICATION = 'project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Mesmo SERVER_MODE do gunicorn.conf.py
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+
 DATABASES = {
     'default': {
         'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.postgresql'),
@@ -129,9 +135,59 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'change-me'),
         'HOST': os.getenv('POSTGRES_HOST', 'change-me'),
         'PORT': int(os.getenv('POSTGRES_PORT', 5432)),
+        # Reaproveita a conexão entre requisições do mesmo worker por DB_CONN_MAX_AGE segundos
+        # (0 = uma conexão por requisição), testando-a antes de reusar.
+        # Com SERVER_MODE=asgi fica sempre em 0: o código síncrono roda em threads do asgiref que
+        # não passam pelo fechamento de fim de requisição, e cada uma deixaria uma conexão aberta
+        # até esgotar o max_connections. Para reusar conexões sob ASGI, use DB_POOL=1.
+        'CONN_MAX_AGE': 0 if SERVER_MODE == 'asgi' else int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': bool(int(os.getenv('DB_CONN_HEALTH_CHECKS', 1))),
+        'OPTIONS': {},
     }
 }
 
+# Pool de conexões do psycopg 3 (DB_POOL=1, só PostgreSQL): cada processo mantém entre
+# DB_POOL_MIN e DB_POOL_MAX conexões abertas e as empresta por requisição; quem não consegue
+# uma em DB_POOL_TIMEOUT segundos recebe erro. Substitui o CONN_MAX_AGE, que fica em 0; com
+# DB_CONN_HEALTH_CHECKS a conexão é testada ao ser emprestada.
+# Dimensione DB_POOL_MAX x processos do gunicorn abaixo do max_connections do Postgres.
+DB_POOL = bool(int(os.getenv('DB_POOL', 0)))
+if DB_POOL:
+    if importlib.util.find_spec('psycopg_pool') is None:
+        raise ImproperlyConfigured('DB_POOL=1 requer psycopg 3 com o pool (pip install "psycopg[binary,pool]")')
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN', 2)),
+        'max_size': int(os.getenv('DB_POOL_MAX', 10)),
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+        # Conexões ociosas além do mínimo são fechadas; todas são renovadas periodicamente
+        'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', 300)),
+        'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+    }
+
+# Réplicas de leitura: DB_REPLICAS lista, separados por vírgula, o HOST[:PORT] de cada réplica do
+# PostgreSQL (mesmo banco, usuário e senha do primário) ou, com SQLite, o arquivo de cada cópia.
+# GETs leem de uma réplica e o resto vai ao primário (api.routers.ReplicaRouter); quem escreveu
+# lê do primário por DB_READ_YOUR_WRITES segundos (api.middleware.leitura_em_replica_middleware).
+# Com mais de um processo, a janela por token precisa de um cache compartilhado (CACHE_BACKEND).
+DATABASE_REPLICAS = []
+for _indice, _replica in enumerate(filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1):
+    _alias = f'replica{_indice}'
+    _config = {**DATABASES['default'], 'OPTIONS': dict(DATABASES['default']['OPTIONS'])}
+    if _config['ENGINE'].endswith('sqlite3'):
+        _config['NAME'] = _replica.strip()
+    else:
+        _host, _, _porta = _replica.strip().partition(':')
+        _config['HOST'] = _host
+        _config['PORT'] = int(_porta or _config['PORT'])
+    # Nos testes a réplica é o próprio banco de teste
+    _config['TEST'] = {'MIRROR': 'default'}
+    DATABASES[_alias] = _config
+    DATABASE_REPLICAS.append(_alias)
+
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+READ_YOUR_WRITES_SECONDS = int(os.getenv('DB_READ_YOUR_WRITES', 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -151,6 +207,35 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Hash de senhas
+# PASSWORD_HASHER escolhe o algoritmo das senhas novas: scrypt (padrão, hashlib.scrypt),
+# argon2 (requer argon2-cffi) ou pbkdf2. Os demais continuam aceitos para os hashes antigos,
+# que são refeitos com o escolhido no próximo login (api.backends.OffloadedHashModelBackend).
+_PASSWORD_HASHERS = {
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'pbkdf2_sha1': 'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+}
+if importlib.util.find_spec('argon2') is None:
+    del _PASSWORD_HASHERS['argon2']
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'scrypt')
+if PASSWORD_HASHER not in _PASSWORD_HASHERS:
+    raise ImproperlyConfigured(
+        f'PASSWORD_HASHER={PASSWORD_HASHER!r} indisponível; opções: {", ".join(_PASSWORD_HASHERS)}'
+    )
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    hasher for nome, hasher in _PASSWORD_HASHERS.items() if nome != PASSWORD_HASHER
+]
+
+AUTHENTICATION_BACKENDS = ['api.backends.OffloadedHashModelBackend']
+
+# Pool que calcula os hashes do login: no máximo LOGIN_HASH_WORKERS hashes simultâneos por
+# processo (0 = na própria thread da requisição) e até LOGIN_HASH_FILA esperando; além disso
+# o login responde 429 em vez de enfileirar e tirar CPU das demais requisições.
+LOGIN_HASH_WORKERS = int(os.getenv('LOGIN_HASH_WORKERS', os.cpu_count() or 1))
+LOGIN_HASH_FILA = int(os.getenv('LOGIN_HASH_FILA', 32))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -178,4 +263,59 @@ MEDIA_ROOT = DATA_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Padrão em memória local; CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+# com CACHE_LOCATION=/caminho/do/diretorio compartilha o cache entre processos sem serviço externo.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'chie-aqui'),
+    }
+}
+
+# Perfil público e estatísticas das empresas (api.cache), invalidados pelos signals
+EMPRESA_CACHE_ALIAS = 'default'
+EMPRESA_CACHE_TIMEOUT = int(os.getenv('EMPRESA_CACHE_TIMEOUT', 300))
+
+# Token -> usuário (api.authentication.CachedTokenAuthentication). O logout e a troca de senha
+# apagam a entrada, mas com o cache em memória local só no processo que os atendeu: com vários
+# workers, use um backend compartilhado ou mantenha o timeout curto.
+TOKEN_CACHE_ALIAS = 'default'
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', 60))
+
+# Estatísticas das empresas (EstatisticaEmpresa)
+# 0 = atualização incremental síncrona nos signals. Acima de 0, os signals só marcam a
+# empresa como pendente e o comando process_statistics_queue recalcula em lote; o valor
+# (em segundos) é o atraso máximo tolerado para as estatísticas e para os rollups
+# (api.rollups), refeitos pela fila para as empresas cujas reclamações mudaram.
+ESTATISTICAS_MAX_STALENESS = int(os.getenv('ESTATISTICAS_MAX_STALENESS', 0))
+
+# Anexos enviados em partes (api.uploads): tamanho de cada parte, tamanho máximo do arquivo e
+# horas até um envio não concluído ser descartado (comando limpar_uploads), em bytes/horas.
+UPLOAD_TAMANHO_PARTE = int(os.getenv('UPLOAD_TAMANHO_PARTE', 5 * 1024 * 1024))
+UPLOAD_TAMANHO_MAXIMO = int(os.getenv('UPLOAD_TAMANHO_MAXIMO', 1024 * 1024 * 1024))
+UPLOAD_EXPIRACAO_HORAS = int(os.getenv('UPLOAD_EXPIRACAO_HORAS', 24))
+
+# Anexos são guardados uma vez por conteúdo (api.armazenamento). Um blob sem referências só é
+# apagado se não foi gravado nem reusado nos últimos ARQUIVOS_GC_CARENCIA segundos; os que
+# sobrarem são coletados por `armazenamento_arquivos --coletar`.
+ARQUIVOS_GC_CARENCIA = int(os.getenv('ARQUIVOS_GC_CARENCIA', 60))
+
+# Pré-visualizações dos anexos (api.previews): tamanhos permitidos (maior lado, em pixels; o
+# primeiro é o padrão), limite do cache em disco (bytes, LRU), threads que as geram por
+# processo e quantas podem esperar na fila, quanto a requisição espera pela geração antes de
+# responder 202 e o tempo máximo de renderização de um PDF (segundos).
+PREVIEW_TAMANHOS = [int(tamanho) for tamanho in os.getenv('PREVIEW_TAMANHOS', '320,960').split(',')]
+PREVIEW_CACHE_MAXIMO = int(os.getenv('PREVIEW_CACHE_MAXIMO', 256 * 1024 * 1024))
+PREVIEW_WORKERS = int(os.getenv('PREVIEW_WORKERS', 2))
+PREVIEW_FILA = int(os.getenv('PREVIEW_FILA', 16))
+PREVIEW_ESPERA = float(os.getenv('PREVIEW_ESPERA', 2))
+PREVIEW_TIMEOUT = float(os.getenv('PREVIEW_TIMEOUT', 20))
+
+# Download de anexos (api.downloads). Com DOWNLOAD_ACCEL_REDIRECT (ex.: '/media-protegida/'), o
+# Django só autoriza e o nginx envia o arquivo, numa location interna apontando para MEDIA_ROOT:
+#     location /media-protegida/ { internal; alias /data/web/media/; }
+DOWNLOAD_ACCEL_REDIRECT = os.getenv('DOWNLOAD_ACCEL_REDIRECT', '')
+
 CORS_ALLOW_ALL_ORIGINS = True # lembrar de remover em produção
@@ -9,7 +9,16 @@ done
 
 echo "✅ Postgres Database Started Successfully ($POSTGRES_HOST:$POSTGRES_PORT)"
 
-python manage.py collectstatic --noinput
-python manage.py makemigrations --noinput
-python manage.py migrate --noinput
-python manage.py runserver 0.0.0.0:8000
\ No newline at end of file
+# collectstatic só copia o que mudou; COLLECTSTATIC=0 pula de vez (estáticos já publicados)
+if [ "${COLLECTSTATIC:-1}" = "1" ]; then
+  python manage.py collectstatic --noinput --verbosity 0
+fi
+
+# As migrações vêm versionadas no repositório: nada de makemigrations no boot.
+# migrate --check sai com erro só quando há migração pendente.
+if ! python manage.py migrate --check >/dev/null 2>&1; then
+  python manage.py migrate --noinput
+fi
+
+# gunicorn vira o PID 1 e recebe os sinais do container (SIGTERM = desligamento gracioso)
+exec gunicorn -c gunicorn.conf.py